@@ -1,11 +1,9 @@
 import logging
 from typing import TypeVar
 
-from django.db.models import Q
-
-from products.models import BrandParentCompany, Product, ProductAddition, Store
-from products.util import get_current_work_cycle, get_num_work_cycles_offset
-from server.utils.common import bulk_create_and_get
+from products.models import BrandParentCompany, Product, ProductAddition, Store, WorkCycle
+from products.util import get_outside_work_cycle_filter, upsert_products
+from products.util.upc import get_upc_normalizer
 
 from .types import IProduct
 
@@ -20,6 +18,10 @@ def update_product_record_names(
     Bulk create products if they don't already exist.
     Bulk update existing products with product name if they don't contain it
 
+    Every product is validated in memory against the company's preloaded UPC rules, and all
+    valid products are then written with one INSERT ... ON CONFLICT per batch, so the number
+    of queries doesn't grow with the number of products.
+
     Args:
         normalized_products (list[IProduct]): normalized product info received from client
         parent_company (BrandParentCompany): db record of BrandParentCompany
@@ -27,54 +29,51 @@ def update_product_record_names(
     Returns:
         tuple: tuple<str> of sorted UPC numbers
     """
-
-    def get_product_name(upc: str, products: list[IProduct]) -> str | None:
-        for product_info in products:
-            if product_info.upc == upc:
-                return product_info.name
-        return None
-
     upcs = [p.upc for p in normalized_products]
+    upc_normalizer = get_upc_normalizer(parent_company)
 
-    # bulk create products
-    new_products: list[Product] = []
+    # upc -> Product. The first occurrence of a UPC decides its name.
+    valid_products: dict[str, Product] = {}
     for product_info in normalized_products:
-        temp_product = Product(
-            upc=product_info.upc, name=product_info.name, parent_company=parent_company
-        )
-        if not temp_product.is_valid_upc():
-            logger.info("Invalid UPC %s for '%s'. Skipping", temp_product.upc, temp_product.name)
+        if product_info.upc in valid_products:
             continue
-        new_products.append(temp_product)
-
-    logger.info("Bulk creating %s products", len(new_products))
-
-    new_products = list(bulk_create_and_get(Product, new_products, fields=["upc"]))
 
-    logger.info("Bulk created %s products", len(new_products))
-
-    # bulk update products with no name
-    products_with_no_name = Product.objects.filter(Q(name__isnull=True) | Q(name=""), upc__in=upcs)
+        upc_error = upc_normalizer.get_product_upc_error(product_info.upc, product_info.name)
+        if upc_error is not None:
+            logger.info(
+                "Invalid UPC %s for '%s': %s. Skipping",
+                product_info.upc,
+                product_info.name,
+                upc_error,
+            )
+            continue
 
-    for product in products_with_no_name:
-        product.parent_company = parent_company
-        product.name = get_product_name(product.upc, normalized_products)
+        valid_products[product_info.upc] = Product(
+            upc=product_info.upc, name=product_info.name, parent_company=parent_company
+        )
 
-    products_with_no_name.bulk_update(products_with_no_name, ["parent_company", "name"])
+    logger.info("Upserting %s products", len(valid_products))
+    num_rows_affected = upsert_products(list(valid_products.values()))
+    logger.info("Created or named %s products", num_rows_affected)
 
     return upcs
 
 
 def update_product_additions(
-    store: Store, parent_company: BrandParentCompany, normalized_upcs: list[str]
+    store: Store,
+    parent_company: BrandParentCompany,
+    normalized_upcs: list[str],
+    work_cycle: WorkCycle,
 ) -> list[ProductAddition]:
     """
-    Bulk create ProductAddition records if they don't already exist
+    Bulk create ProductAddition records if they don't already exist, and mark as carried those
+    that were ordered outside of `work_cycle`, in a fixed number of queries.
 
     Args:
         store (products.Store): products.Store instance
         parent_company (BrandParentCompany): Parent Company record
         normalized_upcs (list[str]): list of full (proper 12-digit) UPC numbers
+        work_cycle (products.WorkCycle): current work cycle
 
     Returns:
         list: list of products.ProductAddition that match the UPCs present in request_json
@@ -87,18 +86,13 @@ def update_product_additions(
 
     product_additions = ProductAddition.objects.filter(
         store=store, product__upc__in=normalized_upcs
-    ).select_related("store", "product")
-
-    for product_addition in product_additions:
-        if product_addition.date_ordered is None:
-            continue
-
-        num_cycles_offset = get_num_work_cycles_offset(
-            product_addition.date_ordered, get_current_work_cycle()
-        )
+    )
 
-        if product_addition.is_carried is False and num_cycles_offset > 0:
-            product_addition.is_carried = True
-            product_addition.save(update_fields=["is_carried"])
+    num_carried = product_additions.filter(
+        get_outside_work_cycle_filter("date_ordered", work_cycle),
+        is_carried=False,
+        date_ordered__isnull=False,
+    ).update(is_carried=True)
+    logger.info("Marked %s product additions as carried", num_carried)
 
-    return list(product_additions)
+    return list(product_additions.select_related("store", "product"))
@@ -16,9 +16,9 @@ from products.models import (
     PersonnelContact,
     Store,
 )
-from products.tasks import get_external_product_images
+from products.tasks import get_external_product_images, prerender_barcodes
 from products.util import get_current_work_cycle
-from products.util.upc import get_valid_upc
+from products.util.upc import get_upc_normalizer
 from server.utils.common import validate_structure
 from survey_worker.qtrax.models import QtServiceOrder
 
@@ -114,8 +114,9 @@ def get_store_product_additions(request: DrfRequest) -> DrfResponse:
 
     normalized_products: list[IProduct] = []
 
+    upc_normalizer = get_upc_normalizer(parent_company)
     for product in request_data.products:
-        upc = get_valid_upc(product.raw_upc, product.name, parent_company)
+        upc = upc_normalizer.get_valid_upc(product.raw_upc, product.name)
         if upc is None:
             logger.info("Could not find normalized upc for raw upc = '%s'", product.raw_upc)
             continue
@@ -141,13 +142,16 @@ def get_store_product_additions(request: DrfRequest) -> DrfResponse:
     hash_object.update(str(sorted(normalized_upcs)).encode())
     sorted_upcs_hash = hash_object.hexdigest()
 
+    current_work_cycle = get_current_work_cycle()
+
     update_product_record_names(normalized_products, parent_company)
-    product_additions = update_product_additions(store, parent_company, normalized_upcs)
+    product_additions = update_product_additions(
+        store, parent_company, normalized_upcs, current_work_cycle
+    )
 
     # initiate worker
     get_external_product_images.delay()
 
-    current_work_cycle = get_current_work_cycle()
     barcode_sheet = (
         BarcodeSheet.objects.prefetch_related("product_additions")
         .filter(
@@ -168,6 +172,7 @@ def get_store_product_additions(request: DrfRequest) -> DrfResponse:
             work_cycle=current_work_cycle,
         )
         barcode_sheet.product_additions.add(*product_additions)
+        prerender_barcodes.delay(normalized_upcs)
     elif barcode_sheet is not None and barcode_sheet.upcs_list is None:
         barcode_sheet.upcs_list = normalized_upcs
         barcode_sheet.save(update_fields=["upcs_list"])
@@ -1,4 +1,4 @@
-import React, { useContext, useState } from "react";
+import React, { useContext, useEffect, useState } from "react";
 
 import { Context, interfaces, reverse } from "@reactivated";
 import { Alert, Button, Modal } from "react-bootstrap";
@@ -11,7 +11,7 @@ import {
 import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
 import { LoadingSpinner } from "@client/components/LoadingSpinner";
 import { useFetch } from "@client/hooks/useFetch";
-import { fetchByReactivated } from "@client/util/commonUtil";
+import { fetchByReactivated, postFormDataByReactivated } from "@client/util/commonUtil";
 
 interface Props {
   show: boolean;
@@ -25,11 +25,36 @@ export function EditPlanogramModal(props: Props) {
   const submitFetcher = useFetch<interfaces.ISubmitPlanogramProductsResult>();
 
   const [planogramTextDump, setPlanogramTextDump] = useState("");
+  const [planogramFile, setPlanogramFile] = useState<File | null>(null);
+  const [uploadId, setUploadId] = useState<string | null>(null);
+  const [uploadProgress, setUploadProgress] = useState<interfaces.IPlanogramUploadProgress | null>(
+    null
+  );
   const [isResetPlanogram, setIsResetPlanogram] = useState(false);
   const [label, setLabel] = useState("");
 
+  // poll the server's progress on an uploaded file while it's being processed
+  useEffect(() => {
+    if (uploadId === null || !submitFetcher.isLoading) {
+      return;
+    }
+
+    const intervalId = setInterval(async () => {
+      const resp = await fetch(
+        reverse("product_locator:get_planogram_upload_progress", { upload_id: uploadId })
+      );
+      if (resp.ok) {
+        setUploadProgress((await resp.json()) as interfaces.IPlanogramUploadProgress);
+      }
+    }, 1000);
+
+    return () => clearInterval(intervalId);
+  }, [uploadId, submitFetcher.isLoading]);
+
   function handleHide() {
     setPlanogramTextDump("");
+    setPlanogramFile(null);
+    setUploadProgress(null);
     setIsResetPlanogram(false);
     setLabel("");
     submitFetcher.setData(null as unknown as interfaces.ISubmitPlanogramProductsResult);
@@ -39,22 +64,47 @@ export function EditPlanogramModal(props: Props) {
   async function handleSubmit(event: React.FormEvent<HTMLFormElement>) {
     event.preventDefault();
 
-    const [isSuccess] = await submitFetcher.fetchData(() =>
-      fetchByReactivated<interfaces.ISubmitPlanogramProductsResult>(
-        reverse("product_locator:submit_planogram_products"),
-        djangoContext.csrf_token,
-        "POST",
+    const [isSuccess] = await submitFetcher.fetchData(() => {
+      if (planogramFile === null) {
+        return fetchByReactivated<interfaces.ISubmitPlanogramProductsResult>(
+          reverse("product_locator:submit_planogram_products"),
+          djangoContext.csrf_token,
+          "POST",
+          JSON.stringify({
+            planogram_id: props.planogram.pk,
+            planogram_text_dump: planogramTextDump,
+            is_reset_planogram: isResetPlanogram,
+            label,
+          })
+        );
+      }
+
+      const newUploadId = crypto.randomUUID();
+      setUploadId(newUploadId);
+      setUploadProgress(null);
+
+      const formData = new FormData();
+      formData.append("planogram_file", planogramFile);
+      formData.append(
+        "payload",
         JSON.stringify({
           planogram_id: props.planogram.pk,
-          planogram_text_dump: planogramTextDump,
           is_reset_planogram: isResetPlanogram,
           label,
+          upload_id: newUploadId,
         })
-      )
-    );
+      );
+      return postFormDataByReactivated<interfaces.ISubmitPlanogramProductsResult>(
+        reverse("product_locator:upload_planogram_products"),
+        djangoContext.csrf_token,
+        formData
+      );
+    });
 
+    setUploadId(null);
     if (isSuccess) {
       setPlanogramTextDump("");
+      setPlanogramFile(null);
       props.onSuccess();
     }
   }
@@ -80,8 +130,25 @@ export function EditPlanogramModal(props: Props) {
               value={planogramTextDump}
               onChange={(event) => setPlanogramTextDump(event.target.value)}
               style={{ fontFamily: 'Consolas, "Courier New", monospace' }}
-              required
+              disabled={planogramFile !== null}
+              required={planogramFile === null}
+            />
+          </div>
+
+          <div className="mb-3">
+            <label htmlFor="planogram-file" className="form-label fw-semibold">
+              Or Upload a Text Dump File
+            </label>
+            <input
+              type="file"
+              id="planogram-file"
+              className="form-control"
+              accept=".txt,text/plain"
+              onChange={(event) => setPlanogramFile(event.target.files?.[0] ?? null)}
             />
+            <small className="form-text text-muted">
+              For large planograms. Replaces the text dump above when a file is selected.
+            </small>
           </div>
 
           <div className="mb-3 form-check">
@@ -123,7 +190,10 @@ export function EditPlanogramModal(props: Props) {
             <Button
               type="submit"
               variant="primary"
-              disabled={submitFetcher.isLoading || planogramTextDump.trim() === ""}
+              disabled={
+                submitFetcher.isLoading ||
+                (planogramFile === null && planogramTextDump.trim() === "")
+              }
             >
               <FontAwesomeIcon icon={faCheckCircle} className="me-2" />
               Submit
@@ -133,6 +203,24 @@ export function EditPlanogramModal(props: Props) {
             </Button>
           </div>
 
+          {submitFetcher.isLoading && uploadProgress !== null && (
+            <Alert variant="info" className="mt-3 mb-0">
+              {uploadProgress.stage === "saving" ? (
+                <span>Saving {uploadProgress.products_parsed} parsed item(s)...</span>
+              ) : (
+                <span>
+                  Parsed {uploadProgress.lines_read} line(s) into {uploadProgress.products_parsed}{" "}
+                  item(s) (
+                  {Math.floor(
+                    (100 * uploadProgress.bytes_read) / Math.max(uploadProgress.total_bytes, 1)
+                  )}
+                  % of file)
+                  {uploadProgress.num_errors > 0 && `, ${uploadProgress.num_errors} error(s)`}
+                </span>
+              )}
+            </Alert>
+          )}
+
           {submitFetcher.isError && (
             <Alert variant="danger" className="mt-3 mb-0">
               <div className="d-flex align-items-start">
@@ -18,6 +18,7 @@ import {
 } from "@fortawesome/free-solid-svg-icons";
 import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
 
+import { LoadMoreButton } from "@client/components/LoadMoreButton";
 import { useFetch } from "@client/hooks/useFetch";
 import { getRelatedProducts, postNewProductLocation } from "@client/util/productLocator";
 
@@ -57,6 +58,14 @@ export function ProductLocatorModal({
 }: Props) {
   const locUpdateProps = useFetch<interfaces.IHomeLocationUpdate>();
   const relatedProductsFetch = useFetch<interfaces.MatchingProducts>();
+  const relatedProductsPaginationFetch = useFetch<interfaces.MatchingProducts>();
+  // the products found by the last search: its first page, then the pages loaded with "Load more"
+  const [relatedProducts, setRelatedProducts] = React.useState<
+    interfaces.MatchingProducts["products"] | null
+  >(null);
+  const [relatedProductsQuery, setRelatedProductsQuery] = React.useState("");
+  const [relatedProductsPage, setRelatedProductsPage] = React.useState(1);
+  const [hasMoreRelatedProducts, setHasMoreRelatedProducts] = React.useState(false);
   const djangoContext = React.useContext(Context);
 
   const productNameRef = React.useRef<HTMLInputElement>(null);
@@ -66,7 +75,7 @@ export function ProductLocatorModal({
   const newLocationValueRef = React.useRef<HTMLInputElement>(null);
 
   const relatedProductLocationsFromFetch =
-    relatedProductsFetch.data?.products.map((product) => product.home_locations).flat(1) ?? [];
+    relatedProducts?.map((product) => product.home_locations).flat(1) ?? [];
 
   async function handleSubmit(event: React.FormEvent<HTMLFormElement>): Promise<void> {
     event.preventDefault();
@@ -83,13 +92,30 @@ export function ProductLocatorModal({
     if (productNameQuery === "") return;
 
     const callback = () => getRelatedProducts(productNameQuery, storeId);
-    await relatedProductsFetch.fetchData(callback);
+    const [isSuccess, result] = await relatedProductsFetch.fetchData(callback);
+
+    setRelatedProducts(isSuccess ? result.products : null);
+    setRelatedProductsQuery(productNameQuery);
+    setRelatedProductsPage(1);
+    setHasMoreRelatedProducts(isSuccess && result.has_next);
+  }
+
+  async function handleLoadMoreRelatedProducts(): Promise<void> {
+    const nextPage = relatedProductsPage + 1;
+    const callback = () => getRelatedProducts(relatedProductsQuery, storeId, nextPage);
+    const [isSuccess, result] = await relatedProductsPaginationFetch.fetchData(callback);
+
+    if (isSuccess) {
+      setRelatedProducts((current) => [...(current ?? []), ...result.products]);
+      setRelatedProductsPage(nextPage);
+      setHasMoreRelatedProducts(result.has_next);
+    }
   }
 
   function handleChangeRelatedLocationsDropdown(event: React.ChangeEvent<HTMLSelectElement>) {
     const selectedRelatedProductLocationPk = parseInt(event.target.value);
 
-    const selectedRelatedProduct = relatedProductsFetch.data?.products.find((product) =>
+    const selectedRelatedProduct = relatedProducts?.find((product) =>
       product.home_locations.some(
         (home_location) => home_location.pk === selectedRelatedProductLocationPk
       )
@@ -192,7 +218,7 @@ export function ProductLocatorModal({
               </div>
             </div>
 
-            {relatedProductsFetch.data && (
+            {relatedProducts !== null && (
               <div className="mb-3 p-3 bg-light rounded">
                 <label htmlFor="related-product-locations" className="form-label fw-semibold">
                   Related Products &amp; Locations
@@ -212,7 +238,7 @@ export function ProductLocatorModal({
                   <option value="-1" disabled>
                     Select an option
                   </option>
-                  {relatedProductsFetch.data.products.map((product) =>
+                  {relatedProducts.map((product) =>
                     product.home_locations.map((home_location) => (
                       <option key={home_location.pk} value={home_location.pk}>
                         {product.name} - {home_location.display_name}
@@ -220,6 +246,16 @@ export function ProductLocatorModal({
                     ))
                   )}
                 </select>
+                {(hasMoreRelatedProducts || relatedProductsPage > 1) && (
+                  <LoadMoreButton
+                    label="related products"
+                    isLoading={relatedProductsPaginationFetch.isLoading}
+                    isError={relatedProductsPaginationFetch.isError}
+                    errorMessages={relatedProductsPaginationFetch.errorMessages}
+                    hasNext={hasMoreRelatedProducts}
+                    onClick={() => void handleLoadMoreRelatedProducts()}
+                  />
+                )}
               </div>
             )}
 
@@ -139,7 +139,7 @@ export function BarcodeSheetContent(props: Props) {
                   <div className="product-images-container d-flex justify-content-center">
                     <div className="barcode-container">
                       <img
-                        src={`data:image/png;base64,${product_addition.product.barcode_b64}`}
+                        src={product_addition.product.barcode_url}
                         className="barcode-image"
                         alt="Product Barcode"
                       />
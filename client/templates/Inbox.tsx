@@ -30,16 +30,17 @@ export function Template(props: templates.Inbox) {
   const context = React.useContext(Context);
   const [messageRecipients, setMessageRecipients] = React.useState(props.message_recipients);
   const messageRecipientsPaginationState = useFetch<interfaces.GetInboxMessages>();
-  // page 1 is already rendered server-side via props.message_recipients, so the next page to
-  // fetch via "Load more" starts at 2 - same pattern as StockTrackerScanHistory.tsx.
-  const [nextPageNumber, setNextPageNumber] = React.useState(2);
+  // the first page is already rendered server-side via props.message_recipients, so "Load more"
+  // starts from its cursor
+  const [nextCursor, setNextCursor] = React.useState(props.next_cursor);
   const [hasNext, setHasNext] = React.useState(props.has_next);
   const paginationErrorMessage = React.useRef<HTMLDivElement>(null);
 
   async function handleLoadMoreMessages() {
+    const params = new URLSearchParams({ cursor: nextCursor ?? "" });
     const [isSuccess, result] = await messageRecipientsPaginationState.fetchData(() =>
       fetchByReactivated<interfaces.GetInboxMessages>(
-        `${reverse("root:get_inbox_messages")}?page=${nextPageNumber}`,
+        `${reverse("root:get_inbox_messages")}?${params.toString()}`,
         context.csrf_token,
         "GET"
       )
@@ -47,7 +48,7 @@ export function Template(props: templates.Inbox) {
 
     if (isSuccess) {
       setMessageRecipients((current) => [...current, ...result.message_recipients]);
-      setNextPageNumber((current) => current + 1);
+      setNextCursor(result.next_cursor);
       setHasNext(result.has_next);
     } else {
       paginationErrorMessage.current?.scrollIntoView();
@@ -163,7 +163,13 @@ export function Template(props: templates.ProductLocatorPlanogramUpdates) {
                 )}
 
                 {applyFetcher.data?.planogram_update.pk === selectedUpdate.pk ? (
-                  <Alert variant="success">This update was successfully applied.</Alert>
+                  <Alert variant="success">
+                    This update was successfully applied. Locations added:{" "}
+                    {applyFetcher.data.num_slots_added}, removed:{" "}
+                    {applyFetcher.data.num_slots_removed}, with a new product:{" "}
+                    {applyFetcher.data.num_slots_replaced} ({applyFetcher.data.num_slots_moved}{" "}
+                    moved from another location), renamed: {applyFetcher.data.num_slots_renamed}.
+                  </Alert>
                 ) : (
                   selectedUpdate.is_applied && (
                     <Alert variant="secondary">This update has already been applied.</Alert>
@@ -1,11 +1,11 @@
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 
 import Alert from "react-bootstrap/Alert";
 import Badge from "react-bootstrap/Badge";
 import Button from "react-bootstrap/Button";
 import Card from "react-bootstrap/Card";
 
-import { Context, interfaces, reverse, templates } from "@reactivated";
+import { Context, interfaces, templates } from "@reactivated";
 
 import {
   faCheckCircle,
@@ -22,12 +22,20 @@ import { NavigationBar } from "@client/components/productLocator/NavigationBar";
 import { ProductLocatorModal } from "@client/components/productLocator/ProductLocatorModal";
 import { LocationItem } from "@client/components/productLocator/productLocatorIndex";
 import { useFetch } from "@client/hooks/useFetch";
-import { getProductLocation } from "@client/util/productLocator";
+import {
+  loadLocationBundle,
+  resolveProductLocation,
+  syncLocationBundle,
+} from "@client/util/productLocator/locationBundle";
 
 import "@client/scss/stock_tracker/scanner.scss";
 import "@client/scss/product_locator/location-item.scss";
 
 type TStore = templates.ProductLocatorScanner["stores"][number];
+type TLocationBundle = interfaces.IStoreLocationBundle;
+
+// how often scans trigger a background sync of the store's location bundle
+const LOCATION_BUNDLE_SYNC_INTERVAL_MS = 5 * 60 * 1000;
 
 function scanErrorCallback(errorMessage: string) {
   console.log("Error occurred on scan. Message:", errorMessage);
@@ -45,6 +53,8 @@ export function Template(props: templates.ProductLocatorScanner) {
   const [modalShow, setModalShow] = useState(false);
   const getProductFetcher = useFetch<interfaces.IProductLocations>();
   const djangoContext = React.useContext(Context);
+  const locationBundleRef = useRef<TLocationBundle | null>(null);
+  const lastBundleSyncMsRef = useRef(0);
 
   // Get store from query param `store-id`
   const storeIdFromQueryParam =
@@ -56,13 +66,40 @@ export function Template(props: templates.ProductLocatorScanner) {
     setStore(() => storeFromQueryParam);
   }
 
+  function syncStoreLocationBundle(storeId: number) {
+    lastBundleSyncMsRef.current = Date.now();
+    void syncLocationBundle(storeId).then((bundle) => {
+      locationBundleRef.current = bundle;
+    });
+  }
+
+  // scans are resolved from the store's location bundle when possible, so they keep working
+  // with a poor connection; it is synced when the store is selected, when the connection comes
+  // back, and in the background every LOCATION_BUNDLE_SYNC_INTERVAL_MS while scanning
+  useEffect(() => {
+    if (store === null) {
+      return;
+    }
+
+    locationBundleRef.current = loadLocationBundle(store.pk);
+    syncStoreLocationBundle(store.pk);
+    const handleOnline = () => syncStoreLocationBundle(store.pk);
+    window.addEventListener("online", handleOnline);
+
+    return () => window.removeEventListener("online", handleOnline);
+  }, [store]);
+
   async function scanSuccessCallback(decodedText: string): Promise<void> {
     console.log("Scanned code:", decodedText);
     setScannedUpc(() => decodedText);
 
     await getProductFetcher.fetchData(() =>
-      getProductLocation(decodedText, store!.pk, reverse("product_locator:get_product_location"))
+      resolveProductLocation(locationBundleRef.current, decodedText, store!.pk)
     );
+
+    if (Date.now() - lastBundleSyncMsRef.current > LOCATION_BUNDLE_SYNC_INTERVAL_MS) {
+      syncStoreLocationBundle(store!.pk);
+    }
   }
 
   return (
@@ -27,7 +27,7 @@ import { BasicBarcodeSheet, TPaginatedResponse } from "@client/util/stockTracker
 export function Template(props: templates.StockTrackerBarcodeSheetsHistory) {
   const djangoContext = React.useContext(Context);
   const [barcodeSheets, setBarcodeSheets] = useState<BasicBarcodeSheet[]>([]);
-  const [nextPageNumber, setNextPageNumber] = useState(1);
+  const [nextCursor, setNextCursor] = useState("");
   const [hasNext, setHasNext] = useState(true);
   const barcodeSheetPaginationState = useFetch<TPaginatedResponse<BasicBarcodeSheet>>();
   const paginationErrorMessage = React.useRef<HTMLDivElement>(null);
@@ -40,10 +40,10 @@ export function Template(props: templates.StockTrackerBarcodeSheetsHistory) {
     }
   });
 
-  async function handleGetBarcodeSheets(page: number) {
+  async function handleGetBarcodeSheets(cursor: string) {
     const barcodeSheetsCallback = () =>
       getBarcodeSheets(djangoContext.csrf_token, {
-        page,
+        cursor,
         ...(props.current_field_rep_id !== null && {
           field_representative_id: props.current_field_rep_id,
         }),
@@ -52,7 +52,7 @@ export function Template(props: templates.StockTrackerBarcodeSheetsHistory) {
     const [isSuccess, result] = await barcodeSheetPaginationState.fetchData(barcodeSheetsCallback);
     if (isSuccess) {
       setBarcodeSheets((prev) => [...prev, ...result.results]);
-      setNextPageNumber(page + 1);
+      setNextCursor(result.next_cursor ?? "");
       setHasNext(result.has_next);
     } else {
       paginationErrorMessage.current?.scrollIntoView();
@@ -66,7 +66,7 @@ export function Template(props: templates.StockTrackerBarcodeSheetsHistory) {
       return;
     }
     hasFetchedInitialPage.current = true;
-    void handleGetBarcodeSheets(1);
+    void handleGetBarcodeSheets("");
   }, []);
 
   return (
@@ -214,7 +214,7 @@ export function Template(props: templates.StockTrackerBarcodeSheetsHistory) {
                 isError={barcodeSheetPaginationState.isError}
                 errorMessages={barcodeSheetPaginationState.errorMessages}
                 hasNext={hasNext}
-                onClick={() => void handleGetBarcodeSheets(nextPageNumber)}
+                onClick={() => void handleGetBarcodeSheets(nextCursor)}
               />
             )}
           </Col>
@@ -24,7 +24,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
   const [chosenStore, setChosenStore] = useState<IStore | null>(null);
   const [productAdditions, setProductAdditions] = useState<BasicProductAddition[]>([]);
   const productAdditionPaginationState = useFetch<TPaginatedResponse<BasicProductAddition>>();
-  const [nextPageNumber, setNextPageNumber] = useState(1);
+  const [nextCursor, setNextCursor] = useState("");
   const [hasNext, setHasNext] = useState(true);
   // The filters actually applied to the current results, as opposed to the modal's draft
   // (possibly unsubmitted) values - kept separate so opening/toggling/typing in the modal has
@@ -66,7 +66,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
 
   async function handleGetProductAdditions(
     storePk: number,
-    page: number,
+    cursor: string,
     productName: string,
     brandCompanyIds: Set<number>
   ) {
@@ -75,7 +75,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
 
     const productAdditionsCallback = () =>
       getProductAdditions(djangoContext.csrf_token, {
-        page,
+        cursor,
         store_id: storePk,
         product_name: productName,
         brand_parent_company_ids: isAllBrandCompaniesSelected
@@ -87,7 +87,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
       await productAdditionPaginationState.fetchData(productAdditionsCallback);
     if (isSuccess) {
       setProductAdditions((prev) => [...prev, ...result.results]);
-      setNextPageNumber(page + 1);
+      setNextCursor(result.next_cursor ?? "");
       setHasNext(result.has_next);
     } else {
       paginationErrorMessage.current?.scrollIntoView();
@@ -108,7 +108,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
     setProductNameSearchInput("");
     setSelectedBrandCompanyIds(allIds);
     setDraftSelectedBrandCompanyIds(allIds);
-    await handleGetProductAdditions(store.pk, 1, "", allIds);
+    await handleGetProductAdditions(store.pk, "", "", allIds);
   }
 
   async function handleFiltersSubmit(event: React.FormEvent<HTMLFormElement>) {
@@ -123,7 +123,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
     setShowFiltersModal(false);
     await handleGetProductAdditions(
       chosenStore.pk,
-      1,
+      "",
       productNameSearchInput,
       draftSelectedBrandCompanyIds
     );
@@ -137,7 +137,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
     setProductNameFilter("");
     setProductNameSearchInput("");
     setProductAdditions([]);
-    await handleGetProductAdditions(chosenStore.pk, 1, "", selectedBrandCompanyIds);
+    await handleGetProductAdditions(chosenStore.pk, "", "", selectedBrandCompanyIds);
   }
 
   async function handleClearBrandCompanyFilter() {
@@ -149,7 +149,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
     setSelectedBrandCompanyIds(allIds);
     setDraftSelectedBrandCompanyIds(allIds);
     setProductAdditions([]);
-    await handleGetProductAdditions(chosenStore.pk, 1, productNameFilter, allIds);
+    await handleGetProductAdditions(chosenStore.pk, "", productNameFilter, allIds);
   }
 
   function handleShowFiltersModal() {
@@ -275,7 +275,7 @@ export function Template(props: templates.StockTrackerScanHistory) {
                   onClick={() =>
                     handleGetProductAdditions(
                       chosenStore.pk,
-                      nextPageNumber,
+                      nextCursor,
                       productNameFilter,
                       selectedBrandCompanyIds
                     )
@@ -67,7 +67,7 @@ export const BarcodeSheetSchema = z.object({
           name: z.string(),
           upc_sections: z.array(z.string()),
           item_image_url: z.string(),
-          barcode_b64: z.string(),
+          barcode_url: z.string(),
         }),
         is_carried: z.boolean(),
         is_new: z.boolean(),
@@ -139,3 +139,19 @@ export function fetchByReactivated<T>(
     headers: headers,
   });
 }
+
+// multipart counterpart of fetchByReactivated; the browser sets the Content-Type boundary
+export function postFormDataByReactivated<T>(
+  url: string,
+  csrfToken: string,
+  formData: FormData
+): ApiPromise<T> {
+  return fetch(url, {
+    method: "POST",
+    body: formData,
+    headers: {
+      Accept: "application/json",
+      "X-CSRFToken": csrfToken,
+    },
+  });
+}
@@ -39,21 +39,23 @@ export function postNewProductLocation(
   });
 }
 
+// results are ranked best match first and paginated; see `has_next` in the response
 export function getRelatedProducts(
   productName: string,
-  storeId: number
+  storeId: number,
+  page = 1
 ): Promise<ApiResponse<interfaces.MatchingProducts>> {
   const headers = {
     Accept: "application/json",
   };
 
-  return fetch(
-    reverse("product_locator:get_product_locations_by_name", {
-      store_id: storeId,
-      product_name: productName,
-    }),
-    { headers: headers }
-  );
+  const url = reverse("product_locator:get_product_locations_by_name", {
+    store_id: storeId,
+    product_name: productName,
+  });
+  return fetch(`${url}?${new URLSearchParams({ page: page.toString() }).toString()}`, {
+    headers: headers,
+  });
 }
 
 export function postToScanAudit(
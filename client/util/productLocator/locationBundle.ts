@@ -0,0 +1,119 @@
+import { interfaces, reverse } from "@reactivated";
+
+import { ApiResponse } from "@client/types";
+import { getProductLocation } from "@client/util/productLocator";
+
+type TLocationBundle = interfaces.IStoreLocationBundle;
+type TProductLocations = interfaces.IProductLocations;
+
+const LOCALSTORAGE_LOCATION_BUNDLE_KEY_PREFIX = "product_locator_location_bundle_";
+
+function getStorageKey(storeId: number): string {
+  return LOCALSTORAGE_LOCATION_BUNDLE_KEY_PREFIX + storeId.toString();
+}
+
+export function loadLocationBundle(storeId: number): TLocationBundle | null {
+  const storedBundle = localStorage.getItem(getStorageKey(storeId));
+  return storedBundle === null ? null : (JSON.parse(storedBundle) as TLocationBundle);
+}
+
+// Brings the store's saved location bundle up to date: downloads it in full the first time, and
+// only what changed since the saved version after that. Resolves to the up to date bundle, or to
+// the saved one (possibly null) if the server can't be reached.
+export async function syncLocationBundle(storeId: number): Promise<TLocationBundle | null> {
+  const savedBundle = loadLocationBundle(storeId);
+
+  const headers: Record<string, string> = { Accept: "application/json" };
+  let url = reverse("product_locator:get_store_location_bundle", { store_id: storeId });
+  if (savedBundle !== null) {
+    headers["If-None-Match"] = `"${savedBundle.version}"`;
+    url += "?" + new URLSearchParams({ since: savedBundle.version }).toString();
+  }
+
+  try {
+    const resp: ApiResponse<TLocationBundle> = await fetch(url, { headers: headers });
+    if (resp.status === 304 || !resp.ok) {
+      return savedBundle;
+    }
+
+    const receivedBundle = await resp.json();
+    const bundle =
+      savedBundle !== null && receivedBundle.base_version === savedBundle.version
+        ? applyLocationBundleDelta(savedBundle, receivedBundle)
+        : receivedBundle;
+
+    localStorage.setItem(getStorageKey(storeId), JSON.stringify(bundle));
+    return bundle;
+  } catch (error) {
+    console.log("Could not sync the location bundle:", error);
+    return savedBundle;
+  }
+}
+
+function applyLocationBundleDelta(
+  bundle: TLocationBundle,
+  delta: TLocationBundle
+): TLocationBundle {
+  const staleLocationIds = new Set([
+    ...delta.removed_location_ids,
+    ...delta.locations.map(([pk]) => pk),
+  ]);
+  const staleUpcs = new Set([...delta.removed_upcs, ...delta.products.map(([upc]) => upc)]);
+
+  return {
+    ...delta,
+    base_version: null,
+    locations: [
+      ...bundle.locations.filter(([pk]) => !staleLocationIds.has(pk)),
+      ...delta.locations,
+    ],
+    products: [...bundle.products.filter(([upc]) => !staleUpcs.has(upc)), ...delta.products],
+    removed_location_ids: [],
+    removed_upcs: [],
+  };
+}
+
+export function findProductLocations(
+  bundle: TLocationBundle,
+  upc: string
+): TProductLocations["product"] | null {
+  const product = bundle.products.find(([productUpc]) => productUpc === upc);
+  if (product === undefined) {
+    return null;
+  }
+
+  const [, pk, name, dateCreated, locationIds] = product;
+  const homeLocations = locationIds.flatMap((locationId) => {
+    const location = bundle.locations.find(([pk]) => pk === locationId);
+    const planogram = bundle.planograms.find((planogram) => planogram.pk === location?.[2]);
+    if (location === undefined || planogram === undefined) {
+      return [];
+    }
+
+    return [{ pk: location[0], name: location[1], planogram: planogram }];
+  });
+
+  // newest planogram first, like the server does
+  homeLocations.sort((a, b) => b.planogram.date_start.localeCompare(a.planogram.date_start));
+
+  return { pk: pk, upc: upc, name: name, date_created: dateCreated, home_locations: homeLocations };
+}
+
+// Resolves a scan from the store's location bundle if it has the product, without a round trip,
+// and from the server otherwise (e.g. for products that aren't located in the store)
+export function resolveProductLocation(
+  bundle: TLocationBundle | null,
+  upc: string,
+  storeId: number
+): Promise<ApiResponse<TProductLocations>> {
+  const product = bundle === null ? null : findProductLocations(bundle, upc);
+  if (product === null) {
+    return getProductLocation(upc, storeId, reverse("product_locator:get_product_location"));
+  }
+
+  return Promise.resolve(
+    new Response(JSON.stringify({ product: product }), {
+      headers: { "Content-Type": "application/json" },
+    })
+  );
+}
@@ -36,4 +36,6 @@ export interface BasicBarcodeSheet {
 export interface TPaginatedResponse<T> {
   results: T[];
   has_next: boolean;
+  // cursor to fetch the next page with; null on the last page
+  next_cursor: string | null;
 }
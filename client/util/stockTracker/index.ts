@@ -35,7 +35,7 @@ export function getProductAdditions(
   csrfToken: string,
   payloadData: {
     store_id: number;
-    page: number; // page number which to fetch
+    cursor: string; // previous page's next_cursor, or empty for the first page
     product_name?: string; // optional substring filter on the associated Product's name
     brand_parent_company_ids?: string; // optional comma-separated BrandParentCompany pks
   }
@@ -59,7 +59,7 @@ export function getProductAdditions(
 export function getBarcodeSheets(
   csrfToken: string,
   payloadData: {
-    page: number; // page number which to fetch
+    cursor: string; // previous page's next_cursor, or empty for the first page
     field_representative_id?: number; // optional FieldRepresentative pk to filter by
   }
 ): Promise<ApiResponse<TPaginatedResponse<BasicBarcodeSheet>>> {
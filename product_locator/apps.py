@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProductLocatorConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "product_locator"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401 -- registers signal receivers
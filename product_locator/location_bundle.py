@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.cache import caches
+
+from server.utils.cache import CACHE_BACKEND_ERRORS
+
+from .location_cache import LOCATION_CACHE_TIMEOUT_SECONDS, get_store_key, location_cache
+from .models import HomeLocation, Planogram, Product
+from .types import IBundlePlanogram, ILocationBundle, TBundleLocation, TBundleProduct
+
+logger = logging.getLogger("main_logger")
+
+# Each version of a store's bundle is kept in the shared cache under its version (a hash of its
+# contents) for this long, so that clients holding it can be sent a delta to the current one.
+# The current version of each store is kept in `location_cache` under the store's generation, and
+# so is recomputed after any location change in the store.
+LOCATION_BUNDLE_SNAPSHOT_TIMEOUT_SECONDS = 14 * 24 * 60 * 60
+LOCATION_BUNDLE_SNAPSHOT_KEY_TEMPLATE = "location_bundle:{store_id}:{version}"
+LOCATION_BUNDLE_VERSION_LENGTH = 20
+
+
+def build_location_bundle(store_id: int) -> ILocationBundle:
+    """The full location bundle of a store, read with one query per table."""
+    planograms: list[IBundlePlanogram] = [
+        {
+            "pk": planogram.pk,
+            "name": planogram.name,
+            "date_start": planogram.date_start.isoformat(),
+            "date_end": planogram.date_end.isoformat() if planogram.date_end else None,
+            "plano_type_info": planogram.plano_type_info._asdict(),  # type: ignore [typeddict-item]
+        }
+        for planogram in Planogram.objects.filter(store__pk=store_id).order_by("pk")
+    ]
+    locations: list[TBundleLocation] = list(
+        HomeLocation.objects.filter(planogram__store__pk=store_id)
+        .order_by("pk")
+        .values_list("pk", "name", "planogram_id")
+    )
+
+    location_rows = (
+        Product.home_locations.through.objects.filter(homelocation__planogram__store__pk=store_id)
+        .order_by("product_id", "homelocation_id")
+        .values_list(
+            "product__upc",
+            "product_id",
+            "product__name",
+            "product__date_created",
+            "homelocation_id",
+        )
+    )
+    products: list[TBundleProduct] = [
+        (upc, product_id, name, date_created.isoformat(), [row[4] for row in rows])
+        for (upc, product_id, name, date_created), rows in groupby(
+            location_rows.iterator(), key=itemgetter(0, 1, 2, 3)
+        )
+    ]
+
+    contents = json.dumps([planograms, locations, products], separators=(",", ":"))
+    return {
+        "store_id": store_id,
+        "version": hashlib.sha256(contents.encode()).hexdigest()[:LOCATION_BUNDLE_VERSION_LENGTH],
+        "base_version": None,
+        "planograms": planograms,
+        "locations": locations,
+        "products": products,
+        "removed_location_ids": [],
+        "removed_upcs": [],
+    }
+
+
+def get_location_bundle_version(store_id: int) -> str:
+    version: str | None = location_cache.get(_get_version_key(store_id))
+    if version is None:
+        version = _refresh_location_bundle(store_id)["version"]
+    return version
+
+
+def get_location_bundle(store_id: int, since_version: str | None = None) -> ILocationBundle:
+    """
+    The current location bundle of a store, as a delta from `since_version` if that version is
+    still known, and in full otherwise.
+    """
+    version = location_cache.get(_get_version_key(store_id))
+    bundle = None if version is None else _get_snapshot(store_id, version)
+    if bundle is None:
+        bundle = _refresh_location_bundle(store_id)
+
+    if since_version is None or since_version == bundle["version"]:
+        return bundle
+
+    old_bundle = _get_snapshot(store_id, since_version)
+    if old_bundle is None:
+        return bundle
+    return diff_location_bundles(old_bundle, bundle)
+
+
+def diff_location_bundles(old: ILocationBundle, new: ILocationBundle) -> ILocationBundle:
+    """The delta that turns the full bundle `old` into the full bundle `new`."""
+    old_locations = set(map(tuple, old["locations"]))
+    new_location_ids = {location[0] for location in new["locations"]}
+    old_products = {product[0]: product for product in old["products"]}
+    new_upcs = {product[0] for product in new["products"]}
+
+    return {
+        **new,
+        "base_version": old["version"],
+        "locations": [loc for loc in new["locations"] if tuple(loc) not in old_locations],
+        "products": [
+            product for product in new["products"] if old_products.get(product[0]) != product
+        ],
+        "removed_location_ids": [
+            location[0] for location in old["locations"] if location[0] not in new_location_ids
+        ],
+        "removed_upcs": [upc for upc in old_products if upc not in new_upcs],
+    }
+
+
+def _refresh_location_bundle(store_id: int) -> ILocationBundle:
+    bundle = build_location_bundle(store_id)
+    snapshot_key = LOCATION_BUNDLE_SNAPSHOT_KEY_TEMPLATE.format(
+        store_id=store_id, version=bundle["version"]
+    )
+    try:
+        caches["default"].set(snapshot_key, bundle, LOCATION_BUNDLE_SNAPSHOT_TIMEOUT_SECONDS)
+    except CACHE_BACKEND_ERRORS:
+        logger.warning("Could not save location bundle %s", snapshot_key, exc_info=True)
+
+    location_cache.set(
+        _get_version_key(store_id), bundle["version"], LOCATION_CACHE_TIMEOUT_SECONDS
+    )
+    return bundle
+
+
+def _get_snapshot(store_id: int, version: str) -> ILocationBundle | None:
+    snapshot_key = LOCATION_BUNDLE_SNAPSHOT_KEY_TEMPLATE.format(store_id=store_id, version=version)
+    try:
+        return caches["default"].get(snapshot_key)  # type: ignore [no-any-return]
+    except CACHE_BACKEND_ERRORS:
+        logger.warning("Could not read location bundle %s", snapshot_key, exc_info=True)
+        return None
+
+
+def _get_version_key(store_id: int) -> str:
+    return get_store_key(store_id, "bundle_version")
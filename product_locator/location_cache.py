@@ -0,0 +1,146 @@
+import logging
+import threading
+import uuid
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from server.utils.cache import get_app_cache
+
+from .models import HomeLocation, Planogram, Product
+
+logger = logging.getLogger("main_logger")
+
+# Per-store cache of the product locator scanner's UPC lookups, one key per store and UPC, and of
+# the current version of each store's location bundle (see location_bundle). Every key of a store
+# includes the store's generation (a random token), and a change to a store's planograms,
+# locations or products invalidates all of that store's keys at once by replacing its
+# generation: location writes only come in bursts (planogram imports and updates) between long
+# stretches of scanning, so finer-grained invalidation wouldn't buy much. Other stores' keys are
+# left alone. Hit ratio: see the "product_locator" namespace in server.views.cache_stats.
+location_cache = get_app_cache("product_locator")
+
+# bounds how long a lookup can be served stale, should an invalidation ever be missed
+LOCATION_CACHE_TIMEOUT_SECONDS = 10 * 60
+# a store's generation only has to outlive its keys; a missing one is replaced by a new one
+LOCATION_CACHE_GENERATION_TIMEOUT_SECONDS = 24 * 60 * 60
+
+
+class _InvalidationBatch:
+    def __init__(self) -> None:
+        self.store_ids: set[int] = set()
+        self.planogram_ids: set[int] = set()
+
+
+_invalidation_batch = threading.local()
+
+
+def get_store_key(store_id: int, key: str) -> str:
+    """`key` in the store's current generation, i.e. until the store is next invalidated."""
+    generation = location_cache.get_or_set(
+        _get_generation_key(store_id), _new_generation, LOCATION_CACHE_GENERATION_TIMEOUT_SECONDS
+    )
+    return f"store_{store_id}_{generation}_{key}"
+
+
+def _get_generation_key(store_id: int) -> str:
+    return f"store_{store_id}_generation"
+
+
+def _new_generation() -> str:
+    return uuid.uuid4().hex
+
+
+def _get_key(store_id: int, upc: str) -> str:
+    return get_store_key(store_id, f"upc_{upc}")
+
+
+def load_product_locations(store_id: int, upc: str) -> Product | None:
+    """The product with `upc`, with its locations in the store prefetched, newest first."""
+    return (
+        Product.objects.prefetch_related(
+            Prefetch(
+                "home_locations",
+                queryset=HomeLocation.objects.filter(planogram__store__pk=store_id)
+                .select_related("planogram")
+                .order_by("-planogram__date_start"),
+            ),
+        )
+        .filter(upc=upc)
+        .first()
+    )
+
+
+def get_product_locations(store_id: int, upc: str) -> Product | None:
+    """Cached `load_product_locations`. Products that don't exist aren't cached."""
+    key = _get_key(store_id, upc)
+    product: Product | None = location_cache.get(key)
+    if product is not None:
+        return product
+
+    product = load_product_locations(store_id, upc)
+    if product is not None:
+        location_cache.set(key, product, LOCATION_CACHE_TIMEOUT_SECONDS)
+    return product
+
+
+def invalidate_product_locations(
+    *, store_ids: Iterable[int | None] = (), planogram_ids: Iterable[int] = ()
+) -> None:
+    """
+    Invalidate the cached lookups and bundle version of the stores in `store_ids` and of the
+    stores of the planograms in `planogram_ids`, leaving other stores' keys alone. This happens
+    once the current transaction commits (right away outside of one): a lookup that runs before
+    the commit still reads the old locations, and would cache them past an invalidation made
+    before the commit. Planograms are resolved to their stores then too, with one query.
+    """
+    touched_store_ids = {store_id for store_id in store_ids if store_id is not None}
+    touched_planogram_ids = set(planogram_ids)
+
+    batch: _InvalidationBatch | None = getattr(_invalidation_batch, "current", None)
+    if batch is not None:
+        batch.store_ids |= touched_store_ids
+        batch.planogram_ids |= touched_planogram_ids
+        return
+
+    if touched_store_ids or touched_planogram_ids:
+        transaction.on_commit(partial(_invalidate_stores, touched_store_ids, touched_planogram_ids))
+
+
+@contextmanager
+def batched_location_invalidation() -> Iterator[None]:
+    """
+    Invalidate the stores touched by all the location writes in the block at once, instead of
+    once for every signal they send, e.g. the post_delete of each location a bulk delete
+    removes.
+    """
+    if getattr(_invalidation_batch, "current", None) is not None:
+        yield
+        return
+
+    batch = _InvalidationBatch()
+    _invalidation_batch.current = batch
+    try:
+        yield
+    finally:
+        _invalidation_batch.current = None
+        invalidate_product_locations(store_ids=batch.store_ids, planogram_ids=batch.planogram_ids)
+
+
+def _invalidate_stores(store_ids: set[int], planogram_ids: set[int]) -> None:
+    if planogram_ids:
+        store_ids = store_ids.union(
+            Planogram.objects.filter(pk__in=planogram_ids, store__isnull=False).values_list(
+                "store_id", flat=True
+            )
+        )
+
+    for store_id in store_ids:
+        location_cache.set(
+            _get_generation_key(store_id),
+            _new_generation(),
+            LOCATION_CACHE_GENERATION_TIMEOUT_SECONDS,
+        )
@@ -0,0 +1,146 @@
+import logging
+import random
+import statistics
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import partial
+from typing import Any
+
+from checkdigit import gs1
+from django.core.management.base import BaseCommand, CommandParser
+
+from product_locator.planogram_parser import (
+    IParseErrors,
+    is_valid_gs1_check_digit,
+    iter_products,
+    parse_data,
+)
+
+SYNTHETIC_NAME_WORDS = ("Cat", "Box", "Happy", "Birthday", "Slice", "Arch", "Babe", "Again")
+# share of each kind of line in a synthetic dump; see get_synthetic_dump
+SYNTHETIC_LINE_WEIGHTS = {"item": 80, "location_first": 15, "noise": 5}
+SYNTHETIC_INVALID_UPC_RATIO = 0.1
+
+
+class Command(BaseCommand):
+    help = (
+        "Time planogram_parser.iter_products and parse_data on synthetic OCR dumps of multi-bay "
+        "planograms, and the inline GS1 check digit validation against checkdigit's gs1.validate"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--lines",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000, 50_000],
+            help="Dump sizes to time, in lines",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per dump size")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *_args: Any, **options: Any) -> None:
+        rng = random.Random(options["seed"])  # noqa: S311 -- synthetic data, not crypto
+        repeat: int = options["repeat"]
+
+        for num_lines in options["lines"]:
+            dump = get_synthetic_dump(rng, num_lines)
+            product_list: list[Any] = []
+
+            def run(dump: str = dump) -> None:
+                nonlocal product_list
+                product_list, _errors = parse_data(dump)
+
+            iter_median_ms = self.time_it(partial(parse_products, dump), repeat)
+            # parse_data logs every parse error, which would time writing the log file too
+            with silenced_logger("main_logger"):
+                median_ms = self.time_it(run, repeat)
+            self.stdout.write(
+                f"{num_lines:>8} lines: iter_products median {iter_median_ms:.1f} ms "
+                f"({num_lines / iter_median_ms * 1000:,.0f} lines/s), parse_data median "
+                f"{median_ms:.1f} ms, {len(product_list)} products parsed"
+            )
+
+        upcs = [
+            get_upc(rng, is_valid=rng.random() >= SYNTHETIC_INVALID_UPC_RATIO)
+            for _ in range(100_000)
+        ]
+        validators: list[tuple[str, Callable[[str], bool]]] = [
+            ("checkdigit gs1.validate", gs1.validate),
+            ("is_valid_gs1_check_digit", is_valid_gs1_check_digit),
+        ]
+        for name, validate in validators:
+            median_ms = self.time_it(partial(validate_all, validate, upcs), repeat)
+            self.stdout.write(f"{name:>25}: median {median_ms:.1f} ms for {len(upcs)} UPCs")
+
+    def time_it(self, func: Callable[[], Any], repeat: int) -> float:
+        """Median wall time of `repeat` calls to `func`, in milliseconds."""
+        timings_ms = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            func()
+            timings_ms.append((time.perf_counter() - start_time) * 1000)
+
+        return statistics.median(timings_ms)
+
+
+@contextmanager
+def silenced_logger(name: str) -> Iterator[None]:
+    logger = logging.getLogger(name)
+    was_disabled = logger.disabled
+    logger.disabled = True
+    try:
+        yield
+    finally:
+        logger.disabled = was_disabled
+
+
+def parse_products(dump: str) -> list[Any]:
+    return list(iter_products(dump, IParseErrors(lines_not_matched=[], invalid_upcs=[])))
+
+
+def validate_all(validate: Callable[[str], bool], upcs: list[str]) -> list[bool]:
+    return list(map(validate, upcs))
+
+
+def get_synthetic_dump(rng: random.Random, num_lines: int) -> str:
+    """
+    A dump in the shape of OCR'd planograms: mostly "<name> <upc> <location>" lines, with some
+    multi-item "<location> Section <n> <upc> <name>" lines and some lines of OCR noise.
+    """
+    lines = []
+    for _ in range(num_lines):
+        [line_type] = rng.choices(
+            list(SYNTHETIC_LINE_WEIGHTS), weights=list(SYNTHETIC_LINE_WEIGHTS.values())
+        )
+        if line_type == "item":
+            lines.append(f"{get_name(rng)}\t{get_upc(rng)}\t{get_location(rng)}")
+        elif line_type == "location_first":
+            lines.append(
+                " ".join(
+                    f"{get_location(rng)} Section {rng.randint(1, 9)} {get_upc(rng)} "
+                    f"{get_name(rng)}"
+                    for _ in range(rng.randint(1, 4))
+                )
+            )
+        else:
+            lines.append(get_name(rng))
+
+    return "\n".join(lines)
+
+
+def get_name(rng: random.Random) -> str:
+    return " ".join(rng.choices(SYNTHETIC_NAME_WORDS, k=rng.randint(1, 4)))
+
+
+def get_location(rng: random.Random) -> str:
+    return f"{rng.choice('ABCDEFGH')}{rng.randint(1, 30)}"
+
+
+def get_upc(rng: random.Random, *, is_valid: bool = True) -> str:
+    upc_body = "".join(rng.choices("0123456789", k=11))
+    check_digit = int(gs1.calculate(upc_body))
+    if not is_valid:
+        check_digit = (check_digit + 1) % 10
+    return f"{upc_body}{check_digit}"
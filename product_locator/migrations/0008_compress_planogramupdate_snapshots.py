@@ -0,0 +1,80 @@
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.state import StateApps
+
+import server.utils.fields
+
+
+def copy_json_to_compressed(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    PlanogramUpdate = apps.get_model("product_locator", "PlanogramUpdate")
+    for planogram_update in PlanogramUpdate.objects.only("old_plano_json", "new_plano_json"):
+        planogram_update.old_plano = planogram_update.old_plano_json
+        planogram_update.new_plano = planogram_update.new_plano_json
+        planogram_update.save(update_fields=["old_plano", "new_plano"])
+
+
+def copy_compressed_to_json(apps: StateApps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    PlanogramUpdate = apps.get_model("product_locator", "PlanogramUpdate")
+    for planogram_update in PlanogramUpdate.objects.only("old_plano", "new_plano"):
+        planogram_update.old_plano_json = planogram_update.old_plano
+        planogram_update.new_plano_json = planogram_update.new_plano
+        planogram_update.save(update_fields=["old_plano_json", "new_plano_json"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_locator', '0007_planogramupdate_is_applied'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='planogramupdate',
+            old_name='old_plano',
+            new_name='old_plano_json',
+        ),
+        migrations.RenameField(
+            model_name='planogramupdate',
+            old_name='new_plano',
+            new_name='new_plano_json',
+        ),
+        migrations.AlterField(
+            model_name='planogramupdate',
+            name='old_plano_json',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='planogramupdate',
+            name='new_plano_json',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='planogramupdate',
+            name='old_plano',
+            field=server.utils.fields.CompressedJSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='planogramupdate',
+            name='new_plano',
+            field=server.utils.fields.CompressedJSONField(null=True),
+        ),
+        migrations.RunPython(copy_json_to_compressed, copy_compressed_to_json),
+        migrations.RemoveField(
+            model_name='planogramupdate',
+            name='old_plano_json',
+        ),
+        migrations.RemoveField(
+            model_name='planogramupdate',
+            name='new_plano_json',
+        ),
+        migrations.AlterField(
+            model_name='planogramupdate',
+            name='old_plano',
+            field=server.utils.fields.CompressedJSONField(),
+        ),
+        migrations.AlterField(
+            model_name='planogramupdate',
+            name='new_plano',
+            field=server.utils.fields.CompressedJSONField(),
+        ),
+    ]
@@ -1,13 +1,18 @@
-from typing import Any, Literal, NamedTuple, cast
+from typing import Any, NamedTuple, cast
 
 from checkdigit import gs1
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 from products.types import UPC_A_LENGTH
+from server.utils.fields import CompressedJSONField
 from server.utils.typedefs import CommonModel
 
+from .types import TPlanoTypeValue
+
 
 class Store(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -16,9 +21,6 @@ class Store(models.Model):
         return self.name
 
 
-TPlanoTypeValue = Literal["inline", "seasonal", "other"]
-
-
 class Planogram(models.Model):
     class TPlanoType(NamedTuple):
         value: TPlanoTypeValue
@@ -82,6 +84,12 @@ class Product(models.Model):
     home_locations = models.ManyToManyField(HomeLocation, related_name="products")
     date_created = models.DateField(null=False, blank=False, default=timezone.now)
 
+    class Meta:
+        indexes = (
+            # for name__icontains, which compares UPPER(name)
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="pl_product_name_trgm"),
+        )
+
     def __str__(self) -> str:
         return f"{self.upc} {self.name}"
 
@@ -124,8 +132,9 @@ class PlanogramUpdate(CommonModel):
     planogram = models.ForeignKey(
         Planogram, on_delete=models.CASCADE, related_name="planogram_updates"
     )
-    old_plano = models.JSONField()
-    new_plano = models.JSONField()
+    # TPlanoSnapshot dicts; see CompressedJSONField
+    old_plano = CompressedJSONField()
+    new_plano = CompressedJSONField()
     is_applied = models.BooleanField(default=False)
 
     def __str__(self) -> str:
@@ -1,6 +1,7 @@
 import logging
 import re
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
+from typing import NamedTuple
 
 from checkdigit import gs1
 from natsort import natsorted
@@ -37,69 +38,116 @@ COMMON_OCR_CHAR_ERRORS = {
 }
 
 
+class IParseErrors(NamedTuple):
+    lines_not_matched: list[str]
+    invalid_upcs: list[str]
+
+
 def parse_data(
     planogram_text_dump: str,
 ) -> tuple[list[IImportedProductInfo], list[str]]:
-    product_list: list[IImportedProductInfo] = []
-    lines_not_matched: list[str] = []
-    invalid_upcs: list[str] = []
-    errors: list[str] = []
+    parse_errors = IParseErrors(lines_not_matched=[], invalid_upcs=[])
+    product_list = list(iter_products(planogram_text_dump, parse_errors))
+    errors = get_error_messages(parse_errors)
 
-    for line in planogram_text_dump.strip().split("\n"):
-        location_first_matches = list(LOCATION_FIRST_ITEM_ATTRIBUTES_RE.finditer(line))
-        if location_first_matches:
-            for match in location_first_matches:
-                location = match.group(1)
-                upc = match.group(2).strip()
-                name = match.group(3)
-
-                if not gs1.validate(upc):
-                    invalid_upcs.append(upc)
-                    continue
-
-                product_list.append(
-                    {
-                        "upc": upc,
-                        "name": name.strip(),
-                        "location": fix_location_ocr_inaccuracies(location.strip()),
-                    }
-                )
-            continue
+    # assert_unique(product_list, "upc", key=lambda e: e["upc"])
+    # assert_unique(product_list, "location", key=lambda e: e["location"])
 
-        matches = list(ITEM_ATTRIBUTES_RE.finditer(line))
-        if not matches:
-            lines_not_matched.append(line)
-            continue
+    return sort_by_location(product_list), errors
 
-        for match in matches:
-            name = match.group(1)
-            upc = match.group(2).strip()
-            location = match.group(3)
 
-            if not gs1.validate(upc):
-                invalid_upcs.append(upc)
-                continue
+def sort_by_location(product_list: list[IImportedProductInfo]) -> list[IImportedProductInfo]:
+    return natsorted(product_list, key=lambda p: p["location"], reverse=True)
+
 
-            product_list.append(
-                {
-                    "upc": upc,
-                    "name": name.strip(),
-                    "location": fix_location_ocr_inaccuracies(location.strip()),
-                }
-            )
+def get_error_messages(parse_errors: IParseErrors) -> list[str]:
+    errors: list[str] = []
 
-    for line in lines_not_matched:
+    for line in parse_errors.lines_not_matched:
         logger.info("Regex was not matched on line: '%s'", line)
         errors.append(f"No data was parsed from line: {line}")
 
-    for upc in invalid_upcs:
+    for upc in parse_errors.invalid_upcs:
         logger.info("Invalid UPC check digit: '%s'", upc)
         errors.append(f"Invalid UPC (failed check digit): {upc}")
 
-    # assert_unique(product_list, "upc", key=lambda e: e["upc"])
-    # assert_unique(product_list, "location", key=lambda e: e["location"])
+    return errors
+
+
+def iter_products(
+    planogram_text_dump: str, parse_errors: IParseErrors
+) -> Iterator[IImportedProductInfo]:
+    """Lazily parse the products out of a planogram text dump; see `iter_line_products`."""
+    return iter_line_products(iter_lines(planogram_text_dump.strip()), parse_errors)
+
 
-    return natsorted(product_list, key=lambda p: p["location"], reverse=True), errors
+def iter_line_products(
+    lines: Iterable[str], parse_errors: IParseErrors
+) -> Iterator[IImportedProductInfo]:
+    """
+    Lazily parse the products out of the lines of a planogram text dump, one line at a time,
+    in the order they appear. Lines that don't parse and UPCs that fail their check digit are
+    added to `parse_errors` as they are reached.
+
+    A line is parsed as "<location> Section <n> <upc> <name>" triplets if it has any, and as
+    "<name> <upc> <location>" records otherwise. Only lines that contain "section" are scanned
+    for triplets, since most dumps are entirely in the second format.
+    """
+    for line in lines:
+        matches: Iterator[re.Match[str]] = iter(())
+        location_group, upc_group, name_group = 1, 2, 3
+
+        if "section" in line.casefold():
+            matches = LOCATION_FIRST_ITEM_ATTRIBUTES_RE.finditer(line)
+        first_match = next(matches, None)
+
+        if first_match is None:
+            matches = ITEM_ATTRIBUTES_RE.finditer(line)
+            location_group, upc_group, name_group = 3, 2, 1
+            first_match = next(matches, None)
+
+        if first_match is None:
+            parse_errors.lines_not_matched.append(line)
+            continue
+
+        for match in (first_match, *matches):
+            upc = match.group(upc_group).strip()
+            if not is_valid_gs1_check_digit(upc):
+                parse_errors.invalid_upcs.append(upc)
+                continue
+
+            yield {
+                "upc": upc,
+                "name": match.group(name_group).strip(),
+                "location": fix_location_ocr_inaccuracies(match.group(location_group).strip()),
+            }
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """The lines of `text`, split on newlines, without building a list of them."""
+    start = 0
+    while (end := text.find("\n", start)) != -1:
+        yield text[start:end]
+        start = end + 1
+    yield text[start:]
+
+
+def is_valid_gs1_check_digit(upc: str) -> bool:
+    """
+    Validate the GS1 check digit (the last digit) of an all-digit UPC/EAN: the other digits,
+    weighted 3 and 1 alternately starting from the right, must sum up with it to a multiple of
+    10. Works on the ASCII codes directly, which is several times faster than gs1.validate.
+    """
+    if not upc.isascii():
+        # non-ASCII digits that `\d` matched
+        return gs1.validate(upc)
+
+    codes = upc.encode()
+    weighted_3 = codes[-2::-2]
+    weighted_1 = codes[-3::-2]
+    weighted_sum = 3 * sum(weighted_3) + sum(weighted_1) + codes[-1]
+    # every digit's code is 48 more than its value
+    return (weighted_sum - ord("0") * (3 * len(weighted_3) + len(weighted_1) + 1)) % 10 == 0
 
 
 def assert_unique(
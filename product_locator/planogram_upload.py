@@ -0,0 +1,165 @@
+import codecs
+import logging
+import time
+from collections.abc import Iterator
+from datetime import timedelta
+from typing import Any, TypedDict
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import UploadedFile
+
+from server.utils.cache import CACHE_BACKEND_ERRORS
+
+from . import planogram_parser
+from .types import IImportedProductInfo
+
+logger = logging.getLogger("main_logger")
+
+# Uploaded planogram dumps are read in chunks and parsed a line at a time, so only the parsed
+# products are ever held in memory, never the dump itself. Django spools uploads larger than
+# FILE_UPLOAD_MAX_MEMORY_SIZE to disk, and DATA_UPLOAD_MAX_MEMORY_SIZE doesn't apply to them.
+PLANOGRAM_UPLOAD_MAX_BYTES = 50 * 1024**2
+PLANOGRAM_UPLOAD_CHUNK_SIZE = 64 * 1024
+# lines longer than this are rejected instead of buffered (and run through the parser's regexes)
+PLANOGRAM_UPLOAD_MAX_LINE_LENGTH = 4096
+# parsing stops at this many errors, since nobody reads past the first screenful anyway
+PLANOGRAM_UPLOAD_MAX_ERRORS = 100
+
+UPLOAD_PROGRESS_KEY_TEMPLATE = "planogram_upload_progress_{user_id}_{upload_id}"
+UPLOAD_PROGRESS_TTL = timedelta(hours=1)
+UPLOAD_PROGRESS_WRITE_INTERVAL_SECONDS = 0.5
+
+
+class IUploadProgress(TypedDict):
+    # one of "parsing", "saving", "done", "failed"
+    stage: str
+    bytes_read: int
+    total_bytes: int
+    lines_read: int
+    products_parsed: int
+    num_errors: int
+
+
+class UploadProgress:
+    """
+    Progress of one user's planogram upload, kept in the shared "default" cache (with no
+    per-process copy) so that a progress request served by any process can report it. Writes are
+    throttled to one per UPLOAD_PROGRESS_WRITE_INTERVAL_SECONDS, except for stage changes. Cache
+    errors are logged and otherwise ignored.
+    """
+
+    def __init__(self, user_id: int, upload_id: str, total_bytes: int) -> None:
+        self.key = UPLOAD_PROGRESS_KEY_TEMPLATE.format(user_id=user_id, upload_id=upload_id)
+        self.progress: IUploadProgress = {
+            "stage": "parsing",
+            "bytes_read": 0,
+            "total_bytes": total_bytes,
+            "lines_read": 0,
+            "products_parsed": 0,
+            "num_errors": 0,
+        }
+        self._last_write = 0.0
+
+    def update(self, **changes: Any) -> None:
+        is_stage_change = changes.get("stage", self.progress["stage"]) != self.progress["stage"]
+        self.progress.update(changes)  # type: ignore [typeddict-item]
+
+        now = time.monotonic()
+        if not is_stage_change and now - self._last_write < UPLOAD_PROGRESS_WRITE_INTERVAL_SECONDS:
+            return
+
+        self._last_write = now
+        try:
+            caches["default"].set(self.key, self.progress, UPLOAD_PROGRESS_TTL.total_seconds())
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Could not save planogram upload progress to the cache", exc_info=True)
+
+    @staticmethod
+    def get(user_id: int, upload_id: str) -> IUploadProgress | None:
+        key = UPLOAD_PROGRESS_KEY_TEMPLATE.format(user_id=user_id, upload_id=upload_id)
+        try:
+            progress: IUploadProgress | None = caches["default"].get(key)
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Could not read planogram upload progress from the cache", exc_info=True)
+            return None
+
+        return progress
+
+
+def parse_uploaded_file(
+    uploaded_file: UploadedFile, progress: UploadProgress
+) -> tuple[list[IImportedProductInfo], list[str]]:
+    """
+    Stream an uploaded planogram text dump (UTF-8) through the planogram parser. Returns the
+    parsed products, sorted like `planogram_parser.parse_data`, and the errors found. Blank
+    lines are skipped.
+    """
+    if (uploaded_file.size or 0) > PLANOGRAM_UPLOAD_MAX_BYTES:
+        return [], [
+            f"The uploaded file is larger than the {PLANOGRAM_UPLOAD_MAX_BYTES // 1024**2} MiB limit."
+        ]
+
+    parse_errors = planogram_parser.IParseErrors(lines_not_matched=[], invalid_upcs=[])
+    product_list: list[IImportedProductInfo] = []
+    stop_reason: str | None = None
+
+    def iter_lines_until_error_limit() -> Iterator[str]:
+        nonlocal stop_reason
+        for line_number, line in enumerate(iter_uploaded_lines(uploaded_file, progress), start=1):
+            num_errors = len(parse_errors.lines_not_matched) + len(parse_errors.invalid_upcs)
+            progress.update(
+                lines_read=line_number, products_parsed=len(product_list), num_errors=num_errors
+            )
+            if num_errors >= PLANOGRAM_UPLOAD_MAX_ERRORS:
+                stop_reason = f"Stopped parsing at line {line_number} after {num_errors} errors."
+                return
+
+            if line.strip():
+                yield line
+
+    try:
+        product_list.extend(
+            planogram_parser.iter_line_products(iter_lines_until_error_limit(), parse_errors)
+        )
+    except UnicodeDecodeError:
+        stop_reason = "The uploaded file is not UTF-8 encoded text."
+    except ValueError as ex:
+        stop_reason = str(ex)
+
+    errors = planogram_parser.get_error_messages(parse_errors)
+    if stop_reason is not None:
+        errors.append(stop_reason)
+
+    progress.update(products_parsed=len(product_list), num_errors=len(errors))
+    return planogram_parser.sort_by_location(product_list), errors
+
+
+def iter_uploaded_lines(uploaded_file: UploadedFile, progress: UploadProgress) -> Iterator[str]:
+    """
+    Decode and split an uploaded file into lines a chunk at a time, without line endings.
+    Raises ValueError for a line longer than PLANOGRAM_UPLOAD_MAX_LINE_LENGTH.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    bytes_read = 0
+    partial_line = ""
+
+    def check_line_length(line: str) -> str:
+        if len(line) > PLANOGRAM_UPLOAD_MAX_LINE_LENGTH:
+            raise ValueError(
+                f"A line starting with '{line[:40]}' is longer than the "
+                f"{PLANOGRAM_UPLOAD_MAX_LINE_LENGTH} character limit."
+            )
+        return line.removesuffix("\r")
+
+    for chunk in uploaded_file.chunks(PLANOGRAM_UPLOAD_CHUNK_SIZE):
+        bytes_read += len(chunk)
+        progress.update(bytes_read=bytes_read)
+
+        *lines, partial_line = (partial_line + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield check_line_length(line)
+        check_line_length(partial_line)
+
+    partial_line += decoder.decode(b"", final=True)
+    if partial_line:
+        yield check_line_length(partial_line)
@@ -0,0 +1,77 @@
+from typing import Any
+
+from django.db.models import Model, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .location_cache import invalidate_product_locations
+from .models import HomeLocation, Planogram, Product, Store
+
+
+def get_product_store_ids(product: Product) -> QuerySet[Store, int]:
+    return Store.objects.filter(planograms__locations__products=product).values_list(
+        "pk", flat=True
+    )
+
+
+@receiver([post_save, post_delete], sender=HomeLocation)
+def invalidate_home_location(
+    instance: HomeLocation, origin: Model | QuerySet[Any] | None = None, **_kwargs: Any
+) -> None:
+    # deleting a store or planogram cascades to each of its locations, and the store or
+    # planogram's own post_delete already invalidated the cache once
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model in (Store, Planogram):
+        return
+
+    invalidate_product_locations(planogram_ids=[instance.planogram_id])
+
+
+@receiver(m2m_changed, sender=Product.home_locations.through)
+def invalidate_product_home_locations(
+    instance: Product | HomeLocation,
+    action: str,
+    pk_set: set[int] | None,
+    **_kwargs: Any,
+) -> None:
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if isinstance(instance, HomeLocation):
+        invalidate_product_locations(planogram_ids=[instance.planogram_id])
+    elif action == "pre_clear":
+        # the product's locations are still there to find its stores by
+        invalidate_product_locations(store_ids=get_product_store_ids(instance))
+    else:
+        invalidate_product_locations(
+            planogram_ids=HomeLocation.objects.filter(pk__in=pk_set or ()).values_list(
+                "planogram_id", flat=True
+            )
+        )
+
+
+@receiver(pre_save, sender=Planogram)
+def invalidate_moved_planogram(instance: Planogram, **_kwargs: Any) -> None:
+    # moving a planogram to another store also changes the store it leaves
+    if instance.pk is None:
+        return
+
+    old_store_ids = Planogram.objects.filter(pk=instance.pk).exclude(store=instance.store_id)
+    invalidate_product_locations(store_ids=old_store_ids.values_list("store_id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Store)
+def invalidate_store(instance: Store, **_kwargs: Any) -> None:
+    invalidate_product_locations(store_ids=[instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Planogram)
+def invalidate_planogram(instance: Planogram, **_kwargs: Any) -> None:
+    invalidate_product_locations(store_ids=[instance.store_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def invalidate_product(instance: Product, **_kwargs: Any) -> None:
+    # before a delete, while the product's locations are still there to find its stores by
+    invalidate_product_locations(store_ids=get_product_store_ids(instance))
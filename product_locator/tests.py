@@ -1,14 +1,32 @@
+import json
 from pathlib import Path
+from typing import Any
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.urls import reverse
 
-from . import models
+from server.utils.testing import LocMemCacheTestCase
 
+from . import models, planogram_upload, util
+from .location_bundle import get_location_bundle, get_location_bundle_version
+from .location_cache import batched_location_invalidation, get_product_locations
+from .planogram_parser import IParseErrors, iter_products, parse_data
+from .planogram_upload import (
+    PLANOGRAM_UPLOAD_MAX_ERRORS,
+    PLANOGRAM_UPLOAD_MAX_LINE_LENGTH,
+    UploadProgress,
+    iter_uploaded_lines,
+    parse_uploaded_file,
+)
+from .types import IImportedProductInfo, IPlanoSnapshotDiff
 
-class ImportTest(TestCase):
+
+class ImportTest(LocMemCacheTestCase):
     def setUp(self) -> None:
+        super().setUp()
         file = Path(__file__).parent / "testfiles" / "ocr_data_dump.txt"
 
         with file.open(encoding="utf8") as fd:
@@ -34,6 +52,57 @@ class ImportTest(TestCase):
         )
         self.assertEqual(200, response.status_code)
 
+    def upload(self, planogram: models.Planogram, content: bytes) -> tuple[int, Any]:
+        """Upload `content` as a planogram dump, returning the status code and the JSON body."""
+        response = self.client.post(
+            reverse("product_locator:upload_planogram_products"),
+            {
+                "planogram_file": SimpleUploadedFile("dump.txt", content),
+                "payload": json.dumps(
+                    {
+                        "planogram_id": planogram.id,
+                        "is_reset_planogram": False,
+                        "label": "",
+                        "upload_id": "test-upload",
+                    }
+                ),
+            },
+            headers={"Accept": "application/json"},
+        )
+        return response.status_code, response.json()
+
+    def get_upload_progress(self) -> dict[str, Any]:
+        response = self.client.get(
+            reverse("product_locator:get_planogram_upload_progress", args=["test-upload"]),
+            headers={"Accept": "application/json"},
+        )
+        self.assertEqual(200, response.status_code)
+        progress: dict[str, Any] = response.json()
+        return progress
+
+    def test_upload_import(self) -> None:
+        store = models.Store.objects.create(name="T3277v3")
+        planogram = models.Planogram.objects.create(name="plano1 - 3277v3", store=store)
+
+        status_code, response_data = self.upload(planogram, self.data_dump.encode())
+        self.assertEqual(200, status_code)
+        self.assertEqual(response_data["num_products_parsed"], len(parse_data(self.data_dump)[0]))
+
+        progress = self.get_upload_progress()
+        self.assertEqual(progress["stage"], "done")
+        self.assertEqual(progress["bytes_read"], len(self.data_dump.encode()))
+
+    def test_failed_upload_import(self) -> None:
+        store = models.Store.objects.create(name="T3277v4")
+        planogram = models.Planogram.objects.create(name="plano1 - 3277v4", store=store)
+
+        status_code, _response_data = self.upload(planogram, b"some random data")
+        self.assertEqual(400, status_code)
+
+        progress = self.get_upload_progress()
+        self.assertEqual(progress["stage"], "failed")
+        self.assertEqual(progress["num_errors"], 1)
+
     def test_invalid_import(self) -> None:
         store = models.Store.objects.create(name="T3277v2")
         planogram = models.Planogram.objects.create(name="plano1 - 3277v2", store=store)
@@ -50,3 +119,412 @@ class ImportTest(TestCase):
             content_type="application/json",
         )
         self.assertEqual(400, response.status_code)
+
+
+class PlanogramUploadTest(LocMemCacheTestCase):
+    def parse(self, content: bytes) -> tuple[list[IImportedProductInfo], list[str]]:
+        uploaded_file = SimpleUploadedFile("dump.txt", content)
+        progress = UploadProgress(user_id=1, upload_id="test-upload", total_bytes=len(content))
+        return parse_uploaded_file(uploaded_file, progress)
+
+    def test_line_length_limit(self) -> None:
+        product_list, errors = self.parse(
+            b"Cat Box 843740198695 A1\n" + b"x" * (PLANOGRAM_UPLOAD_MAX_LINE_LENGTH + 1)
+        )
+
+        self.assertEqual(len(product_list), 1)
+        self.assertEqual(
+            errors,
+            [
+                (
+                    f"A line starting with '{'x' * 40}' is longer than the "
+                    f"{PLANOGRAM_UPLOAD_MAX_LINE_LENGTH} character limit."
+                )
+            ],
+        )
+
+    def test_error_limit(self) -> None:
+        product_list, errors = self.parse(b"Happy Birthday\n" * (PLANOGRAM_UPLOAD_MAX_ERRORS * 2))
+
+        self.assertEqual(product_list, [])
+        self.assertEqual(len(errors), PLANOGRAM_UPLOAD_MAX_ERRORS + 1)
+        self.assertEqual(
+            errors[-1],
+            f"Stopped parsing at line {PLANOGRAM_UPLOAD_MAX_ERRORS + 1} after "
+            f"{PLANOGRAM_UPLOAD_MAX_ERRORS} errors.",
+        )
+
+    def test_not_utf8(self) -> None:
+        product_list, errors = self.parse("Cat Box 843740198695 A1\n".encode("utf-16"))
+
+        self.assertEqual(product_list, [])
+        self.assertEqual(errors, ["The uploaded file is not UTF-8 encoded text."])
+
+    def test_lines_split_across_chunks(self) -> None:
+        content = "Caf\u00e9 Box\t843740198695\tA1\r\nCat Box\t843740135607\tA2\r\n".encode()
+        progress = UploadProgress(user_id=1, upload_id="test-upload", total_bytes=len(content))
+
+        # every chunk size splits some "\r\n" or the 2-byte "\u00e9" at a chunk boundary
+        for chunk_size in range(1, len(content) + 1):
+            with mock.patch.object(planogram_upload, "PLANOGRAM_UPLOAD_CHUNK_SIZE", chunk_size):
+                lines = list(iter_uploaded_lines(SimpleUploadedFile("dump.txt", content), progress))
+            self.assertEqual(
+                lines,
+                ["Caf\u00e9 Box\t843740198695\tA1", "Cat Box\t843740135607\tA2"],
+                f"chunk size {chunk_size}",
+            )
+
+
+class PlanogramParserTest(TestCase):
+    def test_mixed_formats(self) -> None:
+        product_list, errors = parse_data(
+            "A1 Section 1 843740198695 Cat BoX H1 Section 1 843740135607 Spectacular\n"
+            "Big Slice\t843740198435\tA4\n"
+            "Big Slice\t843740198436\tA5\n"
+            "some random data"
+        )
+
+        self.assertEqual(
+            [(p["upc"], p["name"], p["location"]) for p in product_list],
+            [
+                ("843740135607", "Spectacular", "H1"),
+                ("843740198435", "Big Slice", "A4"),
+                ("843740198695", "Cat BoX", "A1"),
+            ],
+        )
+        self.assertEqual(
+            errors,
+            [
+                "No data was parsed from line: some random data",
+                "Invalid UPC (failed check digit): 843740198436",
+            ],
+        )
+
+    def test_iter_products_is_lazy(self) -> None:
+        parse_errors = IParseErrors(lines_not_matched=[], invalid_upcs=[])
+        products = iter_products("Big Slice\t843740198435\tA4\nsome random data", parse_errors)
+
+        self.assertEqual(next(products)["upc"], "843740198435")
+        self.assertEqual(parse_errors.lines_not_matched, [])
+        self.assertEqual(list(products), [])
+        self.assertEqual(parse_errors.lines_not_matched, ["some random data"])
+
+
+class AddLocationRecordsTest(TestCase):
+    def setUp(self) -> None:
+        store = models.Store.objects.create(name="T3277")
+        self.planogram = models.Planogram.objects.create(name="plano1 - 3277", store=store)
+
+        file = Path(__file__).parent / "testfiles" / "ocr_data_dump.txt"
+        self.product_list, _errors = parse_data(file.read_text(encoding="utf8"))
+
+    def test_query_count_is_constant(self) -> None:
+        models.Product.objects.create(upc=self.product_list[0]["upc"], name="existing")
+
+        # lookup, savepoint, products, locations, location lookup, relations, release savepoint
+        with self.assertNumQueries(7):
+            num_products_added, errors = util.add_location_records(
+                self.product_list, self.planogram
+            )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(num_products_added, len(self.product_list))
+        self.assertEqual(models.Product.objects.count(), len(self.product_list))
+        self.assertEqual(
+            models.Product.home_locations.through.objects.filter(
+                homelocation__planogram=self.planogram
+            ).count(),
+            len(self.product_list),
+        )
+
+    def test_invalid_product_writes_nothing(self) -> None:
+        num_products_added, errors = util.add_location_records(
+            [*self.product_list, {"upc": "123456789013", "name": "Invalid", "location": "A1"}],
+            self.planogram,
+        )
+
+        self.assertEqual(num_products_added, 0)
+        self.assertEqual(len(errors), 1)
+        self.assertFalse(models.Product.objects.exists())
+        self.assertFalse(self.planogram.locations.exists())
+
+
+class ApplyPlanogramUpdateTest(TestCase):
+    def test_diff_plano_snapshots(self) -> None:
+        old_plano = {
+            "A1": {"upc": "843740198695", "name": "Cat Box"},
+            "A2": {"upc": "843740135607", "name": "Spectacular"},
+            "A3": {"upc": "843740198435", "name": "Big Slice"},
+            "A4": {"upc": "843740118655", "name": "Aisle Arch"},
+        }
+        new_plano = {
+            "A1": {"upc": "843740135607", "name": "Spectacular"},
+            "A2": {"upc": "843740198695", "name": "Cat Box"},
+            "A4": {"upc": "843740118655", "name": "Aisle Arch 2"},
+            "A5": {"upc": "843740199319", "name": "A Day"},
+        }
+
+        self.assertEqual(
+            util.diff_plano_snapshots(old_plano, new_plano),  # type: ignore [arg-type]
+            IPlanoSnapshotDiff(
+                added=["A5"],
+                removed=["A3"],
+                replaced=["A1", "A2"],
+                moved=["A1", "A2"],
+                renamed=["A4"],
+            ),
+        )
+
+    def test_snapshot_is_one_query(self) -> None:
+        store = models.Store.objects.create(name="T3277")
+        planogram = models.Planogram.objects.create(name="plano1 - 3277", store=store)
+        product_list = [
+            {"upc": "843740198695", "name": "Cat Box", "location": "A1"},
+            {"upc": "843740135607", "name": "Spectacular", "location": "A2"},
+        ]
+        util.add_location_records(product_list, planogram)  # type: ignore [arg-type]
+
+        with self.assertNumQueries(1):
+            snapshot = util.build_plano_snapshot(planogram)
+        self.assertEqual(
+            snapshot,
+            {
+                "A1": {"upc": "843740198695", "name": "Cat Box"},
+                "A2": {"upc": "843740135607", "name": "Spectacular"},
+            },
+        )
+
+        planogram_update = util.create_planogram_update("reset", [], planogram)
+        planogram_update.refresh_from_db()
+        self.assertEqual(planogram_update.old_plano, snapshot)
+        self.assertEqual(planogram_update.new_plano, {})
+
+    def test_apply_writes_only_the_diff(self) -> None:
+        store = models.Store.objects.create(name="T3277")
+        planogram = models.Planogram.objects.create(name="plano1 - 3277", store=store)
+        util.add_location_records(
+            [
+                {"upc": "843740198695", "name": "Cat Box", "location": "A1"},
+                {"upc": "843740135607", "name": "Spectacular", "location": "A2"},
+                {"upc": "843740198435", "name": "Big Slice", "location": "A3"},
+            ],
+            planogram,
+        )
+        unchanged_location = planogram.locations.get(name="A1")
+
+        planogram_update = util.create_planogram_update(
+            "reset",
+            [
+                {"upc": "843740198695", "name": "Cat Box", "location": "A1"},
+                {"upc": "843740198435", "name": "Big Slice", "location": "A2"},
+                {"upc": "843740199319", "name": "A Day", "location": "A4"},
+            ],
+            planogram,
+        )
+        plano_diff, errors = util.apply_planogram_update(planogram_update)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            plano_diff,
+            IPlanoSnapshotDiff(
+                added=["A4"], removed=["A3"], replaced=["A2"], moved=["A2"], renamed=[]
+            ),
+        )
+        self.assertEqual(planogram.locations.get(name="A1").pk, unchanged_location.pk)
+        self.assertEqual(
+            {
+                location.name: [product.upc for product in location.products.all()]
+                for location in planogram.locations.prefetch_related("products")
+            },
+            {"A1": ["843740198695"], "A2": ["843740198435"], "A4": ["843740199319"]},
+        )
+
+
+class ProductNameSearchTest(TestCase):
+    def test_only_products_located_in_store_ranked(self) -> None:
+        store = models.Store.objects.create(name="T3277")
+        other_store = models.Store.objects.create(name="T3278")
+        util.add_location_records(
+            [
+                {"upc": "843740198695", "name": "Cat Box Deluxe", "location": "A1"},
+                {"upc": "843740135607", "name": "Cat Box", "location": "A2"},
+            ],
+            models.Planogram.objects.create(name="plano1 - 3277", store=store),
+        )
+        util.add_location_records(
+            [{"upc": "843740198435", "name": "Cat Box Jr", "location": "A1"}],
+            models.Planogram.objects.create(name="plano1 - 3278", store=other_store),
+        )
+
+        products = list(util.search_products_by_name(store.pk, "cat box"))
+
+        self.assertEqual([p.name for p in products], ["Cat Box", "Cat Box Deluxe"])
+        self.assertEqual([loc.name for loc in products[0].home_locations.all()], ["A2"])
+
+
+class LocationCacheTest(LocMemCacheTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.store = models.Store.objects.create(name="T3277")
+        self.planogram = models.Planogram.objects.create(name="plano1 - 3277", store=self.store)
+        util.add_location_records(
+            [{"upc": "843740198695", "name": "Cat Box", "location": "A1"}], self.planogram
+        )
+
+    def get_location_names(self, store_id: int | None = None) -> set[str]:
+        product = get_product_locations(store_id or self.store.pk, "843740198695")
+        if product is None:
+            self.fail("Product not found")
+        return {loc.name for loc in product.home_locations.all()}
+
+    def test_repeat_lookup_served_from_cache(self) -> None:
+        self.get_location_names()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_location_names(), {"A1"})
+
+    def test_location_changes_invalidate(self) -> None:
+        self.get_location_names()
+        product = models.Product.objects.get(upc="843740198695")
+        with self.captureOnCommitCallbacks(execute=True):
+            product.home_locations.add(
+                models.HomeLocation.objects.create(name="B2", planogram=self.planogram)
+            )
+        self.assertEqual(self.get_location_names(), {"A1", "B2"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.planogram.delete()
+        self.assertEqual(self.get_location_names(), set())
+
+    def test_other_stores_stay_cached(self) -> None:
+        other_store = models.Store.objects.create(name="T3278")
+        util.add_location_records(
+            [{"upc": "843740198695", "name": "Cat Box", "location": "C1"}],
+            models.Planogram.objects.create(name="plano1 - 3278", store=other_store),
+        )
+        self.get_location_names()
+        self.get_location_names(other_store.pk)
+        other_version = get_location_bundle_version(other_store.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.HomeLocation.objects.create(name="B2", planogram=self.planogram)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_location_names(other_store.pk), {"C1"})
+            self.assertEqual(get_location_bundle_version(other_store.pk), other_version)
+        self.assertNotEqual(get_location_bundle_version(self.store.pk), other_version)
+
+    def test_moving_planogram_invalidates_both_stores(self) -> None:
+        other_store = models.Store.objects.create(name="T3278")
+        self.get_location_names()
+        self.assertEqual(self.get_location_names(other_store.pk), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.planogram.store = other_store
+            self.planogram.save()
+
+        self.assertEqual(self.get_location_names(), set())
+        self.assertEqual(self.get_location_names(other_store.pk), {"A1"})
+
+    def test_invalidation_waits_for_commit(self) -> None:
+        self.get_location_names()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            models.HomeLocation.objects.filter(planogram=self.planogram).delete()
+            # until the commit, the old locations are still what other connections read
+            with self.assertNumQueries(0):
+                self.assertEqual(self.get_location_names(), {"A1"})
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.get_location_names(), set())
+
+    def test_bulk_writes_invalidate_once(self) -> None:
+        models.HomeLocation.objects.bulk_create(
+            models.HomeLocation(name=name, planogram=self.planogram) for name in ("B1", "B2")
+        )
+
+        with (
+            self.captureOnCommitCallbacks(execute=True) as callbacks,
+            batched_location_invalidation(),
+        ):
+            models.HomeLocation.objects.filter(planogram=self.planogram).delete()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.get_location_names(), set())
+
+
+class LocationBundleTest(LocMemCacheTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.store = models.Store.objects.create(name="T3277")
+        self.planogram = models.Planogram.objects.create(name="plano1 - 3277", store=self.store)
+        util.add_location_records(
+            [
+                {"upc": "843740198695", "name": "Cat Box", "location": "A1"},
+                {"upc": "843740135607", "name": "Cat Box Deluxe", "location": "A2"},
+            ],
+            self.planogram,
+        )
+
+    def test_delta_since_previous_version(self) -> None:
+        old_bundle = get_location_bundle(self.store.pk)
+        self.assertEqual(
+            [(upc, name) for upc, _pk, name, _date, _locs in old_bundle["products"]],
+            [("843740198695", "Cat Box"), ("843740135607", "Cat Box Deluxe")],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            util.add_location_records(
+                [{"upc": "843740198435", "name": "Cat Box Jr", "location": "A3"}], self.planogram
+            )
+            models.HomeLocation.objects.get(name="A1", planogram=self.planogram).delete()
+        delta = get_location_bundle(self.store.pk, old_bundle["version"])
+
+        self.assertEqual(delta["base_version"], old_bundle["version"])
+        self.assertNotEqual(delta["version"], old_bundle["version"])
+        self.assertEqual([name for _pk, name, _plano in delta["locations"]], ["A3"])
+        self.assertEqual([upc for upc, *_ in delta["products"]], ["843740198435"])
+        self.assertEqual(len(delta["removed_location_ids"]), 1)
+        self.assertEqual(delta["removed_upcs"], ["843740198695"])
+
+    def test_unknown_version_gets_full_bundle(self) -> None:
+        bundle = get_location_bundle(self.store.pk, "0" * 20)
+
+        self.assertIsNone(bundle["base_version"])
+        self.assertEqual(len(bundle["products"]), 2)
+
+    def test_delta_etag_differs_from_full_bundle(self) -> None:
+        user = get_user_model().objects.create_user(username="testuser", password="testpass123")  # noqa: S106 -- test-only credential
+        self.client.force_login(user)
+        route = reverse("product_locator:get_store_location_bundle", args=[self.store.pk])
+        headers = {"Accept": "application/json"}
+
+        response = self.client.get(route, headers=headers)
+        self.assertEqual(200, response.status_code)
+        old_version = response.json()["version"]
+        self.assertEqual(response.json()["planograms"][0]["name"], "plano1 - 3277")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            util.add_location_records(
+                [{"upc": "843740198435", "name": "Cat Box Jr", "location": "A3"}], self.planogram
+            )
+        full_response = self.client.get(route, headers=headers)
+        delta_response = self.client.get(route, {"since": old_version}, headers=headers)
+
+        self.assertIsNone(full_response.json()["base_version"])
+        self.assertEqual(delta_response.json()["base_version"], old_version)
+        self.assertNotEqual(full_response["ETag"], delta_response["ETag"])
+        self.assertEqual(
+            self.client.get(
+                route, headers={**headers, "If-None-Match": full_response["ETag"]}
+            ).status_code,
+            304,
+        )
+        self.assertEqual(
+            self.client.get(
+                route,
+                {"since": old_version},
+                headers={**headers, "If-None-Match": full_response["ETag"]},
+            ).status_code,
+            200,
+        )
@@ -1,4 +1,4 @@
-from typing import TypedDict
+from typing import Literal, NamedTuple, TypedDict
 
 
 class IImportedProductInfo(TypedDict):
@@ -13,3 +13,59 @@ class IPlanoProduct(TypedDict):
 
 
 TPlanoSnapshot = dict[str, IPlanoProduct]
+
+
+class IPlanoSnapshotDiff(NamedTuple):
+    """Location names of the slots that differ between two planogram snapshots."""
+
+    # locations only in the new snapshot
+    added: list[str]
+    # locations only in the old snapshot
+    removed: list[str]
+    # locations in both, with a different product in the new snapshot
+    replaced: list[str]
+    # added or replaced locations whose product was at another location in the old snapshot
+    moved: list[str]
+    # locations in both, with the same product under a different name in the new snapshot
+    renamed: list[str]
+
+
+TPlanoTypeValue = Literal["inline", "seasonal", "other"]
+
+
+class IBundlePlanoType(TypedDict):
+    value: TPlanoTypeValue
+    label: str
+
+
+class IBundlePlanogram(TypedDict):
+    pk: int
+    name: str
+    # ISO dates
+    date_start: str
+    date_end: str | None
+    plano_type_info: IBundlePlanoType
+
+
+# (pk, name, planogram pk)
+TBundleLocation = tuple[int, str, int]
+# (upc, pk, name, ISO date_created, location pks)
+TBundleProduct = tuple[str, int, str, str, list[int]]
+
+
+class ILocationBundle(TypedDict):
+    """
+    A store's products and their locations, for resolving scans on the client. A full bundle
+    has every planogram, location and located product of the store. A delta (`base_version`
+    set) has every planogram, but only the locations and products added or changed since
+    `base_version`, and the pks and UPCs of the ones removed since.
+    """
+
+    store_id: int
+    version: str
+    base_version: str | None
+    planograms: list[IBundlePlanogram]
+    locations: list[TBundleLocation]
+    products: list[TBundleProduct]
+    removed_location_ids: list[int]
+    removed_upcs: list[str]
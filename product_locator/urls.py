@@ -23,6 +23,11 @@ ajax = [
         ajax_views.get_product_locations_by_name,
         name="get_product_locations_by_name",
     ),
+    path(
+        "ajax/get_store_location_bundle/<int:store_id>/",
+        ajax_views.get_store_location_bundle,
+        name="get_store_location_bundle",
+    ),
     path(
         "ajax/add_new_product_location/",
         ajax_views.add_new_product_location,
@@ -58,6 +63,16 @@ ajax = [
         ajax_views.submit_planogram_products,
         name="submit_planogram_products",
     ),
+    path(
+        "ajax/upload_planogram_products/",
+        ajax_views.upload_planogram_products,
+        name="upload_planogram_products",
+    ),
+    path(
+        "ajax/get_planogram_upload_progress/<str:upload_id>/",
+        ajax_views.get_planogram_upload_progress,
+        name="get_planogram_upload_progress",
+    ),
     path(
         "ajax/create_planogram/",
         ajax_views.create_planogram,
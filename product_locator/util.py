@@ -1,13 +1,48 @@
 import logging
 
+from django.contrib.postgres.search import TrigramWordSimilarity
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import models, transaction
 
+from .location_cache import batched_location_invalidation, invalidate_product_locations
 from .models import HomeLocation, Planogram, PlanogramUpdate, Product
-from .types import IImportedProductInfo, TPlanoSnapshot
+from .types import IImportedProductInfo, IPlanoSnapshotDiff, TPlanoSnapshot
 
 logger = logging.getLogger("main_logger")
 
+BULK_CREATE_BATCH_SIZE = 500
+# product name searches never return more matches than this, however many pages are requested
+PRODUCT_NAME_SEARCH_MAX_RESULTS = 100
+
+
+def search_products_by_name(store_id: int, product_name: str) -> models.QuerySet[Product]:
+    """
+    Products whose name contains `product_name` (case-insensitively) that have a location on
+    one of the store's current planograms, best matches first, up to
+    PRODUCT_NAME_SEARCH_MAX_RESULTS. Each product's `home_locations` are prefetched, limited to
+    those current locations.
+
+    The name match is served by the trigram index on UPPER(name), and matches are ranked by
+    trigram word similarity to `product_name`.
+    """
+    current_store_locations = HomeLocation.objects.filter(
+        planogram__store__pk=store_id, planogram__date_end__isnull=True
+    )
+
+    return (
+        Product.objects.filter(
+            models.Exists(current_store_locations.filter(products=models.OuterRef("pk"))),
+            name__icontains=product_name,
+        )
+        .annotate(similarity=TrigramWordSimilarity(product_name, "name"))
+        .order_by("-similarity", "name", "pk")
+        .prefetch_related(
+            models.Prefetch(
+                "home_locations", queryset=current_store_locations.select_related("planogram")
+            )
+        )[:PRODUCT_NAME_SEARCH_MAX_RESULTS]
+    )
+
 
 def add_location_records(
     product_list: list[IImportedProductInfo],
@@ -16,62 +51,92 @@ def add_location_records(
     """
     Validates every product's UPC before writing anything. If any product is invalid, no
     HomeLocation/Product/relation writes from this call are persisted (all-or-nothing import).
+
+    Runs a fixed number of queries regardless of the number of products: one to look up the
+    existing products, then one bulk insert each for the new products, the new locations and
+    the product-location relations (plus one to read back the planogram's locations).
     """
+    product_ids: dict[str, int] = dict(
+        Product.objects.filter(upc__in={p["upc"] for p in product_list}).values_list("upc", "pk")
+    )
+
     product_errors: list[str] = []
+    new_products: dict[str, Product] = {}
     for product_data in product_list:
-        if Product.objects.filter(upc=product_data["upc"]).exists():
+        if product_data["upc"] in product_ids:
             continue
 
+        product = Product(upc=product_data["upc"], name=product_data["name"])
         try:
-            Product(upc=product_data["upc"], name=product_data["name"]).clean()
+            # same validation as Product.save(), which bulk_create skips. the uniqueness check
+            # is left to the database
+            product.full_clean(validate_unique=False)
         except ValidationError as ex:
             logger.exception("Errors in creating new product: %s", ex.messages)
             product_errors.extend(
                 f"{' '.join(product_data.values())}: {msg}"  # type:ignore [arg-type]
                 for msg in ex.messages
             )
+            continue
+
+        # the first name seen for a UPC wins, as when the products were created one by one
+        new_products.setdefault(product.upc, product)
 
     if product_errors:
         return 0, product_errors
 
     with transaction.atomic():
+        logger.info("Bulk creating %d new products", len(new_products))
+        for product in Product.objects.bulk_create(new_products.values(), BULK_CREATE_BATCH_SIZE):
+            product_ids[product.upc] = product.pk
+
         new_locations = [
-            HomeLocation(name=product_data["location"], planogram=planogram)
-            for product_data in product_list
+            HomeLocation(name=location_name, planogram=planogram)
+            for location_name in {p["location"] for p in product_list}
         ]
-
         logger.info("Bulk creating %d new locations", len(new_locations))
+        HomeLocation.objects.bulk_create(
+            new_locations, BULK_CREATE_BATCH_SIZE, ignore_conflicts=True
+        )
+        home_location_ids: dict[str, int] = dict(planogram.locations.values_list("name", "pk"))
 
-        HomeLocation.objects.bulk_create(new_locations, 100, ignore_conflicts=True)
-        home_locations: dict[str, HomeLocation] = {
-            loc.name: loc for loc in planogram.locations.all()
+        ProductHomeLocation = Product.home_locations.through  # noqa: N806 -- model class
+        product_home_locations = {
+            (product_ids[p["upc"]], home_location_ids[p["location"]])
+            for p in product_list
+            if p["location"] in home_location_ids
         }
+        logger.info("Bulk creating %d product locations", len(product_home_locations))
+        # like home_locations.add(), relations that already exist are left alone
+        ProductHomeLocation.objects.bulk_create(
+            [
+                ProductHomeLocation(product_id=product_id, homelocation_id=home_location_id)
+                for product_id, home_location_id in product_home_locations
+            ],
+            BULK_CREATE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
 
-        num_products_added = 0
-        for product_data in product_list:
-            product = Product.objects.filter(upc=product_data["upc"]).first()
-            if product is None:
-                product = Product.objects.create(upc=product_data["upc"], name=product_data["name"])
-
-            num_products_added += 1
-            home_location = home_locations.get(product_data["location"])
-            if home_location is None:
-                continue
-
-            product.home_locations.add(home_location)
-
-    return num_products_added, []
+    # bulk_create doesn't send the signals that keep the location cache in sync
+    invalidate_product_locations(store_ids=[planogram.store_id])
+    return len(product_list), []
 
 
 def build_plano_snapshot(planogram: Planogram) -> TPlanoSnapshot:
-    snapshot: TPlanoSnapshot = {}
-
-    for home_location in planogram.locations.prefetch_related("products").all():
-        product = home_location.products.first()
-        if product is None:
-            continue
+    """
+    One query over the product-location table. A location with several products is
+    snapshotted with the one with the lowest id, and empty locations are left out.
+    """
+    ProductHomeLocation = Product.home_locations.through  # noqa: N806 -- model class
+    rows = (
+        ProductHomeLocation.objects.filter(homelocation__planogram=planogram)
+        .order_by("homelocation_id", "product_id")
+        .values_list("homelocation__name", "product__upc", "product__name")
+    )
 
-        snapshot[home_location.name] = {"upc": product.upc, "name": product.name}
+    snapshot: TPlanoSnapshot = {}
+    for location, upc, name in rows:
+        snapshot.setdefault(location, {"upc": upc, "name": name})
 
     return snapshot
 
@@ -102,26 +167,106 @@ def create_planogram_update(
     )
 
 
-def apply_planogram_update(planogram_update: PlanogramUpdate) -> tuple[int, list[str]]:
+def diff_plano_snapshots(
+    old_plano: TPlanoSnapshot, new_plano: TPlanoSnapshot
+) -> IPlanoSnapshotDiff:
+    old_locations_by_upc = {product["upc"]: location for location, product in old_plano.items()}
+
+    added: list[str] = []
+    replaced: list[str] = []
+    moved: list[str] = []
+    renamed: list[str] = []
+    for location, product in new_plano.items():
+        old_product = old_plano.get(location)
+        if old_product is None:
+            added.append(location)
+        elif old_product["upc"] != product["upc"]:
+            replaced.append(location)
+        else:
+            if old_product["name"] != product["name"]:
+                renamed.append(location)
+            continue
+
+        if old_locations_by_upc.get(product["upc"], location) != location:
+            moved.append(location)
+
+    removed = [location for location in old_plano if location not in new_plano]
+    return IPlanoSnapshotDiff(added, removed, replaced, moved, renamed)
+
+
+def apply_planogram_update(
+    planogram_update: PlanogramUpdate,
+) -> tuple[IPlanoSnapshotDiff | None, list[str]]:
+    """
+    Make the planogram's locations match the update's new snapshot, writing only the slots
+    that differ from the planogram's current state: locations not in the new snapshot are
+    deleted, products no longer at a location are unlinked from it, and the added and
+    replaced slots are imported with `add_location_records`. Product names are left as they
+    are, so renamed slots are only reported.
+
+    Returns the diff against the current state, or None and the errors if any new product is
+    invalid, in which case nothing is written.
+    """
     planogram = planogram_update.planogram
+    new_plano: TPlanoSnapshot = planogram_update.new_plano
+    ProductHomeLocation = Product.home_locations.through  # noqa: N806 -- model class
 
-    product_list: list[IImportedProductInfo] = [
-        {"location": location, "upc": product["upc"], "name": product["name"]}
-        for location, product in planogram_update.new_plano.items()
-    ]
+    # the delete of stale locations sends a post_delete for each of them
+    with batched_location_invalidation(), transaction.atomic():
+        location_ids: dict[str, int] = dict(planogram.locations.values_list("name", "pk"))
+        current_rows = (
+            ProductHomeLocation.objects.filter(homelocation__planogram=planogram)
+            .order_by("homelocation_id", "product_id")
+            .values_list("pk", "homelocation__name", "product__upc", "product__name")
+        )
 
-    with transaction.atomic():
-        planogram.locations.all().delete()
-        logger.info("Deleted all existing home locations for planogram: %s", planogram)
+        # same as build_plano_snapshot, also collecting the rows the update makes stale
+        current_plano: TPlanoSnapshot = {}
+        stale_row_ids: list[int] = []
+        for row_id, location, upc, name in current_rows:
+            current_plano.setdefault(location, {"upc": upc, "name": name})
+            if location in new_plano and new_plano[location]["upc"] != upc:
+                stale_row_ids.append(row_id)
+
+        plano_diff = diff_plano_snapshots(current_plano, new_plano)
 
-        num_products_added, product_errors = add_location_records(product_list, planogram)
+        stale_location_names = [location for location in location_ids if location not in new_plano]
+        HomeLocation.objects.filter(
+            pk__in=[location_ids[location] for location in stale_location_names]
+        ).delete()
+        ProductHomeLocation.objects.filter(pk__in=stale_row_ids).delete()
+        logger.info(
+            "Deleted %d locations and %d stale product locations for planogram: %s",
+            len(stale_location_names),
+            len(stale_row_ids),
+            planogram,
+        )
+
+        product_list: list[IImportedProductInfo] = [
+            {
+                "location": location,
+                "upc": new_plano[location]["upc"],
+                "name": new_plano[location]["name"],
+            }
+            for location in (*plano_diff.added, *plano_diff.replaced)
+        ]
+        _num_products_added, product_errors = add_location_records(product_list, planogram)
         if product_errors:
-            # Roll back the delete too -- an invalid UPC must not leave the planogram cleared
-            # out with nothing re-added.
+            # Roll back the deletes too -- an invalid UPC must not leave the planogram partly
+            # updated.
             transaction.set_rollback(True)
-            return 0, product_errors
+            return None, product_errors
 
         planogram_update.is_applied = True
         planogram_update.save(update_fields=["is_applied"])
 
-    return num_products_added, product_errors
+    logger.info(
+        "Applied planogram update '%s': %d added, %d removed, %d replaced, %d moved, %d renamed",
+        planogram_update,
+        len(plano_diff.added),
+        len(plano_diff.removed),
+        len(plano_diff.replaced),
+        len(plano_diff.moved),
+        len(plano_diff.renamed),
+    )
+    return plano_diff, []
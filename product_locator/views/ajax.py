@@ -1,30 +1,41 @@
+import json
 import logging
 
 from django.core.exceptions import ValidationError
-from django.db.models import Prefetch
 from django.http import HttpResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.exceptions import NotFound as DrfNotFound
 from rest_framework.exceptions import ValidationError as DrfValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request as DrfRequest
 
-from server.utils.common import validate_structure
+from server.utils.common import get_pagination_data, validate_structure
 
 from .. import planogram_parser, util
+from ..location_bundle import get_location_bundle, get_location_bundle_version
+from ..location_cache import get_product_locations
 from ..models import HomeLocation, Planogram, PlanogramUpdate, Product, ProductScanAudit, Store
+from ..planogram_upload import UploadProgress, parse_uploaded_file
+from ..types import IImportedProductInfo
 from . import interfaces_response
 from .interfaces_request import (
     GetProductLocationRequest,
     IAddNewProductLocation,
     IAppendScanAudit,
     ICreatePlanogram,
+    IGetProductLocationsByName,
+    IGetStoreLocationBundle,
     INewScanAuditRequest,
     ISubmitPlanogramProducts,
+    IUploadPlanogramProducts,
 )
 
 logger = logging.getLogger("main_logger")
 
+PRODUCT_NAME_SEARCH_PAGE_SIZE = 25
+
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -35,45 +46,60 @@ def get_product_location(request: DrfRequest) -> HttpResponse:
     except ValidationError as ex:
         raise DrfValidationError(ex.messages) from ex
 
-    product = (
-        Product.objects.prefetch_related(
-            Prefetch(
-                "home_locations",
-                queryset=HomeLocation.objects.filter(planogram__store__pk=request_data.store_id)
-                .select_related("planogram")
-                .order_by("-planogram__date_start"),
-            ),
-        )
-        .filter(upc=request_data.upc)
-        .first()
-    )
-
+    product = get_product_locations(request_data.store_id, request_data.upc)
     if product is None:
         raise DrfNotFound(f"Product with UPC {request_data.upc} not found")
 
     return interfaces_response.IProductLocations(product).render(request)
 
 
+def get_store_location_bundle_etag(request: DrfRequest, store_id: int) -> str:
+    version = get_location_bundle_version(store_id)
+    since = request.GET.get("since")
+    # a delta's contents depend on the version it is from as well. versions are hex digests, so
+    # any other `since` can't be a known version, and is answered with the full bundle
+    if since is None or since == version or not since.isalnum():
+        return version
+    return f"{version}-since-{since}"
+
+
+@gzip_page
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@condition(etag_func=get_store_location_bundle_etag)
+def get_store_location_bundle(request: DrfRequest, store_id: int) -> HttpResponse:
+    """
+    A store's location bundle, for the scanner to resolve scans without a round trip. The ETag is
+    the bundle's version: a client that has the current version is answered with a 304, and one
+    that passes an older version as `since` is sent a delta when that version is still known.
+    The ETag of a delta also includes `since`, so that it never matches the full bundle's.
+    """
+    request_data = validate_structure(request.GET, IGetStoreLocationBundle)
+    if not Store.objects.filter(pk=store_id).exists():
+        raise DrfNotFound(f"Store with ID {store_id} not found")
+
+    bundle = get_location_bundle(store_id, request_data.since)
+    return interfaces_response.IStoreLocationBundle(**bundle).render(request)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_product_locations_by_name(
     request: DrfRequest, store_id: int, product_name: str
 ) -> HttpResponse:
-    products = (
-        Product.objects.filter(name__icontains=product_name)
-        .order_by("name")
-        .prefetch_related(
-            Prefetch(
-                "home_locations",
-                queryset=HomeLocation.objects.filter(
-                    planogram__store__pk=store_id, planogram__date_end__isnull=True
-                ),
-            )
-        )
+    request_data = validate_structure(request.GET, IGetProductLocationsByName)
+
+    pagination_result = get_pagination_data(
+        util.search_products_by_name(store_id, product_name),
+        page=request_data.page,
+        page_size=PRODUCT_NAME_SEARCH_PAGE_SIZE,
     )
+    if not pagination_result.ok:
+        raise DrfValidationError(str(pagination_result.err))
 
+    page_obj, pagination_data = pagination_result.value
     return interfaces_response.MatchingProducts(
-        [p for p in products if p.home_locations.all()]
+        list(page_obj.object_list), has_next=pagination_data.has_next
     ).render(request)
 
 
@@ -166,13 +192,18 @@ def apply_planogram_update(request: DrfRequest, planogram_update_id: int) -> Htt
     if planogram_update.is_applied:
         raise DrfValidationError("This planogram update has already been applied.")
 
-    _num_products_added, product_errors = util.apply_planogram_update(planogram_update)
-    if product_errors:
+    plano_diff, product_errors = util.apply_planogram_update(planogram_update)
+    if plano_diff is None:
         raise DrfValidationError(product_errors)
 
-    return interfaces_response.IPlanogramUpdateApplied(planogram_update=planogram_update).render(
-        request
-    )
+    return interfaces_response.IPlanogramUpdateApplied(
+        planogram_update=planogram_update,
+        num_slots_added=len(plano_diff.added),
+        num_slots_removed=len(plano_diff.removed),
+        num_slots_replaced=len(plano_diff.replaced),
+        num_slots_moved=len(plano_diff.moved),
+        num_slots_renamed=len(plano_diff.renamed),
+    ).render(request)
 
 
 @api_view(["POST"])
@@ -193,14 +224,88 @@ def submit_planogram_products(request: DrfRequest) -> HttpResponse:
     if parse_errors:
         raise DrfValidationError(parse_errors)
 
+    return save_planogram_products(
+        request,
+        planogram,
+        product_list,
+        is_reset_planogram=request_data.is_reset_planogram,
+        label=request_data.label,
+    )
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def upload_planogram_products(request: DrfRequest) -> HttpResponse:
+    """
+    Multipart variant of `submit_planogram_products`, for dumps too large to send as JSON: the
+    dump is uploaded as the `planogram_file` file, and the other fields as JSON in `payload`.
+    Progress can be followed with `get_planogram_upload_progress`.
+    """
+    try:
+        payload = json.loads(request.data.get("payload", ""))
+    except json.JSONDecodeError as ex:
+        raise DrfValidationError("The upload is missing its payload.") from ex
+    request_data = validate_structure(payload, IUploadPlanogramProducts)
+
+    uploaded_file = request.FILES.get("planogram_file")
+    if uploaded_file is None:
+        raise DrfValidationError("No planogram file was uploaded.")
+
+    planogram = (
+        Planogram.objects.select_related("store").filter(pk=request_data.planogram_id).first()
+    )
+    if planogram is None:
+        raise DrfNotFound(f"Planogram with ID {request_data.planogram_id} not found")
+
+    progress = UploadProgress(request.user.pk, request_data.upload_id, uploaded_file.size or 0)
+    product_list, parse_errors = parse_uploaded_file(uploaded_file, progress)
+    if parse_errors:
+        progress.update(stage="failed")
+        raise DrfValidationError(parse_errors)
+
+    progress.update(stage="saving")
+    try:
+        response = save_planogram_products(
+            request,
+            planogram,
+            product_list,
+            is_reset_planogram=request_data.is_reset_planogram,
+            label=request_data.label,
+        )
+    except Exception:
+        progress.update(stage="failed")
+        raise
+
+    progress.update(stage="done")
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_planogram_upload_progress(request: DrfRequest, upload_id: str) -> HttpResponse:
+    progress = UploadProgress.get(request.user.pk, upload_id)
+    if progress is None:
+        raise DrfNotFound(f"Planogram upload '{upload_id}' not found")
+
+    return interfaces_response.IPlanogramUploadProgress(**progress).render(request)
+
+
+def save_planogram_products(
+    request: DrfRequest,
+    planogram: Planogram,
+    product_list: list[IImportedProductInfo],
+    *,
+    is_reset_planogram: bool,
+    label: str,
+) -> HttpResponse:
     if not product_list:
         raise DrfValidationError("You have submitted data that resulted in 0 items being parsed.")
 
     if planogram.store is None:
         raise DrfValidationError("The selected planogram does not have an associated store.")
 
-    if request_data.is_reset_planogram:
-        label = request_data.label.strip()
+    if is_reset_planogram:
+        label = label.strip()
         if not label:
             raise DrfValidationError("A label is required when resetting a planogram.")
 
@@ -7,6 +7,17 @@ class GetProductLocationRequest:
     store_id: int
 
 
+@frozen
+class IGetStoreLocationBundle:
+    # the version the client already has, to be sent only what changed since
+    since: str | None = None
+
+
+@frozen
+class IGetProductLocationsByName:
+    page: int = 1
+
+
 @frozen
 class IAppendScanAudit:
     scan_audit_id: int
@@ -34,6 +45,15 @@ class ISubmitPlanogramProducts:
     label: str
 
 
+@frozen
+class IUploadPlanogramProducts:
+    planogram_id: int
+    is_reset_planogram: bool
+    label: str
+    # client-generated, for following the upload's progress
+    upload_id: str
+
+
 @frozen
 class ICreatePlanogram:
     name: str
@@ -3,6 +3,7 @@ from typing import NamedTuple
 from reactivated import Pick, interface
 
 from ..models import HomeLocation, Planogram, PlanogramUpdate, Product, ProductScanAudit
+from ..types import IBundlePlanogram
 
 
 @interface
@@ -25,6 +26,7 @@ class MatchingProducts(NamedTuple):
             "home_locations.display_name",
         ]
     ]
+    has_next: bool
 
 
 @interface
@@ -78,6 +80,22 @@ class IProductLocations(NamedTuple):
     ]
 
 
+@interface
+class IStoreLocationBundle(NamedTuple):
+    """See product_locator.types.ILocationBundle."""
+
+    store_id: int
+    version: str
+    base_version: str | None
+    planograms: list[IBundlePlanogram]
+    # (pk, name, planogram pk)
+    locations: list[tuple[int, str, int]]
+    # (upc, pk, name, date_created, location pks)
+    products: list[tuple[str, int, str, str, list[int]]]
+    removed_location_ids: list[int]
+    removed_upcs: list[str]
+
+
 @interface
 class ISuccess(NamedTuple):
     success: bool
@@ -93,6 +111,11 @@ class IPlanogramUpdateApplied(NamedTuple):
         "planogram.pk",
         "planogram.name",
     ]
+    num_slots_added: int
+    num_slots_removed: int
+    num_slots_replaced: int
+    num_slots_moved: int
+    num_slots_renamed: int
 
 
 @interface
@@ -102,6 +125,16 @@ class ISubmitPlanogramProductsResult(NamedTuple):
     planogram_update: Pick[PlanogramUpdate, "pk", "label"] | None
 
 
+@interface
+class IPlanogramUploadProgress(NamedTuple):
+    stage: str
+    bytes_read: int
+    total_bytes: int
+    lines_read: int
+    products_parsed: int
+    num_errors: int
+
+
 @interface
 class IPlanogramCreated(NamedTuple):
     planogram: Pick[Planogram, "pk", "name", "date_start", "date_end", "plano_type_info"]
@@ -11,7 +11,7 @@ from product_locator.views import templates
 from ..models import Planogram, PlanogramUpdate, ProductScanAudit, Store
 
 if TYPE_CHECKING:
-    from ..models import TPlanoTypeValue
+    from ..types import TPlanoTypeValue
 
 logger = logging.getLogger("main_logger")
 
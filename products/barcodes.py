@@ -0,0 +1,173 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Literal
+
+import barcode  # type:ignore [import, unused-ignore]
+from django.conf import settings
+
+logger = logging.getLogger("main_logger")
+
+TWriterOptions = dict[str, str | int | float | bool]
+TBarcodeFormat = Literal["png", "svg"]
+
+BARCODE_CONTENT_TYPES: dict[TBarcodeFormat, str] = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+DEFAULT_WRITER_OPTIONS: TWriterOptions = {
+    "module_height": 18,
+    "font_size": 10,
+    "text_distance": 4.0,
+    "write_text": False,
+    "background": "#ffffff",
+}
+
+BARCODE_CACHE_DIR = Path(settings.MEDIA_ROOT) / "barcodes"
+# a rendered UPC-A image is ~1-3 KiB, so this bounds the in-process LRU to a few MiB per process
+BARCODE_LRU_MAX_ENTRIES = 4096
+
+
+def get_writer_options_key(writer_options: TWriterOptions) -> str:
+    """
+    Stable short digest of `writer_options`. Part of every cache key, so that changing how
+    barcodes are drawn never serves an image rendered with the previous options.
+    """
+    serialized = json.dumps(writer_options, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+
+DEFAULT_WRITER_OPTIONS_KEY = get_writer_options_key(DEFAULT_WRITER_OPTIONS)
+
+
+def render_barcode(upc: str, writer_options: TWriterOptions, image_format: TBarcodeFormat) -> bytes:
+    if image_format == "svg":
+        svg_barcode = barcode.get("upc", upc, writer=barcode.writer.SVGWriter())
+        return svg_barcode.render(writer_options=writer_options)  # type:ignore [no-any-return]
+
+    barcode_instance = barcode.get("upc", upc, writer=barcode.writer.ImageWriter())
+    barcode_image = barcode_instance.render(writer_options=writer_options)
+
+    fp = io.BytesIO()
+    barcode_image.save(fp, format="PNG")
+    return fp.getvalue()
+
+
+class BarcodeImageCache:
+    """
+    Rendered barcode images keyed by (UPC, writer options, image format).
+
+    Lookups go through a bounded in-process LRU first, then an on-disk store under
+    MEDIA_ROOT (shared by every web process and RQ worker on the host), and only render
+    with python-barcode when neither has the image.
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._lru: OrderedDict[tuple[str, str, TBarcodeFormat], bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        upc: str,
+        writer_options: TWriterOptions = DEFAULT_WRITER_OPTIONS,
+        image_format: TBarcodeFormat = "png",
+        *,
+        is_saved: bool = True,
+    ) -> bytes:
+        """
+        The rendered image of `upc`. With `is_saved=False`, an image that isn't cached yet is
+        rendered without being stored, so that arbitrary UPCs can't fill up the disk or evict
+        the images that are worth keeping.
+        """
+        cache_key = (upc, get_writer_options_key(writer_options), image_format)
+
+        cached_image = self._get_from_memory(cache_key)
+        if cached_image is not None:
+            return cached_image
+
+        image_path = self._get_path(*cache_key)
+        try:
+            image = image_path.read_bytes()
+        except FileNotFoundError:
+            image = render_barcode(upc, writer_options, image_format)
+            if not is_saved:
+                return image
+            self._write_to_disk(image_path, image)
+
+        self._put_in_memory(cache_key, image)
+        return image
+
+    def get_many(
+        self,
+        upcs: Iterable[str],
+        writer_options: TWriterOptions = DEFAULT_WRITER_OPTIONS,
+        image_format: TBarcodeFormat = "png",
+    ) -> dict[str, bytes]:
+        return {upc: self.get(upc, writer_options, image_format) for upc in upcs}
+
+    def prerender(
+        self,
+        upcs: Iterable[str],
+        writer_options: TWriterOptions = DEFAULT_WRITER_OPTIONS,
+        image_format: TBarcodeFormat = "png",
+    ) -> int:
+        """
+        Render and store every UPC in `upcs` not already on disk. Returns the number of
+        newly rendered images; UPCs that python-barcode rejects are logged and skipped.
+        """
+        options_key = get_writer_options_key(writer_options)
+        num_rendered = 0
+
+        for upc in set(upcs):
+            image_path = self._get_path(upc, options_key, image_format)
+            if image_path.exists():
+                continue
+
+            try:
+                image = render_barcode(upc, writer_options, image_format)
+            except Exception:
+                logger.exception("Could not render barcode for UPC %s", upc)
+                continue
+
+            self._write_to_disk(image_path, image)
+            num_rendered += 1
+
+        return num_rendered
+
+    def _get_path(self, upc: str, options_key: str, image_format: TBarcodeFormat) -> Path:
+        return self.cache_dir / options_key / f"{upc}.{image_format}"
+
+    def _write_to_disk(self, image_path: Path, image: bytes) -> None:
+        # write-then-rename, so a concurrent reader never sees a partially written file
+        image_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=image_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(image)
+        Path(tmp_path).replace(image_path)
+
+    def _get_from_memory(self, cache_key: tuple[str, str, TBarcodeFormat]) -> bytes | None:
+        with self._lock:
+            image = self._lru.get(cache_key)
+            if image is not None:
+                self._lru.move_to_end(cache_key)
+            return image
+
+    def _put_in_memory(self, cache_key: tuple[str, str, TBarcodeFormat], image: bytes) -> None:
+        with self._lock:
+            self._lru[cache_key] = image
+            self._lru.move_to_end(cache_key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+
+barcode_image_cache = BarcodeImageCache(BARCODE_CACHE_DIR, BARCODE_LRU_MAX_ENTRIES)
@@ -0,0 +1,91 @@
+# CPU-bound product image processing for products.tasks, kept free of Django imports.
+
+import time
+from io import BytesIO
+from typing import NamedTuple
+
+from PIL import Image, ImageChops, ImageOps
+
+PRODUCT_IMAGE_DIMENSIONS_TARGET = (600, 600)
+# JPEGs are decoded at the smallest DCT scale that is at least this big, leaving room for the
+# borders to be trimmed before the final resize to PRODUCT_IMAGE_DIMENSIONS_TARGET
+PRODUCT_IMAGE_DRAFT_SIZE = (1200, 1200)
+# images larger than this after draft-mode decoding are rejected instead of processed
+PRODUCT_IMAGE_MAX_DECODED_PIXELS = 4096 * 4096
+
+
+class IProcessedImage(NamedTuple):
+    image: bytes | None
+    source_size: tuple[int, int] | None
+    decoded_size: tuple[int, int] | None
+    seconds_taken: float
+    error: str | None
+
+
+def process_product_image(image_data: bytes) -> IProcessedImage:
+    """
+    Decode `image_data`, trim its border padding, resize it to PRODUCT_IMAGE_DIMENSIONS_TARGET
+    and encode it as JPEG. Never raises; failures are returned in `error`.
+    """
+    start_time = time.perf_counter()
+
+    def get_result(
+        image: bytes | None = None,
+        source_size: tuple[int, int] | None = None,
+        decoded_size: tuple[int, int] | None = None,
+        error: str | None = None,
+    ) -> IProcessedImage:
+        return IProcessedImage(
+            image, source_size, decoded_size, time.perf_counter() - start_time, error
+        )
+
+    try:
+        img = Image.open(BytesIO(image_data))
+        source_size = img.size
+        # no-op for formats other than JPEG
+        img.draft("RGB", PRODUCT_IMAGE_DRAFT_SIZE)
+        decoded_size = img.size
+
+        if decoded_size[0] * decoded_size[1] > PRODUCT_IMAGE_MAX_DECODED_PIXELS:
+            return get_result(
+                source_size=source_size, decoded_size=decoded_size, error="Image is too large"
+            )
+
+        product_image = trim_and_resize_image(img)
+        if product_image is None:
+            return get_result(
+                source_size=source_size,
+                decoded_size=decoded_size,
+                error="Trim and resize attempt returned None",
+            )
+
+        buffer = BytesIO()
+        product_image.save(buffer, format="JPEG")
+    except Exception as ex:  # noqa: BLE001 -- vendor images can fail in any number of ways
+        return get_result(error=repr(ex))
+
+    return get_result(buffer.getvalue(), source_size, decoded_size)
+
+
+def trim_and_resize_image(img: Image.Image) -> Image.Image | None:
+    def trim_borders(img: Image.Image) -> Image.Image | None:
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+
+        bg = Image.new(img.mode, img.size, img.getpixel((0, 0)))
+        diff = ImageChops.difference(img, bg)
+        diff = ImageChops.add(diff, diff, 2.0, -100)
+        bbox = diff.getbbox()
+        if bbox:
+            img = img.crop(bbox)
+            return ImageOps.expand(img, border=10, fill=(255, 255, 255))
+
+        return None
+
+    trimmed_img = trim_borders(img)
+    if trimmed_img is None:
+        return None
+
+    if trimmed_img.size > PRODUCT_IMAGE_DIMENSIONS_TARGET:
+        trimmed_img.thumbnail(PRODUCT_IMAGE_DIMENSIONS_TARGET, Image.Resampling.LANCZOS)
+    return trimmed_img
@@ -0,0 +1,82 @@
+import statistics
+import threading
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import close_old_connections, connection, connections
+
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency of a small query when connecting to Postgres directly "
+        "against connecting through a connection pooler such as pgbouncer. Each request runs "
+        "in a new thread, like under ASGI, so it never reuses another request's connection"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--requests", type=int, default=200, help="Requests per mode")
+        parser.add_argument("--pooler-host", help="Host of the pooler, e.g. pgbouncer")
+        parser.add_argument("--pooler-port", default="6432", help="Port of the pooler")
+
+    def handle(self, *_args: Any, **options: Any) -> None:
+        num_requests: int = options["requests"]
+
+        modes: list[tuple[str, dict[str, Any]]] = [("direct to Postgres", {})]
+        if options["pooler_host"] is None:
+            self.stdout.write("No --pooler-host given, only measuring direct connections")
+        else:
+            modes.append(
+                (
+                    "through the pooler",
+                    {
+                        "HOST": options["pooler_host"],
+                        "PORT": options["pooler_port"],
+                        "DISABLE_SERVER_SIDE_CURSORS": True,
+                    },
+                )
+            )
+
+        # the settings every thread's connection is created from
+        db_settings = connections.settings[connection.alias]
+        original_settings = db_settings.copy()
+
+        try:
+            for mode_name, settings_overrides in modes:
+                db_settings.update(original_settings, CONN_MAX_AGE=0, **settings_overrides)
+
+                timings_ms = [self.simulate_request() for _ in range(num_requests)]
+                self.stdout.write(
+                    f"{mode_name:>30}: median {statistics.median(timings_ms):.2f} ms, "
+                    f"p95 {statistics.quantiles(timings_ms, n=20)[-1]:.2f} ms, "
+                    f"mean {statistics.mean(timings_ms):.2f} ms over {num_requests} requests"
+                )
+        finally:
+            db_settings.clear()
+            db_settings.update(original_settings)
+
+    def simulate_request(self) -> float:
+        """
+        Run one small query, like the one log_product_scan starts with, in a new thread, inside
+        the connection lifecycle Django runs around a request (close_old_connections on
+        request_started and request_finished). Returns the elapsed time in milliseconds.
+        """
+        timings_ms: list[float] = []
+
+        def run_request() -> None:
+            start_time = time.perf_counter()
+
+            close_old_connections()
+            Product.objects.filter(upc="000000000000").first()
+            close_old_connections()
+
+            timings_ms.append((time.perf_counter() - start_time) * 1000)
+
+        request_thread = threading.Thread(target=run_request)
+        request_thread.start()
+        request_thread.join()
+
+        [timing_ms] = timings_ms
+        return timing_ms
@@ -0,0 +1,236 @@
+import json
+import random
+from collections.abc import Callable, Iterator
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from products.models import BrandParentCompany, Product, ProductAddition, Store
+from products.tasks import ORDERED_TO_CARRIED_DELAY, carry_ordered_products
+from server.utils.common import get_keyset_page, unwrap
+
+# same page size as get_product_additions_by_store
+PAGE_SIZE = 25
+# pages walked before the deep page whose plan is checked
+DEEP_PAGE_NUMBER = 20
+NUM_BRAND_COMPANIES = 40
+BRAND_FILTER_NUM_COMPANIES = 3
+# shape of the seeded product additions, roughly that of a store after a year of scanning
+CARRIED_RATIO = 0.75
+NEVER_SCANNED_RATIO = 0.05
+UNCARRIED_SCANNED_RATIO = 0.5
+ORDERED_RATIO = 0.08
+MAX_DAYS_SINCE_SCANNED = 365
+# carry_ordered_products runs daily, so only the last day's orders are past its delay
+MAX_DAYS_SINCE_ORDERED = ORDERED_TO_CARRIED_DELAY.days + 1
+BULK_CREATE_BATCH_SIZE = 5000
+# UPCs of seeded products, kept out of the range of real ones
+SEED_UPC_PREFIX = "99"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed realistic volumes of ProductAddition rows, EXPLAIN ANALYZE the hot ProductAddition "
+        "queries against them, and fail if a query doesn't use the index meant for it. The "
+        "seeded rows are rolled back. PostgreSQL only"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--stores", type=int, default=200)
+        parser.add_argument("--products", type=int, default=20_000)
+        parser.add_argument("--additions-per-store", type=int, default=1_500)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *_args: Any, **options: Any) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans can only be checked on PostgreSQL")
+
+        rng = random.Random(options["seed"])  # noqa: S311 -- synthetic data, not crypto
+        failures: list[str] = []
+
+        with transaction.atomic():
+            store_id, company_ids = self.seed(
+                rng,
+                num_stores=options["stores"],
+                num_products=options["products"],
+                additions_per_store=options["additions_per_store"],
+            )
+            # the planner needs the statistics of every seeded table the queries join
+            with connection.cursor() as cursor:
+                for model in (BrandParentCompany, Product, Store, ProductAddition):
+                    cursor.execute(f"ANALYZE {model._meta.db_table}")  # noqa: SLF001 -- Django model metadata is public API
+
+            for label, expected_indexes, run_query in self.get_query_shapes(store_id, company_ids):
+                plan = self.explain(run_query)
+                index_names = set(iter_index_names(plan["Plan"]))
+                self.stdout.write(
+                    f"{label:>40}: {plan['Execution Time']:8.2f} ms, "
+                    f"indexes used: {', '.join(sorted(index_names)) or 'none'}"
+                )
+                if expected_indexes.isdisjoint(index_names):
+                    failures.append(f"{label} doesn't use {' or '.join(sorted(expected_indexes))}")
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError("\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Every query uses its index"))
+
+    def seed(
+        self, rng: random.Random, *, num_stores: int, num_products: int, additions_per_store: int
+    ) -> tuple[int, list[int]]:
+        """Returns the pk of one of the seeded stores, and the pks of the seeded companies."""
+        companies = BrandParentCompany.objects.bulk_create(
+            BrandParentCompany(short_name=f"bench-{idx}") for idx in range(NUM_BRAND_COMPANIES)
+        )
+        product_ids = [
+            product.pk
+            for product in Product.objects.bulk_create(
+                (
+                    Product(
+                        upc=f"{SEED_UPC_PREFIX}{idx:010d}",
+                        name=f"Bench product {idx}",
+                        parent_company=rng.choice(companies),
+                    )
+                    for idx in range(num_products)
+                ),
+                batch_size=BULK_CREATE_BATCH_SIZE,
+            )
+        ]
+        stores = Store.objects.bulk_create(
+            Store(name=f"Bench store {idx}") for idx in range(num_stores)
+        )
+
+        now = timezone.now()
+        today = timezone.localdate()
+        ProductAddition.objects.bulk_create(
+            (
+                self.get_product_addition(rng, store, product_id, now=now, today=today)
+                for store in stores
+                for product_id in rng.sample(product_ids, additions_per_store)
+            ),
+            batch_size=BULK_CREATE_BATCH_SIZE,
+        )
+
+        self.stdout.write(
+            f"Seeded {num_stores * additions_per_store:,} product additions of "
+            f"{num_products:,} products in {num_stores} stores"
+        )
+        return stores[0].pk, [company.pk for company in companies]
+
+    def get_product_addition(
+        self, rng: random.Random, store: Store, product_id: int, *, now: datetime, today: date
+    ) -> ProductAddition:
+        is_carried = rng.random() < CARRIED_RATIO
+        is_scanned = (
+            rng.random() >= NEVER_SCANNED_RATIO
+            if is_carried
+            else rng.random() < UNCARRIED_SCANNED_RATIO
+        )
+        is_ordered = not is_carried and rng.random() < ORDERED_RATIO
+
+        return ProductAddition(
+            store=store,
+            product_id=product_id,
+            is_carried=is_carried,
+            date_last_scanned=now - timedelta(days=rng.uniform(0, MAX_DAYS_SINCE_SCANNED))
+            if is_scanned
+            else None,
+            date_ordered=today - timedelta(days=rng.randint(0, MAX_DAYS_SINCE_ORDERED))
+            if is_ordered
+            else None,
+        )
+
+    def get_query_shapes(
+        self, store_id: int, company_ids: list[int]
+    ) -> Iterator[tuple[str, set[str], Callable[[], Any]]]:
+        """(label, names of the indexes it may use, function that runs the query)"""
+        carried_additions = ProductAddition.objects.filter(
+            store__pk=store_id, is_carried=True
+        ).order_by("-date_last_scanned", "-id")
+
+        yield (
+            "product additions, first page",
+            {"pa_store_carried_scan_idx"},
+            lambda: get_page(carried_additions, cursor=None),
+        )
+
+        cursor = None
+        for _ in range(DEEP_PAGE_NUMBER - 1):
+            _additions, pagination_data = unwrap(
+                get_keyset_page(carried_additions, cursor=cursor, page_size=PAGE_SIZE)
+            )
+            cursor = pagination_data.next_cursor
+        yield (
+            f"product additions, page {DEEP_PAGE_NUMBER}",
+            {"pa_store_carried_scan_idx"},
+            lambda: get_page(carried_additions, cursor=cursor),
+        )
+
+        # The brand is a column of products, so no index on product_additions orders by it. The
+        # few brands filtered on keep too few of a store's rows for walking the store's carried
+        # rows in order to pay off: the planner rightly reads all of the store's rows through
+        # any index led by store, joins them to the brand's products and sorts the matches
+        yield (
+            "product additions by brand, first page",
+            self.get_store_index_names(),
+            lambda: get_page(
+                carried_additions.filter(
+                    product__parent_company__pk__in=company_ids[:BRAND_FILTER_NUM_COMPANIES]
+                ),
+                cursor=None,
+            ),
+        )
+
+        yield ("carry_ordered_products", {"pa_uncarried_ordered_idx"}, carry_ordered_products)
+
+    def get_store_index_names(self) -> set[str]:
+        """
+        The names of the indexes on product_additions whose first column is the store, including
+        the one backing the unique (store, product) constraint.
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor,
+                ProductAddition._meta.db_table,  # noqa: SLF001 -- Django model metadata is public API
+            )
+        return {
+            name
+            for name, constraint in constraints.items()
+            if (constraint["index"] or constraint["unique"])
+            and constraint["columns"][:1] == ["store_id"]
+        }
+
+    def explain(self, run_query: Callable[[], Any]) -> dict[str, Any]:
+        """
+        The EXPLAIN ANALYZE plan of the one query `run_query` runs. Both run in a savepoint that
+        is rolled back, so queries that write can be explained too.
+        """
+        with transaction.atomic(), CaptureQueriesContext(connection) as captured:
+            run_query()
+            transaction.set_rollback(True)
+        [query] = captured.captured_queries
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {query['sql']}")
+            [[plans]] = cursor.fetchall()
+            transaction.set_rollback(True)
+
+        plans = json.loads(plans) if isinstance(plans, str) else plans
+        return plans[0]  # type: ignore [no-any-return]
+
+
+def get_page(queryset: QuerySet[ProductAddition], cursor: str | None) -> None:
+    unwrap(get_keyset_page(queryset, cursor=cursor, page_size=PAGE_SIZE))
+
+
+def iter_index_names(plan_node: dict[str, Any]) -> Iterator[str]:
+    if "Index Name" in plan_node:
+        yield plan_node["Index Name"]
+    for child_node in plan_node.get("Plans", []):
+        yield from iter_index_names(child_node)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # product_additions is large and written to on every scan, so the indexes are built without
+    # locking out writes, which can't be done in a transaction
+    atomic = False
+
+    dependencies = [
+        ("products", "0091_pushsubscription_messagerecipientpushdelivery"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="productaddition",
+            index=models.Index(
+                models.F("store"),
+                models.OrderBy(models.F("date_last_scanned"), descending=True, nulls_last=True),
+                models.OrderBy(models.F("id"), descending=True),
+                condition=models.Q(("is_carried", True)),
+                name="pa_store_carried_scan_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="productaddition",
+            index=models.Index(
+                condition=models.Q(("date_ordered__isnull", False), ("is_carried", False)),
+                fields=["date_ordered"],
+                name="pa_uncarried_ordered_idx",
+            ),
+        ),
+    ]
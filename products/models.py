@@ -9,7 +9,8 @@ from checkdigit import gs1
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
 from server.utils.common import get_degree_offset_from_meters
@@ -443,6 +444,25 @@ class ProductAddition(models.Model):
     class Meta:
         unique_together = ("store", "product")
         db_table = "product_additions"
+        # see the bench_product_addition_indexes command for the plans these are meant for
+        indexes = (
+            # get_product_additions_by_store: a store's carried products, most recently scanned
+            # first, in the NULLS LAST order its keyset pagination uses. Filtered by brand, the
+            # few matching rows are found faster by joining on the brand and sorting them
+            models.Index(
+                F("store"),
+                F("date_last_scanned").desc(nulls_last=True),
+                F("id").desc(),
+                condition=Q(is_carried=True),
+                name="pa_store_carried_scan_idx",
+            ),
+            # carry_ordered_products: the few uncarried products that have been ordered
+            models.Index(
+                fields=["date_ordered"],
+                condition=Q(is_carried=False, date_ordered__isnull=False),
+                name="pa_uncarried_ordered_idx",
+            ),
+        )
 
     def __str__(self) -> str:
         return f"{self.product.upc}; Carried {self.is_carried}; Store {self.store}"
@@ -500,13 +520,15 @@ class Message(CommonModel):
         cls, *, user_ids: Iterable[int], title: str, body_md: str, ref_str: str | None = None
     ) -> Message | None:
         """
-        Create a message addressed to the given users (as MessageRecipient rows) and push a
-        notification to each of their registered devices (see push.send_push_to_users).
+        Create a message addressed to the given users (as MessageRecipient rows) and queue a
+        push notification to each of their registered devices (see
+        tasks.send_push_notifications), once the transaction commits.
 
         Returns None without sending if ref_str is given and already used by an existing
         Message - pass a stable ref_str to avoid re-alerting on an already-flagged condition.
         """
-        from . import push  # local import: push -> models would otherwise be circular
+        # local import: tasks/unread_counts -> models would otherwise be circular
+        from . import tasks, unread_counts
 
         if ref_str is not None and cls.objects.filter(ref_str=ref_str).exists():
             return None
@@ -517,8 +539,13 @@ class Message(CommonModel):
         MessageRecipient.objects.bulk_create(
             [MessageRecipient(message=message, user_id=user_id) for user_id in user_ids]
         )
+        transaction.on_commit(lambda: unread_counts.adjust_unread_message_counts(user_ids, 1))
 
-        push.send_push_to_users(message, user_ids)
+        # best-effort like the push itself: the message is already saved, so failing to queue
+        # the push (e.g. Redis being down) is only logged, rather than failing the request
+        transaction.on_commit(
+            lambda: tasks.send_push_notifications.delay(message.id, user_ids), robust=True
+        )
 
         return message
 
@@ -548,12 +575,22 @@ class MessageRecipient(CommonModel):
         return f"MessageRecipient(user={self.user}, message_id={self.message_id}, is_read={self.is_read})"
 
     def mark_read(self) -> None:
+        from . import unread_counts  # local import: unread_counts -> models is circular
+
         if self.is_read:
             return
 
         self.is_read = True
         self.read_at = timezone.now()
-        self.save(update_fields=["is_read", "read_at"])
+        # conditional UPDATE rather than save(), so that when the same recipient is marked read
+        # concurrently only one of the calls decrements the unread count
+        num_updated = MessageRecipient.objects.filter(pk=self.pk, is_read=False).update(
+            is_read=True, read_at=self.read_at, datetime_modified=self.read_at
+        )
+        if num_updated:
+            transaction.on_commit(
+                lambda: unread_counts.adjust_unread_message_counts([self.user_id], -1)
+            )
 
 
 class PushSubscription(CommonModel):
@@ -1,8 +1,18 @@
 import json
 import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from typing import Literal, NamedTuple, get_args
+from urllib.parse import urlparse
 
+import requests
 from django.conf import settings
 from django.utils import timezone
+from py_vapid import Vapid
 from pywebpush import WebPushException, webpush
 
 from .models import Message, MessageRecipient, MessageRecipientPushDelivery, PushSubscription
@@ -13,65 +23,226 @@ logger = logging.getLogger("main_logger")
 # permission, uninstalled the PWA, etc) - safe to delete rather than keep retrying forever.
 _EXPIRED_SUBSCRIPTION_STATUS_CODES = {404, 410}
 
+PUSH_MAX_WORKERS = 8
+PUSH_TIMEOUT_SECONDS = 10
 
-def send_push_to_users(message: Message, user_ids: list[int]) -> None:
+# how long a signed VAPID JWT is valid for (push services reject more than 24h), and how long
+# before it expires a new one is signed
+VAPID_TOKEN_LIFETIME = timedelta(hours=12)
+VAPID_TOKEN_REFRESH_MARGIN = timedelta(minutes=30)
+
+_thread_local = threading.local()
+
+TPushTimingCounter = Literal[
+    "vapid_signs", "vapid_sign_seconds", "vapid_header_cache_hits", "sends", "send_seconds"
+]
+
+
+class PushSender:
+    """
+    Sends Web Push messages signed with the server's VAPID key.
+
+    The private key is parsed once, and the signed VAPID headers are cached per push service
+    origin (the JWT's "aud" claim) until shortly before they expire, so each send only pays
+    for the per-subscription payload encryption and the request itself. Keeps running timing
+    counters, see `get_timings`.
+    """
+
+    def __init__(self, private_key: str, admin_email: str) -> None:
+        self._private_key = private_key
+        self._admin_email = admin_email
+        self._vapid: Vapid | None = None
+        # origin -> (expiry as a unix timestamp, signed headers)
+        self._vapid_headers: dict[str, tuple[float, dict[str, str]]] = {}
+        self._lock = threading.Lock()
+        self._timings: defaultdict[TPushTimingCounter, float] = defaultdict(float)
+
+    def send(self, subscription: PushSubscription, payload: str, session: requests.Session) -> None:
+        """Raises WebPushException if the push service rejects the message."""
+        vapid_headers = self.get_vapid_headers(subscription.endpoint)
+
+        start_time = time.perf_counter()
+        try:
+            webpush(
+                subscription_info={
+                    "endpoint": subscription.endpoint,
+                    "keys": {"p256dh": subscription.p256dh_key, "auth": subscription.auth_key},
+                },
+                data=payload,
+                # already signed, so webpush() doesn't parse the key and sign again
+                headers=vapid_headers,
+                requests_session=session,
+                timeout=PUSH_TIMEOUT_SECONDS,
+            )
+        finally:
+            self._add_timings({"sends": 1, "send_seconds": time.perf_counter() - start_time})
+
+    def get_vapid_headers(self, endpoint: str) -> dict[str, str]:
+        url = urlparse(endpoint)
+        origin = f"{url.scheme}://{url.netloc}"
+        now = time.time()
+
+        with self._lock:
+            cached = self._vapid_headers.get(origin)
+            if cached is not None and cached[0] - VAPID_TOKEN_REFRESH_MARGIN.total_seconds() > now:
+                self._timings["vapid_header_cache_hits"] += 1
+                return dict(cached[1])
+
+            start_time = time.perf_counter()
+            if self._vapid is None:
+                self._vapid = Vapid.from_string(private_key=self._private_key)
+
+            expires_at = int(now + VAPID_TOKEN_LIFETIME.total_seconds())
+            vapid_headers: dict[str, str] = self._vapid.sign(
+                {"sub": f"mailto:{self._admin_email}", "aud": origin, "exp": expires_at}
+            )
+            self._vapid_headers[origin] = (expires_at, vapid_headers)
+
+            self._timings["vapid_signs"] += 1
+            self._timings["vapid_sign_seconds"] += time.perf_counter() - start_time
+            return dict(vapid_headers)
+
+    def get_timings(self) -> dict[TPushTimingCounter, float]:
+        """Running totals since the process started, including the counters that are still 0."""
+        with self._lock:
+            return {name: self._timings[name] for name in get_args(TPushTimingCounter)}
+
+    def _add_timings(self, timings: dict[TPushTimingCounter, float]) -> None:
+        with self._lock:
+            for name, value in timings.items():
+                self._timings[name] += value
+
+
+push_sender = PushSender(settings.VAPID_PRIVATE_KEY, settings.VAPID_ADMIN_EMAIL)
+
+
+class IPushResult(NamedTuple):
+    subscription: PushSubscription
+    delivered_at: datetime | None
+    error: str
+    is_expired: bool
+    is_retryable: bool
+
+
+def get_thread_push_session() -> requests.Session:
+    """
+    One requests session per pool thread: a session keeps a keep-alive connection pool per
+    host, so repeated pushes to the same push service (FCM, Mozilla, Apple) reuse connections.
+    """
+    session: requests.Session | None = getattr(_thread_local, "push_session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.push_session = session
+    return session
+
+
+def push_to_subscription(subscription: PushSubscription, payload: str) -> IPushResult:
+    try:
+        push_sender.send(subscription, payload, get_thread_push_session())
+    except WebPushException as exc:
+        status_code = exc.response.status_code if exc.response is not None else None
+        logger.warning("Push delivery failed for subscription %s: %s", subscription.id, exc)
+        return IPushResult(
+            subscription,
+            delivered_at=None,
+            error=str(exc),
+            is_expired=status_code in _EXPIRED_SUBSCRIPTION_STATUS_CODES,
+            # rate limited or push service trouble; anything else won't change on retry
+            is_retryable=status_code is None
+            or status_code == HTTPStatus.TOO_MANY_REQUESTS
+            or status_code >= HTTPStatus.INTERNAL_SERVER_ERROR,
+        )
+    except Exception as exc:
+        # one subscription's failure (network error, malformed key, etc) must never
+        # abort delivery to the rest of the batch
+        logger.exception("Unexpected error pushing to subscription %s", subscription.id)
+        return IPushResult(
+            subscription,
+            delivered_at=None,
+            error=str(exc),
+            is_expired=False,
+            is_retryable=isinstance(exc, requests.RequestException),
+        )
+
+    return IPushResult(
+        subscription, delivered_at=timezone.now(), error="", is_expired=False, is_retryable=False
+    )
+
+
+def send_push_to_users(
+    message: Message, user_ids: list[int], subscription_ids: list[int] | None = None
+) -> list[int]:
     """
     Push a notification for `message` to every PushSubscription belonging to the given
-    users, recording one MessageRecipientPushDelivery per (MessageRecipient, PushSubscription)
-    pair attempted. Best-effort per subscription: one device's failure doesn't affect
-    delivery to the user's other devices, or to other users.
+    users (or only to `subscription_ids` of theirs, when retrying), recording one
+    MessageRecipientPushDelivery per (MessageRecipient, PushSubscription) pair attempted.
+    Best-effort per subscription: one device's failure doesn't affect delivery to the user's
+    other devices, or to other users.
+
+    Subscriptions are pushed to concurrently on a thread pool, and the delivery records are
+    written with a single bulk upsert. Meant to be run from an RQ job, see
+    tasks.send_push_notifications.
+
+    Returns:
+        list[int]: ids of subscriptions whose delivery failed in a way worth retrying
     """
-    subscriptions = list(PushSubscription.objects.filter(user_id__in=user_ids))
+    subscriptions_qs = PushSubscription.objects.filter(user_id__in=user_ids)
+    if subscription_ids is not None:
+        subscriptions_qs = subscriptions_qs.filter(id__in=subscription_ids)
+    subscriptions = list(subscriptions_qs)
     if not subscriptions:
-        return
+        return []
 
     # user_id -> MessageRecipient
     message_recipients_by_user_id = {
         mr.user_id: mr
         for mr in MessageRecipient.objects.filter(message=message, user_id__in=user_ids)
     }
+    subscriptions = [s for s in subscriptions if s.user_id in message_recipients_by_user_id]
 
     # send the same payload to every subscription, since a message's body_md would display
     # on the user's device as raw markdown
     payload = json.dumps({"title": message.title, "body": "You have a new message."})
-    expired_subscription_ids: list[int] = []
 
-    for subscription in subscriptions:
-        message_recipient = message_recipients_by_user_id.get(subscription.user_id)
-        if message_recipient is None:
-            continue
-
-        delivery = MessageRecipientPushDelivery(
-            message_recipient=message_recipient, push_subscription=subscription
+    timings_before = push_sender.get_timings()
+    with ThreadPoolExecutor(max_workers=PUSH_MAX_WORKERS) as executor:
+        push_results = list(
+            executor.map(
+                lambda subscription: push_to_subscription(subscription, payload), subscriptions
+            )
         )
 
-        try:
-            webpush(
-                subscription_info={
-                    "endpoint": subscription.endpoint,
-                    "keys": {"p256dh": subscription.p256dh_key, "auth": subscription.auth_key},
-                },
-                data=payload,
-                vapid_private_key=settings.VAPID_PRIVATE_KEY,
-                vapid_claims={"sub": f"mailto:{settings.VAPID_ADMIN_EMAIL}"},
+    timings_after = push_sender.get_timings()
+    timings = {name: timings_after[name] - timings_before[name] for name in timings_after}
+    logger.info(
+        "Pushed message %s to %s subscriptions: %.2fs in requests, "
+        "%.3fs signing VAPID headers (%s signed, %s from cache)",
+        message.id,
+        len(push_results),
+        timings["send_seconds"],
+        timings["vapid_sign_seconds"],
+        timings["vapid_signs"],
+        timings["vapid_header_cache_hits"],
+    )
+
+    MessageRecipientPushDelivery.objects.bulk_create(
+        [
+            MessageRecipientPushDelivery(
+                message_recipient=message_recipients_by_user_id[result.subscription.user_id],
+                push_subscription=result.subscription,
+                delivered_at=result.delivered_at,
+                failed_at=None if result.delivered_at is not None else timezone.now(),
+                error=result.error,
             )
-        except WebPushException as exc:
-            status_code = exc.response.status_code if exc.response is not None else None
-            delivery.failed_at = timezone.now()
-            delivery.error = str(exc)
-            logger.warning("Push delivery failed for subscription %s: %s", subscription.id, exc)
-            if status_code in _EXPIRED_SUBSCRIPTION_STATUS_CODES:
-                expired_subscription_ids.append(subscription.id)
-        except Exception as exc:
-            # one subscription's failure (network error, malformed key, etc) must never
-            # abort delivery to the rest of the batch
-            delivery.failed_at = timezone.now()
-            delivery.error = str(exc)
-            logger.exception("Unexpected error pushing to subscription %s", subscription.id)
-        else:
-            delivery.delivered_at = timezone.now()
-
-        delivery.save()
+            for result in push_results
+        ],
+        update_conflicts=True,
+        unique_fields=["message_recipient", "push_subscription"],
+        update_fields=["delivered_at", "failed_at", "error", "datetime_modified"],
+    )
 
+    expired_subscription_ids = [r.subscription.id for r in push_results if r.is_expired]
     if expired_subscription_ids:
         PushSubscription.objects.filter(id__in=expired_subscription_ids).delete()
+
+    return [r.subscription.id for r in push_results if r.is_retryable]
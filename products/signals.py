@@ -0,0 +1,32 @@
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BrandParentCompany, MessageRecipient, PrefixMapping, UpcCorrection, WorkCycle
+from .unread_counts import invalidate_unread_message_counts
+from .util import work_cycle_cache
+from .util.upc import invalidate_upc_normalizer
+
+
+@receiver([post_save, post_delete], sender=UpcCorrection)
+@receiver([post_save, post_delete], sender=PrefixMapping)
+def invalidate_upc_rules(instance: UpcCorrection | PrefixMapping, **_kwargs: Any) -> None:
+    invalidate_upc_normalizer(instance.parent_company_id)
+
+
+@receiver([post_save, post_delete], sender=BrandParentCompany)
+def invalidate_company_upc_rules(instance: BrandParentCompany, **_kwargs: Any) -> None:
+    invalidate_upc_normalizer(instance.id)
+
+
+@receiver([post_save, post_delete], sender=WorkCycle)
+def invalidate_current_work_cycle(**_kwargs: Any) -> None:
+    work_cycle_cache.invalidate()
+
+
+@receiver([post_save, post_delete], sender=MessageRecipient)
+def invalidate_unread_message_count(instance: MessageRecipient, **_kwargs: Any) -> None:
+    # covers changes made outside of Message.send_to_users and MessageRecipient.mark_read (which
+    # adjust the count themselves), like admin edits and cascading deletes
+    invalidate_unread_message_counts([instance.user_id])
@@ -1,19 +1,25 @@
 import logging
 import re
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import timedelta
 from http import HTTPStatus
 from io import BytesIO
 
-import redis
+import django_rq
 import requests
-from django.conf import settings
 from django.core.files import File
 from django.utils import timezone
 from django_rq import job
-from PIL import Image, ImageChops, ImageOps
 
-from .models import Product, ProductAddition
+from server.utils.common import get_http_retrier, get_redis_client
+from server.utils.rate_limit import RedisTokenBucket
+
+from . import push
+from .barcodes import barcode_image_cache
+from .images import process_product_image
+from .models import Message, Product, ProductAddition
 from .types import IUpcItemDbData, IUpcItemDbItem
 
 PRODUCT_LOOKUP_ENDPOINT = "https://api.upcitemdb.com/prod/trial/lookup?upc={upc_lookup_str}"
@@ -29,36 +35,53 @@ IMAGE_HOSTNAME_PREFERENCES = [
     "media.officedepot.com",
     "c1.neweggimages.com",
 ]
+IMAGE_HOSTNAME_RANKS = {hostname: rank for rank, hostname in enumerate(IMAGE_HOSTNAME_PREFERENCES)}
+# image download outcome counts per hostname, see get_image_hostname_score
+IMAGE_HOSTNAME_SUCCESSES_KEY = "image_hostname_successes"
+IMAGE_HOSTNAME_FAILURES_KEY = "image_hostname_failures"
+RANKED_HOSTNAME_PRIOR = 0.9
+UNRANKED_HOSTNAME_PRIOR = 0.5
+# how many downloads the prior counts for
+HOSTNAME_PRIOR_WEIGHT = 5
 DOMAIN_HOSTNAME_RE = re.compile(r"^((?:http[s]?|ftp)://?)?(?:www\.)?([^:/\s]+)")
-PRODUCT_IMAGE_DIMENSIONS_TARGET = (600, 600)
+# image bodies larger than this are abandoned mid-download
+PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
 
 logger = logging.getLogger("rq.worker")
 
-# add UPCs to Redis memory store after processing to avoid wasting precious API hits upon future worker calls
+# UPCs are claimed in the Redis store before lookup to avoid wasting precious API hits upon future or
+# concurrent worker calls
 upc_to_fetch_key_template = "upc_to_fetch_{upc}"
+UPC_TO_FETCH_CLAIM_TTL = timedelta(days=1)
+
+redis_client = get_redis_client()
 
-redis_client = redis.Redis(
-    host=settings.RQ_QUEUES["default"]["HOST"],
-    password=settings.RQ_QUEUES["default"]["PASSWORD"],
-    port=settings.RQ_QUEUES["default"]["PORT"],
-    db=settings.RQ_QUEUES["default"]["DB"],
+# upcitemdb's trial API allows 6 lookups per minute; capacity 1 spaces them evenly across all workers
+upcitemdb_rate_limiter = RedisTokenBucket(
+    redis_client, "upcitemdb_rate_limit", num_requests=6, period=timedelta(minutes=1)
 )
+UPCITEMDB_MAX_INLINE_WAIT_SECONDS = 1.0
+UPCS_PER_LOOKUP = 2
+IMAGE_DOWNLOAD_MAX_WORKERS = 4
+
+_thread_local = threading.local()
+
+PUSH_MAX_ATTEMPTS = 4
+PUSH_RETRY_BASE_DELAY = timedelta(seconds=30)
 
 
 @job
 def get_external_product_images() -> None:
     logger.info("Received job to fetch product images from API")
     yesterday_date = timezone.localdate() - timedelta(days=1)
-    latest_products_with_no_image = Product.objects.filter(
-        date_added__gt=yesterday_date, item_image=""
+    latest_products_with_no_image = list(
+        Product.objects.filter(date_added__gt=yesterday_date, item_image="")
     )
+    logger.info("Found %s recent products with no image set", len(latest_products_with_no_image))
 
-    logger.info("Found %s recent products with no image set", latest_products_with_no_image.count())
-
+    claimed_upcs = set(claim_upcs_to_fetch([p.upc for p in latest_products_with_no_image]))
     products_to_fetch_image: list[Product] = [
-        product
-        for product in latest_products_with_no_image
-        if not redis_client.exists(upc_to_fetch_key_template.format(upc=product.upc))
+        product for product in latest_products_with_no_image if product.upc in claimed_upcs
     ]
 
     logger.info("Fetching data from API for %s products", len(products_to_fetch_image))
@@ -84,59 +107,227 @@ def carry_ordered_products() -> None:
     )
 
 
-def add_upcs_to_redis_store(*upcs: str) -> None:
-    for upc in upcs:
-        logger.info("Adding %s to redis store", upc)
-        upc_to_fetch_key = upc_to_fetch_key_template.format(upc=upc)
-        redis_client.set(upc_to_fetch_key, 1)
-        redis_client.expire(upc_to_fetch_key, timedelta(days=1))
+@job
+def prerender_barcodes(upcs: list[str]) -> None:
+    """
+    Render the barcode images for a newly created BarcodeSheet ahead of time, so that
+    serving the sheet only has to read already-rendered images.
+    """
+    num_rendered = barcode_image_cache.prerender(upcs)
+    logger.info("Pre-rendered %s of %s barcode image(s)", num_rendered, len(upcs))
 
 
-def fetch_product_data(products_to_fetch_image: list[Product]) -> None:
-    split_size = 2
+@job
+def send_push_notifications(
+    message_id: int,
+    user_ids: list[int],
+    subscription_ids: list[int] | None = None,
+    attempt: int = 1,
+) -> None:
+    """
+    Push `Message` `message_id` to `user_ids`' devices (see push.send_push_to_users), then
+    retry subscriptions that failed in a retryable way with exponential backoff, up to
+    PUSH_MAX_ATTEMPTS attempts. Retries are delayed jobs, which need an RQ worker running with
+    --with-scheduler (see defer_fetch_product_data).
+    """
+    message = Message.objects.filter(pk=message_id).first()
+    if message is None:
+        logger.info("Message %s no longer exists. Not sending push notifications", message_id)
+        return
+
+    retry_subscription_ids = push.send_push_to_users(message, user_ids, subscription_ids)
+    if not retry_subscription_ids:
+        return
+
+    if attempt >= PUSH_MAX_ATTEMPTS:
+        logger.error(
+            "Giving up on push delivery of message %s to %s subscriptions after %s attempts",
+            message_id,
+            len(retry_subscription_ids),
+            attempt,
+        )
+        return
 
-    for idx in range(0, len(products_to_fetch_image), split_size):
-        products = products_to_fetch_image[idx : idx + split_size]
-        upc_pair = [p.upc for p in products]
+    retry_delay = PUSH_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+    logger.info(
+        "Retrying push delivery of message %s to %s subscriptions in %s",
+        message_id,
+        len(retry_subscription_ids),
+        retry_delay,
+    )
+    django_rq.get_queue("default").enqueue_in(
+        retry_delay,
+        send_push_notifications,
+        message_id,
+        user_ids,
+        retry_subscription_ids,
+        attempt + 1,
+    )
 
-        endpoint_url = PRODUCT_LOOKUP_ENDPOINT.format(upc_lookup_str=",".join(upc_pair))
-        logger.info(
-            "Fetching data from API for UPC pair %s at endpoint: %s", upc_pair, endpoint_url
-        )
-        resp: requests.Response = requests.get(endpoint_url, timeout=15)
 
-        if resp.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            logger.error("Rate limit has been hit. Waiting 60 seconds")
-            time.sleep(61)
-            continue
-        if not resp.ok:
-            logger.error(
-                "Bad response: Status code %s received on lookup for UPC pair %s. Response text: %s",
-                resp.status_code,
-                upc_pair,
-                resp.text,
-            )
-            break
-
-        data: IUpcItemDbData = resp.json()
-        items = data["items"]
-        if not items:
-            add_upcs_to_redis_store(*upc_pair)
-            logger.error(
-                "Response json did not have 'items' info in response for UPC pair %s", upc_pair
+def claim_upcs_to_fetch(upcs: list[str]) -> list[str]:
+    """
+    Mark each of `upcs` in the Redis store with SET NX EX, all in one pipelined round trip.
+    Each SET NX is atomic, so when workers race for the same UPC only one of them claims it.
+
+    Returns:
+        list[str]: the UPCs claimed by this call, i.e. those not already in the store
+    """
+    if not upcs:
+        return []
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for upc in upcs:
+            pipe.set(
+                upc_to_fetch_key_template.format(upc=upc), 1, ex=UPC_TO_FETCH_CLAIM_TTL, nx=True
             )
-            continue
+        results = pipe.execute()
+
+    claimed_upcs = [upc for upc, is_claimed in zip(upcs, results, strict=True) if is_claimed]
+    logger.info("Claimed %s of %s UPCs in redis store", len(claimed_upcs), len(upcs))
+    return claimed_upcs
+
+
+def release_upcs_to_fetch(upcs: list[str]) -> None:
+    """Remove claims on `upcs` that were never looked up, so a future run can claim them."""
+    if not upcs:
+        return
+
+    logger.info("Releasing %s UPCs from redis store", len(upcs))
+    redis_client.delete(*[upc_to_fetch_key_template.format(upc=upc) for upc in upcs])
+
+
+@job
+def fetch_product_data_for_upcs(upcs: list[str]) -> None:
+    """
+    Continue `fetch_product_data` for `upcs`, once the upcitemdb rate limit allows it.
+    Products that got an image in the meantime are skipped.
+    """
+    products_by_upc = {p.upc: p for p in Product.objects.filter(upc__in=upcs, item_image="")}
+    fetch_product_data([products_by_upc[upc] for upc in upcs if upc in products_by_upc])
+
+
+def acquire_upcitemdb_lookup() -> float:
+    """
+    Take a upcitemdb lookup token, sleeping through waits short enough not to be worth a
+    delayed job. Returns 0 if a token was taken, else the seconds until one is available.
+    """
+    wait_seconds = upcitemdb_rate_limiter.try_acquire()
+    if 0 < wait_seconds <= UPCITEMDB_MAX_INLINE_WAIT_SECONDS:
+        time.sleep(wait_seconds)
+        wait_seconds = upcitemdb_rate_limiter.try_acquire()
+    return wait_seconds
 
-        logger.info("Handling product data response for UPC pair: %s", upc_pair)
-        handle_product_data_response(products, items)
 
-        # API is limited to 6 requests per minute
-        if (idx + 1) % 6 == 0:
-            logger.info("Waiting 60 seconds in advance to avoid hitting rate limit")
-            time.sleep(61)
+def defer_fetch_product_data(products: list[Product], delay_seconds: float) -> None:
+    """
+    Look up `products` in a job delayed by `delay_seconds`. Delayed jobs are only moved to the
+    queue by an RQ worker running with --with-scheduler, like rq_worker_default in the compose
+    files.
+    """
+    logger.info(
+        "Deferring lookup of %s products by %.1f seconds due to the API rate limit",
+        len(products),
+        delay_seconds,
+    )
+    django_rq.get_queue("default").enqueue_in(
+        timedelta(seconds=delay_seconds), fetch_product_data_for_upcs, [p.upc for p in products]
+    )
 
 
-def handle_product_data_response(products: list[Product], items: list[IUpcItemDbItem]) -> None:
+def fetch_product_data(products_to_fetch_image: list[Product]) -> None:
+    """
+    Look up `products_to_fetch_image` on upcitemdb, UPCS_PER_LOOKUP at a time, and download
+    their images. The products' UPCs must already be claimed with `claim_upcs_to_fetch`;
+    claims stay in place for UPCs that were looked up or deferred to a later job, and are
+    released for the others, including when a lookup fails with an exception.
+
+    Lookups are paced by `upcitemdb_rate_limiter`, which is shared by all workers. Instead of
+    sleeping until the next lookup is allowed, the remaining products are handed to a
+    delayed job, so the worker is free in the meantime. Image downloads run on a thread pool
+    while lookups continue, which also trims and resizes the downloaded images; the images are
+    saved from this thread once processed.
+    """
+    lookup_session = requests.Session()
+    hostname_stats = get_image_hostname_stats()
+
+    with ThreadPoolExecutor(max_workers=IMAGE_DOWNLOAD_MAX_WORKERS) as executor:
+        image_futures: dict[Future[bytes | None], Product] = {}
+
+        # products before this index were looked up or handed to a deferred job
+        num_handled = 0
+        try:
+            for idx in range(0, len(products_to_fetch_image), UPCS_PER_LOOKUP):
+                wait_seconds = acquire_upcitemdb_lookup()
+                if wait_seconds > 0:
+                    defer_fetch_product_data(products_to_fetch_image[idx:], wait_seconds)
+                    num_handled = len(products_to_fetch_image)
+                    break
+
+                products = products_to_fetch_image[idx : idx + UPCS_PER_LOOKUP]
+                upc_pair = [p.upc for p in products]
+
+                endpoint_url = PRODUCT_LOOKUP_ENDPOINT.format(upc_lookup_str=",".join(upc_pair))
+                logger.info(
+                    "Fetching data from API for UPC pair %s at endpoint: %s", upc_pair, endpoint_url
+                )
+                resp: requests.Response = lookup_session.get(endpoint_url, timeout=15)
+
+                if resp.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                    logger.error("Rate limit has been hit. Retrying in 61 seconds")
+                    defer_fetch_product_data(products_to_fetch_image[idx:], 61)
+                    num_handled = len(products_to_fetch_image)
+                    break
+                if not resp.ok:
+                    logger.error(
+                        "Bad response: Status code %s received on lookup for UPC pair %s. Response text: %s",
+                        resp.status_code,
+                        upc_pair,
+                        resp.text,
+                    )
+                    break
+
+                data: IUpcItemDbData = resp.json()
+                items = data["items"]
+                num_handled = idx + len(products)
+                if not items:
+                    logger.error(
+                        "Response json did not have 'items' info in response for UPC pair %s",
+                        upc_pair,
+                    )
+                    continue
+
+                logger.info("Handling product data response for UPC pair: %s", upc_pair)
+                for product, product_image_urls in get_product_image_urls(
+                    products, items, hostname_stats
+                ):
+                    image_future = executor.submit(
+                        download_first_image, product.upc, product_image_urls
+                    )
+                    image_futures[image_future] = product
+        finally:
+            # including when a lookup raised, so that a later run can claim them again
+            release_upcs_to_fetch([p.upc for p in products_to_fetch_image[num_handled:]])
+
+        for image_future in as_completed(image_futures):
+            product = image_futures[image_future]
+            image = image_future.result()
+            if image is not None:
+                # filename 'random_image' will be ignored, file extension will be used to save to Product ImageField
+                product.item_image.save("random_name.jpg", File(BytesIO(image)), save=True)
+
+
+def get_product_image_urls(
+    products: list[Product],
+    items: list[IUpcItemDbItem],
+    hostname_stats: dict[str, tuple[int, int]],
+) -> list[tuple[Product, list[str]]]:
+    """
+    Pair each of `products` with its image URLs in `items`, most preferred first. Products
+    without data or images in `items` are left out.
+    """
+    product_image_urls_list: list[tuple[Product, list[str]]] = []
+
     for product in products:
         product_data = next((d for d in items if d.get("upc") == product.upc), None)
         if not product_data:
@@ -149,102 +340,191 @@ def handle_product_data_response(products: list[Product], items: list[IUpcItemDb
             continue
 
         logger.info("Processing UPC %s image URL list: %s", product.upc, product_image_urls)
-        product_image_urls = reorder_images_based_on_preferences(product_image_urls)
-        for product_image_url in product_image_urls:
-            success = download_image(product, product_image_url)
-            if success:
-                logger.info(
-                    "Downloaded image successfully for %s. Image URL: %s",
-                    product.upc,
-                    product_image_url,
-                )
-                break
-        add_upcs_to_redis_store(product.upc)
+        product_image_urls_list.append(
+            (product, reorder_images_based_on_preferences(product_image_urls, hostname_stats))
+        )
+
+    return product_image_urls_list
+
+
+def get_thread_http_session() -> requests.Session:
+    session: requests.Session | None = getattr(_thread_local, "http_session", None)
+    if session is None:
+        session = get_http_retrier()
+        _thread_local.http_session = session
+    return session
+
+
+def download_first_image(upc: str, product_image_urls: list[str]) -> bytes | None:
+    """
+    Try `product_image_urls` in order and return the first one that downloads and processes
+    successfully, as JPEG bytes. Runs on the image download thread pool.
+    """
+    for product_image_url in product_image_urls:
+        image = download_image(upc, product_image_url)
+        if image is not None:
+            logger.info(
+                "Downloaded image successfully for %s. Image URL: %s", upc, product_image_url
+            )
+            return image
+    return None
 
 
-def download_image(product: Product, product_image_url: str) -> bool:
+def download_image(upc: str, product_image_url: str) -> bytes | None:
     """
-    Download image from URL, trim any excessive border padding and resize to a smaller size
+    Download image from URL, then trim any excessive border padding and resize to a smaller size
+    in this process. Timings are logged per image, to help find slow image sources.
+
+    Processing isn't handed to a process pool: RQ already runs each job in its own forked work
+    horse, which would have to start the pool's interpreters for the one or two images a job
+    has (measured at ~250 ms per job, vs 14 ms to process an 800x800 JPEG and 77 ms for a
+    3000x3000 one). Pillow releases the GIL while decoding and resizing, so the download
+    threads still process images in parallel.
 
     Args:
-        product (Product): model.Product instance onto which to save the image
-        product_image_url (list): list<str> of image URLs
+        upc (str): UPC of the product the image is for
+        product_image_url (str): image URL
 
     Returns:
-        bool: Indicates whether downloading from URL and processing of image was successful
+        bytes | None: the processed image as JPEG, or None if downloading from URL or processing of image failed
     """
+    logger.info("Attempting to download '%s' product image from '%s'", upc, product_image_url)
+
+    download_start_time = time.perf_counter()
+    image_data = download_image_data(product_image_url)
+    download_seconds = time.perf_counter() - download_start_time
+    if image_data is None:
+        record_image_download_result(product_image_url, is_success=False)
+        return None
+
+    processed_image = process_product_image(image_data)
     logger.info(
-        "Attempting to download '%s' product image from '%s'", product.upc, product_image_url
+        "Image %s: downloaded %s bytes in %.2fs, processed in %.2fs (source size %s, decoded size %s)",
+        product_image_url,
+        len(image_data),
+        download_seconds,
+        processed_image.seconds_taken,
+        processed_image.source_size,
+        processed_image.decoded_size,
     )
-    try:
-        resp = requests.get(product_image_url, timeout=15)
-        if not resp.ok:
-            logger.error(
-                "Bad response when fetching image URL content: Status Code: %s", resp.status_code
-            )
-            return False
+    if processed_image.error is not None:
+        logger.error(
+            "Could not process image %s: %s. Moving to next product image URL",
+            product_image_url,
+            processed_image.error,
+        )
 
-        product_image = trim_and_resize_image(Image.open(BytesIO(resp.content)))
-        if product_image is None:
-            logger.error(
-                "Trim and resize attempt returned None for %s. Moving to next product image URL",
-                product_image_url,
-            )
-            return False
+    record_image_download_result(product_image_url, is_success=processed_image.image is not None)
+    return processed_image.image
 
-        buffer = BytesIO()
-        product_image.save(buffer, format="JPEG")
 
-        # filename 'random_image' will be ignored, file extension will be used to save to Product ImageField
-        product.item_image.save("random_name.jpg", File(buffer), save=True)
+def download_image_data(product_image_url: str) -> bytes | None:
+    """
+    Stream the body of `product_image_url` into memory, giving up once it exceeds
+    PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES.
+    """
+    try:
+        with get_thread_http_session().get(product_image_url, timeout=15, stream=True) as resp:
+            if not resp.ok:
+                logger.error(
+                    "Bad response when fetching image URL content: Status Code: %s",
+                    resp.status_code,
+                )
+                return None
+
+            content_length = int(resp.headers.get("Content-Length") or 0)
+            if content_length > PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES:
+                logger.error(
+                    "Image %s is too large to download (%s bytes)",
+                    product_image_url,
+                    content_length,
+                )
+                return None
+
+            buffer = BytesIO()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                buffer.write(chunk)
+                if buffer.tell() > PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES:
+                    logger.error(
+                        "Image %s exceeded %s bytes while downloading",
+                        product_image_url,
+                        PRODUCT_IMAGE_MAX_DOWNLOAD_BYTES,
+                    )
+                    return None
     except Exception:
         logger.exception(
-            "Exception occurred while retrieving/processing product image URL %s", product_image_url
+            "Exception occurred while retrieving product image URL %s", product_image_url
         )
-        return False
+        return None
 
-    return True
+    return buffer.getvalue()
 
 
-def reorder_images_based_on_preferences(product_image_urls: list[str]) -> list[str]:
-    preferred_urls: set[str] = set()
-    remaining_urls: set[str] = set()
+def get_image_hostname(image_url: str) -> str | None:
+    hostname_match = DOMAIN_HOSTNAME_RE.search(image_url)
+    if hostname_match is None:
+        logger.error("No DOMAIN_HOSTNAME_RE match found in url %s", image_url)
+        return None
+    return hostname_match.group(2)
 
-    for preference_hostname in IMAGE_HOSTNAME_PREFERENCES:
-        for image_url in product_image_urls:
-            hostname_match = DOMAIN_HOSTNAME_RE.search(image_url)
-            if hostname_match is None:
-                logger.error("No DOMAIN_HOSTNAME_RE match found in url %s", image_url)
-                continue
 
-            hostname = hostname_match.group(2)
-            if hostname == preference_hostname:
-                preferred_urls.add(image_url)
-            else:
-                remaining_urls.add(image_url)
+def get_image_hostname_stats() -> dict[str, tuple[int, int]]:
+    """
+    Past image download outcomes per hostname, read in one round trip.
 
-    return list(preferred_urls | remaining_urls)
+    Returns:
+        dict: hostname -> (number of successful downloads, number of failed downloads)
+    """
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hgetall(IMAGE_HOSTNAME_SUCCESSES_KEY)
+        pipe.hgetall(IMAGE_HOSTNAME_FAILURES_KEY)
+        successes, failures = pipe.execute()
 
+    return {
+        hostname.decode(): (int(successes.get(hostname, 0)), int(failures.get(hostname, 0)))
+        for hostname in successes.keys() | failures.keys()
+    }
 
-def trim_and_resize_image(img: Image.Image) -> Image.Image | None:
-    def trim_borders(img: Image.Image) -> Image.Image | None:
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGB")
 
-        bg = Image.new(img.mode, img.size, img.getpixel((0, 0)))
-        diff = ImageChops.difference(img, bg)
-        diff = ImageChops.add(diff, diff, 2.0, -100)
-        bbox = diff.getbbox()
-        if bbox:
-            img = img.crop(bbox)
-            return ImageOps.expand(img, border=10, fill=(255, 255, 255))
+def record_image_download_result(product_image_url: str, *, is_success: bool) -> None:
+    hostname = get_image_hostname(product_image_url)
+    if hostname is None:
+        return
 
-        return None
+    key = IMAGE_HOSTNAME_SUCCESSES_KEY if is_success else IMAGE_HOSTNAME_FAILURES_KEY
+    redis_client.hincrby(key, hostname, 1)
 
-    trimmed_img = trim_borders(img)
-    if trimmed_img is None:
-        return None
 
-    if trimmed_img.size > PRODUCT_IMAGE_DIMENSIONS_TARGET:
-        trimmed_img.thumbnail(PRODUCT_IMAGE_DIMENSIONS_TARGET, Image.Resampling.LANCZOS)
-    return trimmed_img
+def get_image_hostname_score(hostname: str | None, stats: dict[str, tuple[int, int]]) -> float:
+    """
+    Estimated chance that downloading an image from `hostname` succeeds: its observed success
+    rate, smoothed towards a prior that is higher the more preferred the hostname is, so that
+    hostnames with few recorded downloads keep roughly their IMAGE_HOSTNAME_PREFERENCES rank.
+    """
+    rank = IMAGE_HOSTNAME_RANKS.get(hostname or "")
+    prior = UNRANKED_HOSTNAME_PRIOR if rank is None else RANKED_HOSTNAME_PRIOR - 0.01 * rank
+
+    num_successes, num_failures = stats.get(hostname or "", (0, 0))
+    return (num_successes + prior * HOSTNAME_PRIOR_WEIGHT) / (
+        num_successes + num_failures + HOSTNAME_PRIOR_WEIGHT
+    )
+
+
+def reorder_images_based_on_preferences(
+    product_image_urls: list[str], hostname_stats: dict[str, tuple[int, int]] | None = None
+) -> list[str]:
+    """
+    Deduplicate `product_image_urls` and order them by `get_image_hostname_score`, best first.
+    Ties keep the hostname preference order, then the original order.
+    """
+    hostname_stats = hostname_stats or {}
+    unique_urls = list(dict.fromkeys(product_image_urls))
+
+    def get_sort_key(idx_and_url: tuple[int, str]) -> tuple[float, int, int]:
+        idx, image_url = idx_and_url
+        hostname = get_image_hostname(image_url)
+        score = get_image_hostname_score(hostname, hostname_stats)
+        rank = IMAGE_HOSTNAME_RANKS.get(hostname or "", len(IMAGE_HOSTNAME_RANKS))
+        return (-score, rank, idx)
+
+    return [image_url for _, image_url in sorted(enumerate(unique_urls), key=get_sort_key)]
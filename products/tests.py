@@ -1,11 +1,37 @@
+import tempfile
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from pathlib import Path
 from typing import Any
+from unittest import mock
 
+import redis
+import requests
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
 from django.test import TestCase
 from django.utils import timezone
+from PIL import Image, ImageDraw
+from py_vapid import Vapid, b64urlencode
+from pywebpush import WebPushException
 
-from . import models
+from server.utils.testing import LocMemCacheTestCase
+
+from . import images, models, push, tasks
+from .barcodes import BarcodeImageCache
+from .images import PRODUCT_IMAGE_DIMENSIONS_TARGET, process_product_image
+from .push import PushSender
+from .tasks import reorder_images_based_on_preferences
+from .unread_counts import get_unread_message_count
+from .util import (
+    get_current_work_cycle,
+    get_num_work_cycles_offset,
+    get_outside_work_cycle_filter,
+    upsert_products,
+)
+from .util.upc import get_upc_normalizer
 
 
 def printdebug(*items: Any) -> None:
@@ -103,3 +129,468 @@ class ProductAdditionTest(TestCase):
 
         product_addition = models.ProductAddition(store=store1, product=product1, is_carried=True)
         self.assertRaises(IntegrityError, product_addition.save)
+
+
+class BarcodeImageCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def test_get_renders_once(self) -> None:
+        cache = BarcodeImageCache(Path(self.cache_dir.name), max_entries=1)
+
+        png = cache.get("190198131553")
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertEqual(png, cache.get("190198131553"))
+
+        # evicted from the LRU, but still served from disk
+        cache.get("044600320649")
+        self.assertEqual(png, cache.get("190198131553"))
+
+    def test_prerender(self) -> None:
+        cache = BarcodeImageCache(Path(self.cache_dir.name), max_entries=10)
+
+        self.assertEqual(2, cache.prerender(["190198131553", "044600320649", "1234"]))
+        self.assertEqual(0, cache.prerender(["190198131553"]))
+
+
+class UpcNormalizerTest(TestCase):
+    def setUp(self) -> None:
+        self.company = models.BrandParentCompany.objects.create(
+            short_name="CLRX", expanded_name="Clorox", default_upc_prefixes=["0"]
+        )
+
+    def test_get_valid_upc(self) -> None:
+        models.UpcCorrection.objects.create(
+            parent_company=self.company, bad_upc="12345", actual_upc="044600320649"
+        )
+
+        with self.assertNumQueries(2):
+            upc_normalizer = get_upc_normalizer(self.company)
+
+        with self.assertNumQueries(0):
+            self.assertEqual("044600320649", upc_normalizer.get_valid_upc("44600320649", ""))
+            self.assertEqual("044600320649", upc_normalizer.get_valid_upc(" 12345 ", ""))
+            self.assertIsNone(upc_normalizer.get_valid_upc("190198131553", ""))
+
+    def test_invalidation(self) -> None:
+        upc_normalizer = get_upc_normalizer(self.company)
+        self.assertIs(upc_normalizer, get_upc_normalizer(self.company))
+
+        models.PrefixMapping.objects.create(
+            parent_company=self.company, prefix="0", product_name_regex="^clorox"
+        )
+        upc_normalizer = get_upc_normalizer(self.company)
+        self.assertEqual("0", upc_normalizer.get_prefix_from_product_name("Clorox Wipes"))
+        self.assertIsNone(upc_normalizer.get_prefix_from_product_name("Wipes"))
+
+
+class UpsertProductsTest(TestCase):
+    def setUp(self) -> None:
+        self.company = models.BrandParentCompany.objects.create(
+            short_name="CLRX", expanded_name="Clorox", default_upc_prefixes=["0"]
+        )
+        models.Product.objects.create(upc="044600320649", name="", parent_company=self.company)
+        models.Product.objects.create(
+            upc="044600301853", name="Clorox Bleach", parent_company=self.company
+        )
+
+    def test_upsert(self) -> None:
+        products = [
+            models.Product(upc="044600320649", name="Clorox Wipes", parent_company=self.company),
+            models.Product(upc="044600301853", name="Renamed", parent_company=self.company),
+            models.Product(upc="044600016214", name="Pine-Sol", parent_company=self.company),
+        ]
+
+        with self.assertNumQueries(1):
+            upsert_products(products)
+
+        self.assertEqual(models.Product.objects.get(upc="044600320649").name, "Clorox Wipes")
+        self.assertEqual(models.Product.objects.get(upc="044600301853").name, "Clorox Bleach")
+        self.assertEqual(models.Product.objects.get(upc="044600016214").name, "Pine-Sol")
+
+
+class OutsideWorkCycleFilterTest(TestCase):
+    def test_matches_num_work_cycles_offset(self) -> None:
+        work_cycle = models.WorkCycle(start_date=date(2024, 1, 7), end_date=date(2024, 1, 20))
+        store = models.Store.objects.create(name="store-name")
+        dates_ordered = [work_cycle.start_date + timedelta(days=i) for i in range(-30, 30)]
+        models.Product.objects.bulk_create(
+            [models.Product(upc=str(idx).zfill(12)) for idx in range(len(dates_ordered))]
+        )
+        models.ProductAddition.objects.bulk_create(
+            [
+                models.ProductAddition(store=store, product=product, date_ordered=date_ordered)
+                for product, date_ordered in zip(
+                    models.Product.objects.order_by("upc"), dates_ordered, strict=True
+                )
+            ]
+        )
+
+        matched_dates = set(
+            models.ProductAddition.objects.filter(
+                get_outside_work_cycle_filter("date_ordered", work_cycle)
+            ).values_list("date_ordered", flat=True)
+        )
+        expected_dates = {d for d in dates_ordered if get_num_work_cycles_offset(d, work_cycle) > 0}
+        self.assertEqual(matched_dates, expected_dates)
+
+
+class WorkCycleCacheTest(LocMemCacheTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        today_date = timezone.localdate()
+        self.work_cycle = models.WorkCycle.objects.create(
+            start_date=today_date - timedelta(days=3), end_date=today_date + timedelta(days=10)
+        )
+
+    def test_get_current_work_cycle(self) -> None:
+        with self.assertNumQueries(1):
+            self.assertEqual(get_current_work_cycle().pk, self.work_cycle.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_current_work_cycle().pk, self.work_cycle.pk)
+
+    def test_invalidation(self) -> None:
+        get_current_work_cycle()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.work_cycle.delete()
+
+        with self.assertRaises(ValueError):
+            get_current_work_cycle()
+
+
+class ReorderImagesTest(TestCase):
+    def test_preference_order(self) -> None:
+        image_urls = [
+            "https://example.com/a.jpg",
+            "https://i.walmartimages.com/b.jpg",
+            "https://target.scene7.com/c.jpg",
+            "https://example.com/a.jpg",
+        ]
+        self.assertEqual(
+            reorder_images_based_on_preferences(image_urls),
+            [
+                "https://target.scene7.com/c.jpg",
+                "https://i.walmartimages.com/b.jpg",
+                "https://example.com/a.jpg",
+            ],
+        )
+
+    def test_learned_hostname_stats(self) -> None:
+        image_urls = ["https://target.scene7.com/c.jpg", "https://example.com/a.jpg"]
+        hostname_stats = {"target.scene7.com": (0, 20), "example.com": (20, 0)}
+        self.assertEqual(
+            reorder_images_based_on_preferences(image_urls, hostname_stats),
+            ["https://example.com/a.jpg", "https://target.scene7.com/c.jpg"],
+        )
+
+
+class ProcessProductImageTest(TestCase):
+    def encode_image(self, image: Image.Image, image_format: str) -> bytes:
+        buffer = BytesIO()
+        image.save(buffer, format=image_format)
+        return buffer.getvalue()
+
+    def get_product_image(self, size: tuple[int, int], mode: str = "RGB") -> Image.Image:
+        """A dark box on a white background, which trimming crops down to the box."""
+        image = Image.new(mode, size, "white")
+        ImageDraw.Draw(image).rectangle(
+            (size[0] // 4, size[1] // 4, size[0] * 3 // 4, size[1] * 3 // 4), fill="navy"
+        )
+        return image
+
+    def test_large_jpeg_is_draft_decoded(self) -> None:
+        image_data = self.encode_image(self.get_product_image((4800, 4800)), "JPEG")
+
+        processed_image = process_product_image(image_data)
+
+        self.assertIsNone(processed_image.error)
+        self.assertEqual(processed_image.source_size, (4800, 4800))
+        self.assertEqual(processed_image.decoded_size, (1200, 1200))
+        if processed_image.image is None:
+            self.fail(f"Image was not processed: {processed_image.error}")
+        with Image.open(BytesIO(processed_image.image)) as result:
+            self.assertEqual(result.format, "JPEG")
+            self.assertLessEqual(result.size, PRODUCT_IMAGE_DIMENSIONS_TARGET)
+
+    def test_oversized_image(self) -> None:
+        # PNGs have no draft mode, so they are decoded at full size
+        image_data = self.encode_image(self.get_product_image((200, 200)), "PNG")
+
+        with mock.patch.object(images, "PRODUCT_IMAGE_MAX_DECODED_PIXELS", 100 * 100):
+            processed_image = process_product_image(image_data)
+
+        self.assertIsNone(processed_image.image)
+        self.assertEqual(processed_image.decoded_size, (200, 200))
+        self.assertEqual(processed_image.error, "Image is too large")
+
+    def test_non_jpeg(self) -> None:
+        image_data = self.encode_image(self.get_product_image((300, 300), mode="RGBA"), "PNG")
+
+        processed_image = process_product_image(image_data)
+
+        self.assertIsNone(processed_image.error)
+        self.assertEqual(processed_image.source_size, processed_image.decoded_size)
+        if processed_image.image is None:
+            self.fail(f"Image was not processed: {processed_image.error}")
+        with Image.open(BytesIO(processed_image.image)) as result:
+            self.assertEqual(result.format, "JPEG")
+            # the box plus a 10px border on each side
+            self.assertEqual(result.size, (171, 171))
+
+    def test_corrupt_body(self) -> None:
+        for image_data in (
+            b"<html>Not found</html>",
+            self.encode_image(self.get_product_image((300, 300)), "JPEG")[:200],
+        ):
+            processed_image = process_product_image(image_data)
+            self.assertIsNone(processed_image.image)
+            self.assertIsNotNone(processed_image.error)
+
+    def test_download_image(self) -> None:
+        image_data = self.encode_image(self.get_product_image((300, 300)), "JPEG")
+
+        with (
+            mock.patch.object(tasks, "download_image_data", side_effect=[image_data, b"image"]),
+            mock.patch.object(tasks, "record_image_download_result") as record_result,
+        ):
+            self.assertIsNotNone(tasks.download_image("190198131553", "https://example.com/a.jpg"))
+            self.assertIsNone(tasks.download_image("190198131553", "https://example.com/b.jpg"))
+
+        self.assertEqual(
+            record_result.call_args_list,
+            [
+                mock.call("https://example.com/a.jpg", is_success=True),
+                mock.call("https://example.com/b.jpg", is_success=False),
+            ],
+        )
+
+
+class FetchProductDataTest(TestCase):
+    def setUp(self) -> None:
+        self.products = [models.Product(upc=upc) for upc in ("190198131553", "036000291452")]
+        for patcher in (
+            mock.patch.object(tasks, "acquire_upcitemdb_lookup", return_value=0),
+            mock.patch.object(tasks, "get_image_hostname_stats", return_value={}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_claims_are_released_when_a_lookup_raises(self) -> None:
+        with (
+            mock.patch.object(requests.Session, "get", side_effect=TimeoutError),
+            mock.patch.object(tasks, "release_upcs_to_fetch") as release_upcs_to_fetch,
+            self.assertRaises(TimeoutError),
+        ):
+            tasks.fetch_product_data(self.products)
+
+        release_upcs_to_fetch.assert_called_once_with(["190198131553", "036000291452"])
+
+    def test_deferred_claims_are_kept(self) -> None:
+        with (
+            mock.patch.object(tasks, "acquire_upcitemdb_lookup", return_value=30),
+            mock.patch.object(tasks, "defer_fetch_product_data") as defer_fetch_product_data,
+            mock.patch.object(tasks, "release_upcs_to_fetch") as release_upcs_to_fetch,
+        ):
+            tasks.fetch_product_data(self.products)
+
+        defer_fetch_product_data.assert_called_once_with(self.products, 30)
+        release_upcs_to_fetch.assert_called_once_with([])
+
+
+class UnreadMessageCountTest(LocMemCacheTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create_user(username="rep1")
+
+    def test_counter_follows_send_and_mark_read(self) -> None:
+        self.assertEqual(get_unread_message_count(self.user.id), 0)
+
+        with (
+            mock.patch.object(tasks.send_push_notifications, "delay") as send_push_notifications,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            message = models.Message.send_to_users(user_ids=[self.user.id], title="t", body_md="b")
+        if message is None:
+            self.fail("Message was not sent")
+        send_push_notifications.assert_called_once_with(message.id, [self.user.id])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_message_count(self.user.id), 1)
+
+        message_recipient = models.MessageRecipient.objects.get(message=message, user=self.user)
+        stale_message_recipient = models.MessageRecipient.objects.get(pk=message_recipient.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            message_recipient.mark_read()
+            stale_message_recipient.mark_read()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_message_count(self.user.id), 0)
+
+    def test_push_enqueue_failure_does_not_fail_send(self) -> None:
+        with (
+            mock.patch.object(
+                tasks.send_push_notifications, "delay", side_effect=redis.ConnectionError
+            ),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            message = models.Message.send_to_users(user_ids=[self.user.id], title="t", body_md="b")
+
+        self.assertIsNotNone(message)
+        self.assertEqual(get_unread_message_count(self.user.id), 1)
+
+
+def get_web_push_exception(status_code: int) -> WebPushException:
+    response = requests.Response()
+    response.status_code = status_code
+    return WebPushException(f"Push failed: {status_code}", response=response)
+
+
+class SendPushToUsersTest(LocMemCacheTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create_user(username="rep1")
+        with mock.patch.object(tasks.send_push_notifications, "delay"):
+            message = models.Message.send_to_users(user_ids=[self.user.id], title="t", body_md="b")
+        if message is None:
+            self.fail("Message was not sent")
+        self.message = message
+
+    def create_subscriptions(self, *names: str) -> dict[str, models.PushSubscription]:
+        return {
+            name: models.PushSubscription.objects.create(
+                user=self.user,
+                endpoint=f"https://push.example.com/{name}",
+                p256dh_key="p256dh",
+                auth_key="auth",
+            )
+            for name in names
+        }
+
+    def send(self, failures: dict[str, Exception]) -> list[int]:
+        """send_push_to_users, with the subscriptions named in `failures` failing with them."""
+
+        def send(subscription: models.PushSubscription, *_args: Any) -> None:
+            failure = failures.get(subscription.endpoint.rsplit("/", 1)[1])
+            if failure is not None:
+                raise failure
+
+        with mock.patch.object(push.push_sender, "send", side_effect=send):
+            return push.send_push_to_users(self.message, [self.user.id])
+
+    def test_deliveries_are_upserted_per_subscription(self) -> None:
+        subscriptions = self.create_subscriptions("phone", "desktop")
+
+        self.send({"desktop": get_web_push_exception(503)})
+        self.send({})
+
+        deliveries = models.MessageRecipientPushDelivery.objects.filter(
+            message_recipient__message=self.message
+        )
+        self.assertEqual(
+            {delivery.push_subscription_id for delivery in deliveries},
+            {subscription.id for subscription in subscriptions.values()},
+        )
+        self.assertTrue(all(delivery.delivered_at is not None for delivery in deliveries))
+
+    def test_expired_subscriptions_are_deleted(self) -> None:
+        subscriptions = self.create_subscriptions("gone", "not_found", "phone")
+
+        retry_subscription_ids = self.send(
+            {"gone": get_web_push_exception(410), "not_found": get_web_push_exception(404)}
+        )
+
+        self.assertEqual(retry_subscription_ids, [])
+        self.assertEqual(
+            list(models.PushSubscription.objects.values_list("id", flat=True)),
+            [subscriptions["phone"].id],
+        )
+
+    def test_only_transient_failures_are_retried(self) -> None:
+        subscriptions = self.create_subscriptions(
+            "rate_limited", "unavailable", "network", "bad_request", "bad_key", "phone"
+        )
+
+        retry_subscription_ids = self.send(
+            {
+                "rate_limited": get_web_push_exception(429),
+                "unavailable": get_web_push_exception(503),
+                "network": requests.ConnectionError("Connection refused"),
+                "bad_request": get_web_push_exception(400),
+                "bad_key": ValueError("Could not deserialize key data"),
+            }
+        )
+
+        self.assertEqual(
+            set(retry_subscription_ids),
+            {subscriptions[name].id for name in ("rate_limited", "unavailable", "network")},
+        )
+
+
+class SendPushNotificationsTest(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="rep1")
+        self.message = models.Message.objects.create(title="t", body_md="b")
+
+    def run_attempt(self, attempt: int) -> mock.MagicMock:
+        """Run the job's `attempt`th attempt with subscription 7 failing, returning the queue."""
+        queue = mock.MagicMock()
+        with (
+            mock.patch.object(push, "send_push_to_users", return_value=[7]) as send_push_to_users,
+            mock.patch("django_rq.get_queue", return_value=queue),
+        ):
+            tasks.send_push_notifications(self.message.id, [self.user.id], [7], attempt)
+
+        send_push_to_users.assert_called_once_with(self.message, [self.user.id], [7])
+        return queue
+
+    def test_retries_with_exponential_backoff(self) -> None:
+        for attempt in range(1, tasks.PUSH_MAX_ATTEMPTS):
+            queue = self.run_attempt(attempt)
+
+            queue.enqueue_in.assert_called_once_with(
+                tasks.PUSH_RETRY_BASE_DELAY * 2 ** (attempt - 1),
+                tasks.send_push_notifications,
+                self.message.id,
+                [self.user.id],
+                [7],
+                attempt + 1,
+            )
+
+    def test_gives_up_after_max_attempts(self) -> None:
+        queue = self.run_attempt(tasks.PUSH_MAX_ATTEMPTS)
+
+        queue.enqueue_in.assert_not_called()
+
+
+class PushSenderTest(TestCase):
+    def setUp(self) -> None:
+        vapid = Vapid()
+        vapid.generate_keys()
+        # same format as settings.VAPID_PRIVATE_KEY: the raw private value, base64url-encoded
+        private_key = b64urlencode(vapid.private_key.private_numbers().private_value.to_bytes(32))
+        self.push_sender = PushSender(private_key, "admin@example.com")
+
+    def test_vapid_headers_are_cached_per_origin(self) -> None:
+        fcm_headers = self.push_sender.get_vapid_headers("https://fcm.googleapis.com/fcm/send/a")
+        self.assertEqual(
+            self.push_sender.get_vapid_headers("https://fcm.googleapis.com/fcm/send/b"),
+            fcm_headers,
+        )
+        self.assertNotEqual(
+            self.push_sender.get_vapid_headers("https://updates.push.services.mozilla.com/c"),
+            fcm_headers,
+        )
+
+        timings = self.push_sender.get_timings()
+        self.assertEqual(timings["vapid_signs"], 2)
+        self.assertEqual(timings["vapid_header_cache_hits"], 1)
+
+    def test_vapid_headers_are_resigned_near_expiry(self) -> None:
+        endpoint = "https://fcm.googleapis.com/fcm/send/a"
+        self.push_sender.get_vapid_headers(endpoint)
+        with mock.patch("products.push.time.time", return_value=time.time() + 12 * 60 * 60):
+            self.push_sender.get_vapid_headers(endpoint)
+
+        self.assertEqual(self.push_sender.get_timings()["vapid_signs"], 2)
@@ -0,0 +1,80 @@
+import logging
+from collections.abc import Iterable
+from datetime import timedelta
+
+from django.core.cache import caches
+
+from server.utils.cache import CACHE_BACKEND_ERRORS
+
+logger = logging.getLogger("main_logger")
+
+# Per-user count of unread MessageRecipients, kept in the shared "default" cache so that
+# rendering a page doesn't need a COUNT query. Unlike AppCache values, counters have no
+# per-process copy, so a message read through one process is reflected by every other one right
+# away. A counter is only adjusted while it exists; a missing counter is recounted from the
+# database on the next read. The timeout, renewed by each adjustment, bounds how long a counter
+# can stay off if an adjustment is lost (e.g. one that races with that recount).
+UNREAD_MESSAGE_COUNT_KEY_TEMPLATE = "unread_message_count_{user_id}"
+UNREAD_MESSAGE_COUNT_TIMEOUT = timedelta(minutes=15)
+
+
+def _get_key(user_id: int) -> str:
+    return UNREAD_MESSAGE_COUNT_KEY_TEMPLATE.format(user_id=user_id)
+
+
+def _count_unread_messages(user_id: int) -> int:
+    from .models import MessageRecipient  # local import: models -> unread_counts is circular
+
+    return MessageRecipient.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def get_unread_message_count(user_id: int) -> int:
+    key = _get_key(user_id)
+    try:
+        cached_count: int | None = caches["default"].get(key)
+    except CACHE_BACKEND_ERRORS:
+        logger.warning("Could not read unread message count from the cache", exc_info=True)
+        return _count_unread_messages(user_id)
+
+    if cached_count is not None:
+        return max(cached_count, 0)
+
+    unread_message_count = _count_unread_messages(user_id)
+    try:
+        caches["default"].add(
+            key, unread_message_count, UNREAD_MESSAGE_COUNT_TIMEOUT.total_seconds()
+        )
+    except CACHE_BACKEND_ERRORS:
+        logger.warning("Could not cache unread message count", exc_info=True)
+
+    return unread_message_count
+
+
+def adjust_unread_message_counts(user_ids: Iterable[int], delta: int) -> None:
+    user_ids = list(user_ids)
+
+    try:
+        for user_id in user_ids:
+            key = _get_key(user_id)
+            try:
+                caches["default"].incr(key, delta)
+            except ValueError:
+                continue  # not cached; the next read recounts it
+
+            # the Redis cache's incr() checks that the key exists before incrementing it, so a
+            # counter that expired in between is recreated without a timeout
+            caches["default"].touch(key, UNREAD_MESSAGE_COUNT_TIMEOUT.total_seconds())
+    except CACHE_BACKEND_ERRORS:
+        logger.warning("Could not adjust unread message counts in the cache", exc_info=True)
+        invalidate_unread_message_counts(user_ids)
+
+
+def invalidate_unread_message_counts(user_ids: Iterable[int]) -> None:
+    keys = [_get_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+
+    try:
+        caches["default"].delete_many(keys)
+    except CACHE_BACKEND_ERRORS:
+        logger.warning("Could not invalidate unread message counts in the cache", exc_info=True)
@@ -2,9 +2,12 @@ import logging
 from datetime import date, timedelta
 
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
 from django.utils import timezone as dj_timezone
 
 from ..models import Product, Store, WorkCycle
+from .work_cycle_cache import WorkCycleCache
 
 logger = logging.getLogger("main_logger")
 
@@ -60,6 +63,61 @@ def get_missing_products(upcs_batch: list[str], products: list[Product]) -> list
     return missing_upcs
 
 
+def upsert_products(products: list[Product], batch_size: int = 500) -> int:
+    """
+    Insert `products` in a single INSERT ... ON CONFLICT statement per batch. An existing
+    product with the same UPC is left untouched unless it has no name, in which case it takes
+    the new name and parent company.
+
+    The products are not validated here - callers are expected to have done so already (e.g.
+    with UpcNormalizer.get_product_upc_error), and to pass at most one product per UPC.
+
+    Returns:
+        int: number of rows inserted or updated
+    """
+    meta = Product._meta  # noqa: SLF001 -- Django model metadata is public API
+    quote_name = connection.ops.quote_name
+
+    table = quote_name(meta.db_table)
+    upc_column = quote_name(meta.get_field("upc").column)
+    name_column = quote_name(meta.get_field("name").column)
+    parent_company_column = quote_name(meta.get_field("parent_company").column)
+    columns = ", ".join(
+        [
+            upc_column,
+            name_column,
+            parent_company_column,
+            quote_name(meta.get_field("item_image").column),
+            quote_name(meta.get_field("date_added").column),
+        ]
+    )
+
+    today_date = dj_timezone.localdate()
+    num_rows_affected = 0
+
+    with connection.cursor() as cursor:
+        for idx in range(0, len(products), batch_size):
+            batch = products[idx : idx + batch_size]
+            values_placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+            params: list[str | int | date | None] = []
+            for product in batch:
+                params.extend(
+                    [product.upc, product.name, product.parent_company_id, "", today_date]
+                )
+
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {values_placeholders} "  # noqa: S608 -- only model metadata is interpolated, values are parameterized
+                f"ON CONFLICT ({upc_column}) DO UPDATE "
+                f"SET {name_column} = EXCLUDED.{name_column}, "
+                f"{parent_company_column} = EXCLUDED.{parent_company_column} "
+                f"WHERE {table}.{name_column} IS NULL OR {table}.{name_column} = ''",
+                params,
+            )
+            num_rows_affected += cursor.rowcount
+
+    return num_rows_affected
+
+
 def is_date_within_work_cycle(date_in_question: date, work_cycle: WorkCycle) -> bool:
     return work_cycle.start_date <= date_in_question <= work_cycle.end_date
 
@@ -77,7 +135,32 @@ def get_num_work_cycles_offset(date_in_question: date, work_cycle: WorkCycle) ->
     return abs(num_cycles_offset) + num_adjustment
 
 
+def get_outside_work_cycle_filter(field_name: str, work_cycle: WorkCycle) -> Q:
+    """
+    Q filter matching rows whose date in `field_name` is at least one work cycle away from
+    `work_cycle`, i.e. the set-based equivalent of
+    `get_num_work_cycles_offset(date_in_question, work_cycle) > 0`.
+    """
+    return Q(**{f"{field_name}__gt": work_cycle.end_date}) | Q(
+        **{
+            f"{field_name}__lt": work_cycle.start_date,
+            f"{field_name}__lte": work_cycle.end_date - WORK_CYCLE_TIME_SPAN,
+        }
+    )
+
+
 def get_current_work_cycle() -> WorkCycle:
+    """
+    Get the WorkCycle that today's date falls in. Served from `work_cycle_cache`, which is
+    shared by request handlers and RQ jobs, so this is cheap to call repeatedly.
+
+    Returns:
+        products.WorkCycle: latest products.WorkCycle instance
+    """
+    return work_cycle_cache.get()
+
+
+def load_current_work_cycle() -> WorkCycle:
     """
     Get the latest WorkCycle instance; return if today's date is within existing work cycle's date intervals
         else create a new WorkCycle record and return that
@@ -113,3 +196,6 @@ def get_current_work_cycle() -> WorkCycle:
     new_work_cycles = WorkCycle.objects.bulk_create(new_work_cycles)
 
     return new_work_cycles[-1]
+
+
+work_cycle_cache = WorkCycleCache(load_current_work_cycle)
@@ -1,9 +1,12 @@
+from __future__ import annotations
+
 import logging
 import re
+import time
 
 from checkdigit import gs1
 
-from ..models import BrandParentCompany, PrefixMapping
+from ..models import BrandParentCompany, PrefixMapping, UpcCorrection
 from ..types import UPC_A_LENGTH
 
 logger = logging.getLogger("main_logger")
@@ -57,30 +60,6 @@ def get_upc_from_length10(trunc_upc: str, upc_prefixes: tuple[str, ...]) -> str
     return None
 
 
-def get_prefix_from_product_name(
-    product_name: str, parent_company: BrandParentCompany
-) -> str | None:
-    try:
-        prefix_mapping = PrefixMapping.objects.filter(
-            parent_company=parent_company, product_name_regex__isnull=False
-        ).order_by("prefix")
-
-        for mapping in prefix_mapping:
-            if re.match(mapping.product_name_regex, product_name, re.IGNORECASE):
-                return mapping.prefix
-    except PrefixMapping.DoesNotExist:
-        logger.exception("PrefixMapping not found for product name %r", product_name)
-        return None
-    except re.error:
-        logger.exception("Regex error while matching product name %r", product_name)
-        return None
-    except Exception:
-        logger.exception("Unexpected error while fetching prefix for product name %r", product_name)
-        return None
-
-    return None
-
-
 def _validate_upc(
     candidate_upc: str | None, upc_prefixes: tuple[str, ...], main_prefix: str | None
 ) -> str | None:
@@ -99,46 +78,145 @@ def _validate_upc(
     return candidate_upc
 
 
-def get_valid_upc(raw_upc: str, product_name: str, company: BrandParentCompany) -> str | None:
-    raw_upc = raw_upc.strip()
+class UpcNormalizer:
+    """
+    A BrandParentCompany's UPC normalization rules - its UPC corrections, default UPC
+    prefixes and (precompiled) PrefixMapping regexes - loaded once, so that any number of
+    raw UPCs can then be normalized in memory without further queries.
+
+    Use `get_upc_normalizer` rather than building one directly: it reuses an already loaded
+    normalizer until that company's rules change.
+    """
+
+    def __init__(
+        self,
+        upc_corrections: dict[str, str],
+        upc_prefixes: tuple[str, ...],
+        prefix_mappings: list[tuple[re.Pattern[str], str]],
+    ) -> None:
+        self.upc_corrections = upc_corrections
+        self.upc_prefixes = upc_prefixes
+        self.prefix_mappings = prefix_mappings
+
+    @classmethod
+    def from_company(cls, company: BrandParentCompany) -> UpcNormalizer:
+        upc_corrections = dict(
+            UpcCorrection.objects.filter(parent_company=company).values_list(
+                "bad_upc", "actual_upc"
+            )
+        )
+
+        prefix_mappings: list[tuple[re.Pattern[str], str]] = []
+        for mapping in PrefixMapping.objects.filter(
+            parent_company=company, product_name_regex__isnull=False
+        ).order_by("prefix"):
+            try:
+                prefix_mappings.append(
+                    (re.compile(mapping.product_name_regex, re.IGNORECASE), mapping.prefix)
+                )
+            except re.error:
+                logger.exception(
+                    "Skipping PrefixMapping %s with invalid regex %r",
+                    mapping.id,
+                    mapping.product_name_regex,
+                )
+
+        return cls(upc_corrections, tuple(company.default_upc_prefixes), prefix_mappings)
+
+    def get_prefix_from_product_name(self, product_name: str) -> str | None:
+        for product_name_re, prefix in self.prefix_mappings:
+            if product_name_re.match(product_name):
+                return prefix
+        return None
 
-    upc_from_preset_upc_corrections = (
-        company.upc_corrections.filter(bad_upc=raw_upc).values_list("actual_upc", flat=True).first()
-    )
-    if upc_from_preset_upc_corrections is not None:
-        return upc_from_preset_upc_corrections
+    def get_product_upc_error(self, upc: str, product_name: str | None) -> str | None:  # noqa: PLR0911 -- one return per check
+        """
+        In-memory equivalent of the UPC checks in `Product.clean`: returns why `upc` is not a
+        valid UPC for a product named `product_name` of this company, or None if it is.
+        """
+        if not upc.isnumeric():
+            return "UPC number must be numeric"
+        if len(upc) != UPC_A_LENGTH:
+            return f"UPC number must be {UPC_A_LENGTH} digits"
+        if not gs1.validate(upc):
+            return f"The UPC number is invalid. Expected a check digit of {gs1.calculate(upc[:11])}"
+
+        if len(self.upc_prefixes) == 0:
+            return "Parent company has no allowed UPC prefixes"
+        if upc[0] not in self.upc_prefixes:
+            return (
+                f"UPC prefix {upc[0]} is not allowed. Allowed prefixes: {list(self.upc_prefixes)}"
+            )
+
+        expected_prefix = self.get_prefix_from_product_name(product_name or "")
+        if expected_prefix is not None and upc[0] != expected_prefix:
+            return f"Expected UPC prefix {expected_prefix} for product name {product_name!r}, but got {upc[0]}"
 
-    upc_prefixes: tuple[str, ...] = tuple(company.default_upc_prefixes)
-    if len(upc_prefixes) == 0:
         return None
 
-    main_prefix = get_prefix_from_product_name(product_name, company)
-    if main_prefix is not None:
-        upc_prefixes = (main_prefix, *upc_prefixes)
-
-    candidate_upc: str | None = raw_upc
-
-    if len(raw_upc) == UPC_A_LENGTH and main_prefix is not None:
-        if raw_upc.startswith(upc_prefixes):
-            candidate_upc = raw_upc
-
-        candidate_upc = _validate_upc(raw_upc, upc_prefixes, main_prefix)
-        if candidate_upc is None and raw_upc[0] != main_prefix and raw_upc[1] == main_prefix:
-            candidate_upc = get_upc_from_length10(raw_upc[2:], (main_prefix,))
-            candidate_upc = _validate_upc(candidate_upc, upc_prefixes, main_prefix)
-        elif candidate_upc is None and raw_upc[0] != main_prefix:
-            candidate_upc = get_upc_from_length10(raw_upc, (main_prefix,))
-            candidate_upc = _validate_upc(candidate_upc, upc_prefixes, main_prefix)
-    elif len(raw_upc) == UPC_A_LENGTH + 1 and raw_upc[0] == "0":
-        candidate_upc = raw_upc[1:]
-    elif len(raw_upc) == UPC_A_LENGTH + 2 and raw_upc[0:2] == "00":
-        candidate_upc = raw_upc[2:]
-    elif len(raw_upc) == UPC_A_LENGTH + 3:
-        candidate_upc = get_upc_from_length11(raw_upc[:11], upc_prefixes)
-
-    if len(raw_upc) == UPC_A_LENGTH - 1:
-        candidate_upc = get_upc_from_length11(raw_upc, upc_prefixes)
-    elif len(raw_upc) == UPC_A_LENGTH - 2:
-        candidate_upc = get_upc_from_length10(raw_upc, upc_prefixes)
-
-    return _validate_upc(candidate_upc, upc_prefixes, main_prefix)
+    def get_valid_upc(self, raw_upc: str, product_name: str) -> str | None:
+        raw_upc = raw_upc.strip()
+
+        upc_from_preset_upc_corrections = self.upc_corrections.get(raw_upc)
+        if upc_from_preset_upc_corrections is not None:
+            return upc_from_preset_upc_corrections
+
+        upc_prefixes = self.upc_prefixes
+        if len(upc_prefixes) == 0:
+            return None
+
+        main_prefix = self.get_prefix_from_product_name(product_name)
+        if main_prefix is not None:
+            upc_prefixes = (main_prefix, *upc_prefixes)
+
+        candidate_upc: str | None = raw_upc
+
+        if len(raw_upc) == UPC_A_LENGTH and main_prefix is not None:
+            if raw_upc.startswith(upc_prefixes):
+                candidate_upc = raw_upc
+
+            candidate_upc = _validate_upc(raw_upc, upc_prefixes, main_prefix)
+            if candidate_upc is None and raw_upc[0] != main_prefix and raw_upc[1] == main_prefix:
+                candidate_upc = get_upc_from_length10(raw_upc[2:], (main_prefix,))
+                candidate_upc = _validate_upc(candidate_upc, upc_prefixes, main_prefix)
+            elif candidate_upc is None and raw_upc[0] != main_prefix:
+                candidate_upc = get_upc_from_length10(raw_upc, (main_prefix,))
+                candidate_upc = _validate_upc(candidate_upc, upc_prefixes, main_prefix)
+        elif len(raw_upc) == UPC_A_LENGTH + 1 and raw_upc[0] == "0":
+            candidate_upc = raw_upc[1:]
+        elif len(raw_upc) == UPC_A_LENGTH + 2 and raw_upc[0:2] == "00":
+            candidate_upc = raw_upc[2:]
+        elif len(raw_upc) == UPC_A_LENGTH + 3:
+            candidate_upc = get_upc_from_length11(raw_upc[:11], upc_prefixes)
+
+        if len(raw_upc) == UPC_A_LENGTH - 1:
+            candidate_upc = get_upc_from_length11(raw_upc, upc_prefixes)
+        elif len(raw_upc) == UPC_A_LENGTH - 2:
+            candidate_upc = get_upc_from_length10(raw_upc, upc_prefixes)
+
+        return _validate_upc(candidate_upc, upc_prefixes, main_prefix)
+
+
+# company id -> (time loaded, normalizer). Entries are dropped by the UpcCorrection/
+# PrefixMapping/BrandParentCompany signal handlers in this process; the TTL bounds how long
+# other processes (other web workers, RQ workers) can keep using rules changed elsewhere.
+_upc_normalizers: dict[int, tuple[float, UpcNormalizer]] = {}
+UPC_NORMALIZER_TTL_SECONDS = 300
+
+
+def get_upc_normalizer(company: BrandParentCompany) -> UpcNormalizer:
+    cached = _upc_normalizers.get(company.id)
+    if cached is not None and time.monotonic() - cached[0] < UPC_NORMALIZER_TTL_SECONDS:
+        return cached[1]
+
+    upc_normalizer = UpcNormalizer.from_company(company)
+    _upc_normalizers[company.id] = (time.monotonic(), upc_normalizer)
+    return upc_normalizer
+
+
+def invalidate_upc_normalizer(company_id: int) -> None:
+    _upc_normalizers.pop(company_id, None)
+
+
+def get_valid_upc(raw_upc: str, product_name: str, company: BrandParentCompany) -> str | None:
+    return get_upc_normalizer(company).get_valid_upc(raw_upc, product_name)
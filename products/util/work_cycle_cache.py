@@ -0,0 +1,49 @@
+from collections.abc import Callable
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone as dj_timezone
+
+from server.utils.cache import get_app_cache
+
+from ..models import WorkCycle
+
+WORK_CYCLE_CACHE_KEY_TEMPLATE = "current_work_cycle_{local_date}"
+# keys are per local date, so they only need to outlive the day they are for
+WORK_CYCLE_CACHE_TIMEOUT = timedelta(days=1)
+
+
+class WorkCycleCache:
+    """
+    The current WorkCycle, keyed by the local (TIME_ZONE) date so that it rolls over at
+    midnight without any explicit expiry.
+
+    Kept in the "products" AppCache, so lookups go through this process's copy first, then the
+    shared cache (used by every web process and RQ worker), and only call `loader` when neither
+    has the cycle for today.
+    """
+
+    def __init__(self, loader: Callable[[], WorkCycle]) -> None:
+        self.loader = loader
+        self.app_cache = get_app_cache("products")
+
+    def get(self) -> WorkCycle:
+        return self.app_cache.get_or_set(
+            self._get_key(dj_timezone.localdate()),
+            self.loader,
+            int(WORK_CYCLE_CACHE_TIMEOUT.total_seconds()),
+        )
+
+    def invalidate(self) -> None:
+        """
+        Drop today's cycle once the current transaction commits (right away outside of one): a
+        lookup that runs before the commit still reads the old cycle, and would cache it past
+        an invalidation made before the commit.
+        """
+        transaction.on_commit(self._delete_current)
+
+    def _delete_current(self) -> None:
+        self.app_cache.delete(self._get_key(dj_timezone.localdate()))
+
+    def _get_key(self, local_date: date) -> str:
+        return WORK_CYCLE_CACHE_KEY_TEMPLATE.format(local_date=local_date.isoformat())
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class ServerConfig(AppConfig):
+    name = "server"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401 -- registers signal receivers
@@ -3,9 +3,12 @@ from typing import TypedDict
 from django.conf import settings
 from django.http import HttpRequest
 
-from products.models import MessageRecipient
+from products.unread_counts import get_unread_message_count
+from server.utils.cache import get_app_cache
 from survey_worker.models import GlobalSettings
 
+GLOBAL_SETTINGS_CACHE_KEY = "global_settings"
+
 
 class UserInfo(TypedDict):
     name: str
@@ -25,13 +28,24 @@ class TContextProvider(TypedDict):
     vapid_public_key: str
 
 
-def context_provider(request: HttpRequest) -> TContextProvider:
+def load_global_settings() -> TGlobalSettings | None:
     global_settings = GlobalSettings.objects.first()
+    if global_settings is None:
+        return None
+    return {"is_survey_launcher_enabled": global_settings.is_survey_launcher_enabled}
 
+
+def get_global_settings() -> TGlobalSettings | None:
+    """Cached; see server.signals for invalidation."""
+    global_settings: TGlobalSettings | None = get_app_cache("server").get_or_set(
+        GLOBAL_SETTINGS_CACHE_KEY, load_global_settings
+    )
+    return global_settings
+
+
+def context_provider(request: HttpRequest) -> TContextProvider:
     unread_message_count = (
-        MessageRecipient.objects.filter(user=request.user, is_read=False).count()
-        if request.user.is_authenticated
-        else 0
+        get_unread_message_count(request.user.id) if request.user.is_authenticated else 0
     )
 
     return {
@@ -41,11 +55,7 @@ def context_provider(request: HttpRequest) -> TContextProvider:
             "is_authenticated": request.user.is_authenticated,
             "unread_message_count": unread_message_count,
         },
-        "global_settings": (
-            {"is_survey_launcher_enabled": global_settings.is_survey_launcher_enabled}
-            if global_settings is not None
-            else None
-        ),
+        "global_settings": get_global_settings(),
         "google_maps_js_api_key": settings.GOOGLE_MAPS_JS_API_KEY,
         "vapid_public_key": settings.VAPID_PUBLIC_KEY,
     }
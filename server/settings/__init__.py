@@ -1,2 +1,3 @@
 from .base import *
+from .caches import *
 from .redis_queues import *
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 import django_stubs_ext
@@ -57,11 +58,13 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "api",
     "products",
     "stock_tracker",
     "product_locator",
     "survey_worker",
+    "server",
     "widget_tweaks",
     "rest_framework",
     "rest_framework.authtoken",
@@ -185,14 +188,41 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Management commands that run RQ workers. Workers fork a child per job, which closes its
+# connection when it exits, so persistent connections only help them when jobs run in the
+# worker process itself (--fork-job-execution false).
+WORKER_MANAGEMENT_COMMANDS = ("scheduler_worker", "rqworker")
+IS_WORKER_PROCESS = len(sys.argv) > 1 and sys.argv[1] in WORKER_MANAGEMENT_COMMANDS
+
+# Seconds to keep a database connection open for reuse by later jobs; 0 closes it at the end of
+# each one. Django pings a reused connection before handing it out (CONN_HEALTH_CHECKS), so a
+# connection the server dropped is replaced instead of erroring.
+# The web process is served over ASGI, where every request runs in its own thread-sensitive
+# context and so never reuses a persistent connection (they would only pile up until they expire:
+# https://code.djangoproject.com/ticket/33497). It always closes its connections, and reuse for it
+# comes from the connection pooler below instead.
+DB_CONN_MAX_AGE = int(os.environ.get("PSQL_WORKER_CONN_MAX_AGE") or 0) if IS_WORKER_PROCESS else 0
+
+# The compose files run pgbouncer in transaction pooling mode in front of Postgres and point every
+# process at it with PSQL_POOLER_HOST/PSQL_POOLER_PORT, so that opening a connection per request
+# or job only opens one to pgbouncer. Without them, processes connect to PSQL_HOST/PSQL_PORT.
+DB_POOLER_HOST = os.environ.get("PSQL_POOLER_HOST", "")
+# transaction pooling can't keep the server-side cursors of QuerySet.iterator() open across
+# transactions
+IS_BEHIND_PGBOUNCER = bool(DB_POOLER_HOST)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.environ["PSQL_DB_NAME"],
         "USER": os.environ["PSQL_USERNAME"],
         "PASSWORD": os.environ["PSQL_PASSWORD"],
-        "HOST": os.environ["PSQL_HOST"],
-        "PORT": os.environ["PSQL_PORT"],
+        "HOST": DB_POOLER_HOST or os.environ["PSQL_HOST"],
+        "PORT": os.environ["PSQL_POOLER_PORT"] if IS_BEHIND_PGBOUNCER else os.environ["PSQL_PORT"],
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "DISABLE_SERVER_SIDE_CURSORS": IS_BEHIND_PGBOUNCER,
+        # only connections kept for reuse are checked
+        "CONN_HEALTH_CHECKS": DB_CONN_MAX_AGE > 0,
     }
 }
 
@@ -0,0 +1,31 @@
+import os
+from urllib.parse import quote
+
+# Redis DB 0 holds the RQ and scheduler queues (see redis_queues.py); the cache gets its own DB
+# so that clearing it can never drop queued jobs
+CACHE_REDIS_DB = 1
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": (
+            f"redis://:{quote(os.environ['REDIS_PASSWORD'], safe='')}"
+            f"@{os.environ['REDIS_HOST']}:{os.environ['REDIS_PORT']}/{CACHE_REDIS_DB}"
+        ),
+        "KEY_PREFIX": "inventory_manager",
+        "TIMEOUT": 300,  # seconds
+        "OPTIONS": {
+            "socket_connect_timeout": 2,
+            "socket_timeout": 2,
+        },
+    },
+    # per-process L1 in front of "default", see server.utils.cache.AppCache
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "inventory-manager-l1",
+        "TIMEOUT": 30,  # seconds
+        "OPTIONS": {
+            "MAX_ENTRIES": 5000,
+        },
+    },
+}
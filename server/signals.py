@@ -0,0 +1,10 @@
+from survey_worker.models import GlobalSettings
+
+from .context_processors import GLOBAL_SETTINGS_CACHE_KEY
+from .utils.cache import get_app_cache, invalidate_on_change
+
+invalidate_on_change(
+    get_app_cache("server"),
+    GlobalSettings,
+    get_keys=lambda _instance: [GLOBAL_SETTINGS_CACHE_KEY],
+)
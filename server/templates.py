@@ -28,6 +28,7 @@ class HomepageIndex(NamedTuple):
 class Inbox(NamedTuple):
     message_recipients: list[TMessageRecipient]
     has_next: bool
+    next_cursor: str | None
 
 
 @interface
@@ -40,6 +41,7 @@ class MarkMessageRead(NamedTuple):
 class GetInboxMessages(NamedTuple):
     message_recipients: list[TMessageRecipient]
     has_next: bool
+    next_cursor: str | None
 
 
 @interface
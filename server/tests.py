@@ -0,0 +1,141 @@
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from .utils.cache import AppCache
+from .utils.common import get_keyset_page, get_redis_client, unwrap
+from .utils.rate_limit import RedisTokenBucket
+from .utils.testing import LocMemCacheTestCase
+
+
+class AppCacheTest(LocMemCacheTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.app_cache = AppCache("products")
+
+    def test_get_or_set(self) -> None:
+        loader_calls: list[int] = []
+
+        def loader() -> int:
+            loader_calls.append(1)
+            return 42
+
+        self.assertEqual(self.app_cache.get_or_set("answer", loader), 42)
+        self.assertEqual(self.app_cache.get_or_set("answer", loader), 42)
+        self.assertEqual(len(loader_calls), 1)
+
+        # served from L2 once L1 no longer has it
+        caches["local"].clear()
+        self.assertEqual(self.app_cache.get_or_set("answer", loader), 42)
+        self.assertEqual(len(loader_calls), 1)
+
+        self.assertEqual(
+            self.app_cache.get_stats(), {"l1_hits": 1, "l2_hits": 1, "misses": 1, "errors": 0}
+        )
+
+    def test_invalidate(self) -> None:
+        self.app_cache.set("answer", 42)
+        self.app_cache.invalidate()
+        self.assertIsNone(self.app_cache.get("answer"))
+
+        self.app_cache.set("answer", 42)
+        self.app_cache.delete("answer")
+        self.assertIsNone(self.app_cache.get("answer"))
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self) -> None:
+        last_login = timezone.now()
+        # duplicate and NULL last_login values, so pages split within ties
+        for idx, login_offset in enumerate([0, 0, 0, 1, 1, None, None, 2, None]):
+            User.objects.create(
+                username=f"user{idx}",
+                last_login=None
+                if login_offset is None
+                else last_login - timedelta(days=login_offset, microseconds=1),
+            )
+
+    def test_pages_cover_the_ordering_once(self) -> None:
+        queryset = User.objects.order_by("-last_login", "-id")
+        expected_pks = list(
+            queryset.order_by(F("last_login").desc(nulls_last=True), "-id").values_list(
+                "pk", flat=True
+            )
+        )
+
+        pks: list[int] = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(1):
+                users, pagination_data = unwrap(
+                    get_keyset_page(queryset, cursor=cursor, page_size=2)
+                )
+            pks += [user.pk for user in users]
+            if not pagination_data.has_next:
+                break
+            cursor = pagination_data.next_cursor
+
+        self.assertEqual(pks, expected_pks)
+
+    def test_invalid_cursor(self) -> None:
+        queryset = User.objects.order_by("-last_login", "-id")
+
+        for cursor in ["not base64!", "WzFd", "WyJub3QgYSBkYXRlIiwgMV0="]:
+            self.assertFalse(get_keyset_page(queryset, cursor=cursor, page_size=2).ok)
+
+    def test_ordering_must_end_with_pk(self) -> None:
+        with self.assertRaises(TypeError):
+            get_keyset_page(User.objects.order_by("-last_login"), cursor=None, page_size=2)
+
+
+class RedisTokenBucketTest(TestCase):
+    """Runs the bucket's Lua script on the real Redis, under a key of its own."""
+
+    def setUp(self) -> None:
+        self.redis_client = get_redis_client()
+        self.key = f"test_rate_limit_{uuid.uuid4().hex}"
+        self.addCleanup(self.redis_client.delete, self.key)
+        # 2 tokens per hour, i.e. one every 1800 seconds
+        self.bucket = RedisTokenBucket(
+            self.redis_client, self.key, num_requests=2, period=timedelta(hours=1), capacity=2
+        )
+
+    def set_state(self, tokens: float, seconds_ago: float) -> None:
+        seconds, microseconds = self.redis_client.time()
+        now = seconds + microseconds / 1_000_000
+        self.redis_client.hset(
+            self.key, mapping={"tokens": str(tokens), "updated_at": str(now - seconds_ago)}
+        )
+
+    def test_exhaustion(self) -> None:
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertEqual(self.bucket.try_acquire(), 0)
+
+        # an empty bucket waits a full token's worth, and doesn't go into debt while waiting
+        self.assertAlmostEqual(self.bucket.try_acquire(), 1800, delta=1)
+        self.assertAlmostEqual(self.bucket.try_acquire(), 1800, delta=1)
+
+    def test_refill(self) -> None:
+        self.set_state(tokens=0, seconds_ago=900)
+        self.assertAlmostEqual(self.bucket.try_acquire(), 900, delta=1)
+
+        self.set_state(tokens=0.5, seconds_ago=900)
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertAlmostEqual(self.bucket.try_acquire(), 1800, delta=1)
+
+    def test_refill_is_capped_at_capacity(self) -> None:
+        self.set_state(tokens=0, seconds_ago=24 * 60 * 60)
+
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertGreater(self.bucket.try_acquire(), 0)
+
+    def test_key_expires_once_full(self) -> None:
+        self.bucket.try_acquire()
+        # a full refill takes capacity / rate = 3600 seconds
+        self.assertAlmostEqual(self.redis_client.ttl(self.key), 3601, delta=1)
@@ -32,6 +32,7 @@ root_patterns = [
         views.mark_message_read,
         name="mark_message_read",
     ),
+    path("cache_stats/", views.cache_stats, name="cache_stats"),
     path("sw.js", views.service_worker, name="service_worker"),
     path("manifest.json", views.pwa_manifest, name="pwa_manifest"),
     path("save_push_subscription/", views.save_push_subscription, name="save_push_subscription"),
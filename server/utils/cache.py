@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable
+from typing import Any, Literal, cast
+
+import redis
+from django.core.cache import caches
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger("main_logger")
+
+TCacheNamespace = Literal["products", "product_locator", "stock_tracker", "server"]
+TCacheEvent = Literal["l1_hits", "l2_hits", "misses", "errors"]
+
+CACHE_NAMESPACES: tuple[TCacheNamespace, ...] = (
+    "products",
+    "product_locator",
+    "stock_tracker",
+    "server",
+)
+CACHE_EVENTS: tuple[TCacheEvent, ...] = ("l1_hits", "l2_hits", "misses", "errors")
+
+# how long a value (and a namespace's generation) is trusted from the per-process L1, which
+# bounds how long other processes can serve a value after it was deleted or invalidated
+L1_TIMEOUT_SECONDS = 30
+STATS_FLUSH_INTERVAL_SECONDS = 30
+
+# what the Redis-backed "default" cache raises when Redis is unreachable or misbehaving
+CACHE_BACKEND_ERRORS = (redis.RedisError, OSError)
+
+_MISSING = object()
+
+
+class AppCache:
+    """
+    Cache for one app's keys, namespaced as `<namespace>:<generation>:<key>`.
+
+    Reads go through the per-process "local" cache (L1) first, then the shared Redis-backed
+    "default" cache (L2). `invalidate` bumps the namespace's generation, which orphans every
+    key written before it (they then expire on their own). Redis errors from the shared cache
+    are logged and treated as misses, so an unavailable Redis only makes lookups slower.
+
+    Hit/miss counts are kept per process and added to totals in the shared cache every
+    STATS_FLUSH_INTERVAL_SECONDS; see `get_stats`.
+    """
+
+    def __init__(self, namespace: TCacheNamespace) -> None:
+        self.namespace = namespace
+        self._generation_key = f"{namespace}:generation"
+        self._unflushed_stats: Counter[TCacheEvent] = Counter()
+        self._stats_lock = threading.Lock()
+        self._last_stats_flush = time.monotonic()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        full_key = self._get_full_key(key)
+
+        value = caches["local"].get(full_key, _MISSING)
+        if value is not _MISSING:
+            self._record("l1_hits")
+            return value
+
+        try:
+            value = caches["default"].get(full_key, _MISSING)
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Cache get failed for %s", full_key, exc_info=True)
+            self._record("errors")
+            value = _MISSING
+
+        if value is _MISSING:
+            self._record("misses")
+            return default
+
+        self._record("l2_hits")
+        caches["local"].set(full_key, value, L1_TIMEOUT_SECONDS)
+        return value
+
+    def get_or_set[T](self, key: str, loader: Callable[[], T], timeout: int | None = None) -> T:
+        """Return the cached value for `key`, or cache and return the result of `loader()`."""
+        cached_value = self.get(key, _MISSING)
+        if cached_value is not _MISSING:
+            return cast("T", cached_value)
+
+        value = loader()
+        self.set(key, value, timeout)
+        return value
+
+    def set(self, key: str, value: Any, timeout: int | None = None) -> None:
+        """Cache `value` for `timeout` seconds (the "default" cache's TIMEOUT if None)."""
+        full_key = self._get_full_key(key)
+        l2_timeout = caches["default"].default_timeout if timeout is None else timeout
+
+        l1_timeout = (
+            L1_TIMEOUT_SECONDS if l2_timeout is None else min(l2_timeout, L1_TIMEOUT_SECONDS)
+        )
+        caches["local"].set(full_key, value, l1_timeout)
+        try:
+            caches["default"].set(full_key, value, l2_timeout)
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Cache set failed for %s", full_key, exc_info=True)
+            self._record("errors")
+
+    def delete(self, *keys: str) -> None:
+        full_keys = [self._get_full_key(key) for key in keys]
+
+        caches["local"].delete_many(full_keys)
+        try:
+            caches["default"].delete_many(full_keys)
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Cache delete failed for %s", full_keys, exc_info=True)
+            self._record("errors")
+
+    def invalidate(self) -> None:
+        """Drop every key in the namespace, by moving it to a new generation."""
+        caches["local"].delete(self._generation_key)
+        try:
+            caches["default"].add(self._generation_key, 1, timeout=None)
+            caches["default"].incr(self._generation_key)
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Cache invalidation failed for %s", self.namespace, exc_info=True)
+            self._record("errors")
+
+    def get_stats(self) -> dict[TCacheEvent, int]:
+        """Hit/miss counts across all processes, as of their last flush."""
+        self._flush_stats(force=True)
+        stats_keys = {self._get_stats_key(event): event for event in CACHE_EVENTS}
+        try:
+            totals = caches["default"].get_many(stats_keys.keys())
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Could not read cache stats for %s", self.namespace, exc_info=True)
+            totals = {}
+
+        return {event: int(totals.get(key, 0)) for key, event in stats_keys.items()}
+
+    def _get_full_key(self, key: str) -> str:
+        return f"{self.namespace}:{self._get_generation()}:{key}"
+
+    def _get_generation(self) -> int:
+        generation: int | None = caches["local"].get(self._generation_key)
+        if generation is not None:
+            return generation
+
+        try:
+            caches["default"].add(self._generation_key, 1, timeout=None)
+            generation = int(caches["default"].get(self._generation_key, 1))
+        except CACHE_BACKEND_ERRORS:
+            logger.warning("Could not read cache generation for %s", self.namespace, exc_info=True)
+            return 0
+
+        caches["local"].set(self._generation_key, generation, L1_TIMEOUT_SECONDS)
+        return generation
+
+    def _get_stats_key(self, event: TCacheEvent) -> str:
+        return f"stats:{self.namespace}:{event}"
+
+    def _record(self, event: TCacheEvent) -> None:
+        with self._stats_lock:
+            self._unflushed_stats[event] += 1
+        self._flush_stats()
+
+    def _flush_stats(self, *, force: bool = False) -> None:
+        with self._stats_lock:
+            now = time.monotonic()
+            if not force and now - self._last_stats_flush < STATS_FLUSH_INTERVAL_SECONDS:
+                return
+            unflushed_stats = self._unflushed_stats
+            self._unflushed_stats = Counter()
+            self._last_stats_flush = now
+
+        try:
+            for event, count in unflushed_stats.items():
+                stats_key = self._get_stats_key(event)
+                caches["default"].add(stats_key, 0, timeout=None)
+                caches["default"].incr(stats_key, count)
+        except CACHE_BACKEND_ERRORS:  # stats are best-effort
+            logger.warning("Could not flush cache stats for %s", self.namespace, exc_info=True)
+
+
+_app_caches: dict[TCacheNamespace, AppCache] = {}
+_app_caches_lock = threading.Lock()
+
+
+def get_app_cache(namespace: TCacheNamespace) -> AppCache:
+    """The process-wide AppCache for `namespace`."""
+    with _app_caches_lock:
+        if namespace not in _app_caches:
+            _app_caches[namespace] = AppCache(namespace)
+        return _app_caches[namespace]
+
+
+def invalidate_on_change(
+    app_cache: AppCache,
+    *senders: type[models.Model],
+    get_keys: Callable[[Any], Iterable[str]] | None = None,
+) -> None:
+    """
+    Keep `app_cache` in sync with `senders`: whenever an instance of one of them is saved or
+    deleted, delete the keys `get_keys(instance)` returns, or the whole namespace if `get_keys`
+    is None.
+    """
+
+    def invalidate(instance: models.Model, **_kwargs: Any) -> None:
+        if get_keys is None:
+            app_cache.invalidate()
+        else:
+            app_cache.delete(*get_keys(instance))
+
+    for sender in senders:
+        dispatch_uid = "_".join(
+            [
+                "invalidate",
+                app_cache.namespace,
+                sender._meta.label,  # noqa: SLF001 -- Django model metadata is public API
+                getattr(get_keys, "__qualname__", "all"),
+            ]
+        )
+        post_save.connect(invalidate, sender=sender, weak=False, dispatch_uid=dispatch_uid)
+        post_delete.connect(invalidate, sender=sender, weak=False, dispatch_uid=dispatch_uid)
@@ -1,10 +1,20 @@
+import base64
+import binascii
+import functools
+import json
 from collections.abc import Callable
+from datetime import date, time
 from typing import Any
 
 import cattrs
+import redis
 import requests
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.paginator import Page, Paginator
 from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse
@@ -13,7 +23,14 @@ from requests.adapters import HTTPAdapter, Retry
 from requests.utils import cookiejar_from_dict, dict_from_cookiejar
 from rest_framework.exceptions import ValidationError
 
-from .typedefs import TFailure, TPaginationData, TResult, TSessionData, TSuccess
+from .typedefs import (
+    TFailure,
+    TKeysetPaginationData,
+    TPaginationData,
+    TResult,
+    TSessionData,
+    TSuccess,
+)
 
 TIsNewRecord = bool
 
@@ -113,6 +130,21 @@ def get_http_retrier(num_retries: int = 3, backoff_factor: float = 0.1) -> Sessi
     return session
 
 
+@functools.cache
+def get_redis_client() -> redis.Redis:
+    """
+    Process-wide client for the Redis instance backing the default RQ queue. redis-py keeps a
+    connection pool per client, so sharing one avoids reconnecting on every use.
+    """
+    return redis.Redis(
+        host=settings.RQ_QUEUES["default"]["HOST"],
+        password=settings.RQ_QUEUES["default"]["PASSWORD"],
+        port=settings.RQ_QUEUES["default"]["PORT"],
+        db=settings.RQ_QUEUES["default"]["DB"],
+        socket_connect_timeout=5,
+    )
+
+
 def session_object_to_session_dict(session: Session) -> TSessionData:
     return {
         "headers": dict(session.headers),  # type: ignore [arg-type]
@@ -238,6 +270,148 @@ def get_pagination_data[TModelSubclass: models.Model](
     )
 
 
+def get_keyset_page[TModelSubclass: models.Model](
+    queryset: models.QuerySet[TModelSubclass], *, cursor: str | None, page_size: int
+) -> TResult[tuple[list[TModelSubclass], TKeysetPaginationData], ValueError]:
+    """
+    Return the page of `queryset` that starts at `cursor` (the first page if None), alongside
+    the cursor of the page after it.
+
+    Unlike `get_pagination_data`, which counts the rows and then skips to the page with OFFSET,
+    this fetches only the page (plus one row, to tell if there's a next page): the cursor holds
+    the ordering values of the last row of the previous page, and the page is filtered to the
+    rows ordered after it. So every page is one query, and as fast as the first. Pages can only
+    be walked forwards, which is all "load more" lists need.
+
+    `queryset` must be ordered by model fields only, ending with the pk so that the ordering is
+    unique, e.g. `.order_by("-date_last_scanned", "-id")`. Nullable fields are ordered with
+    their NULLs last. A malformed or tampered cursor is reported as a TFailure.
+    """
+    ordering = _get_keyset_ordering(queryset)
+    queryset = queryset.order_by(
+        *[
+            (F(name).desc(nulls_last=True) if is_descending else F(name).asc(nulls_last=True))
+            if field.null
+            else f"{'-' if is_descending else ''}{name}"
+            for name, is_descending, field in ordering
+        ]
+    )
+
+    if cursor is not None:
+        try:
+            cursor_values = _decode_keyset_cursor(cursor, ordering)
+        except ValueError as ex:
+            return TFailure(ex)
+        queryset = queryset.filter(_get_keyset_filter(ordering, cursor_values))
+
+    rows = list(queryset[: page_size + 1])
+    page_rows = rows[:page_size]
+    has_next = len(rows) > page_size
+
+    return TSuccess(
+        (
+            page_rows,
+            TKeysetPaginationData(
+                has_next=has_next,
+                next_cursor=_encode_keyset_cursor(page_rows[-1], ordering) if has_next else None,
+            ),
+        )
+    )
+
+
+# (field path, is descending, field)
+type TKeysetOrdering = list[tuple[str, bool, models.Field[Any, Any]]]
+
+
+def _get_keyset_ordering(queryset: models.QuerySet[Any]) -> TKeysetOrdering:
+    model_meta = queryset.model._meta  # noqa: SLF001 -- Django model metadata is public API
+
+    ordering: TKeysetOrdering = []
+    for order_by in queryset.query.order_by or model_meta.ordering:
+        if not isinstance(order_by, str):
+            raise TypeError(f"Keyset pagination can't order by the expression {order_by!r}")
+
+        name = order_by.removeprefix("-")
+        try:
+            ordering.append((name, order_by.startswith("-"), _get_field(queryset.model, name)))
+        except FieldDoesNotExist as ex:
+            raise TypeError(f"Keyset pagination can't order by {order_by!r}") from ex
+
+    if not ordering or ordering[-1][2] != model_meta.pk:
+        raise TypeError("Keyset pagination needs the queryset's ordering to end with its pk")
+    return ordering
+
+
+def _get_field(model: type[models.Model], path: str) -> models.Field[Any, Any]:
+    """The model field at a lookup path like `message__datetime_created`."""
+    *related_names, field_name = path.split("__")
+    for related_name in related_names:
+        model = model._meta.get_field(related_name).related_model  # type: ignore [assignment]  # noqa: SLF001 -- Django model metadata is public API
+
+    if field_name == "pk":
+        return model._meta.pk  # noqa: SLF001 -- Django model metadata is public API
+    return model._meta.get_field(field_name)  # type: ignore [return-value]  # noqa: SLF001 -- Django model metadata is public API
+
+
+def _get_keyset_filter(ordering: TKeysetOrdering, cursor_values: list[Any]) -> Q:
+    """
+    The rows ordered after the row with `cursor_values`: those greater (or less, if descending)
+    in the first field, or equal in it and greater in the second, and so on.
+    """
+    keyset_filter = Q(pk__in=[])
+    is_equal_so_far = Q()
+    for (name, is_descending, field), value in zip(ordering, cursor_values, strict=True):
+        if value is None:
+            # NULLs are ordered last, so only other NULLs can come after one
+            is_after = Q(pk__in=[])
+            is_equal = Q(**{f"{name}__isnull": True})
+        else:
+            is_after = Q(**{f"{name}__{'lt' if is_descending else 'gt'}": value})
+            if field.null:
+                is_after |= Q(**{f"{name}__isnull": True})
+            is_equal = Q(**{name: value})
+
+        keyset_filter |= is_equal_so_far & is_after
+        is_equal_so_far &= is_equal
+
+    return keyset_filter
+
+
+def _encode_keyset_cursor(row: models.Model, ordering: TKeysetOrdering) -> str:
+    values = []
+    for name, _is_descending, _field in ordering:
+        value: Any = row
+        for attr in name.split("__"):
+            value = None if value is None else getattr(value, attr)
+        values.append(value)
+
+    # full isoformat rather than DjangoJSONEncoder's, which drops microseconds
+    def to_json(value: Any) -> str:
+        if isinstance(value, date | time):
+            return value.isoformat()
+        return str(value)
+
+    return base64.urlsafe_b64encode(json.dumps(values, default=to_json).encode()).decode()
+
+
+def _decode_keyset_cursor(cursor: str, ordering: TKeysetOrdering) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as ex:
+        raise ValueError("Invalid page cursor") from ex
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("Invalid page cursor")
+
+    try:
+        return [
+            None if value is None else field.to_python(value)
+            for (_name, _is_descending, field), value in zip(ordering, values, strict=True)
+        ]
+    except DjangoValidationError as ex:
+        raise ValueError("Invalid page cursor") from ex
+
+
 def conditional_redirect(
     view_func: Callable[..., HttpResponse],
     target_name: str,
@@ -0,0 +1,46 @@
+import base64
+import json
+import zlib
+from typing import Any
+
+from django.db import models
+
+
+class CompressedJSONField(models.BinaryField[Any, Any]):
+    """
+    JSON value stored zlib-compressed in a binary column, for large documents that are only
+    ever read and written whole (they can't be queried into, unlike a JSONField). Values are
+    the same Python objects a JSONField would hold.
+    """
+
+    def __init__(self, *args: Any, compression_level: int = 6, **kwargs: Any) -> None:
+        self.compression_level = compression_level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self) -> Any:
+        name, path, args, kwargs = super().deconstruct()
+        if self.compression_level != 6:  # noqa: PLR2004 -- the default from __init__
+            kwargs["compression_level"] = self.compression_level
+        return name, path, args, kwargs
+
+    def from_db_value(self, value: Any, _expression: Any, _connection: Any) -> Any:
+        if value is None:
+            return None
+        return json.loads(zlib.decompress(value))
+
+    def to_python(self, value: Any) -> Any:
+        # values from the database are handled by from_db_value; strings come from
+        # deserializing fixtures, see value_to_string
+        if isinstance(value, str):
+            return json.loads(zlib.decompress(base64.b64decode(value)))
+        return value
+
+    def get_prep_value(self, value: Any) -> Any:
+        if value is None:
+            return None
+        return zlib.compress(
+            json.dumps(value, separators=(",", ":")).encode(), self.compression_level
+        )
+
+    def value_to_string(self, obj: models.Model) -> str:
+        return base64.b64encode(self.get_prep_value(self.value_from_object(obj))).decode()
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import redis
+
+# Refills the bucket for the time elapsed since it was last touched, then takes a token if
+# one is available. Returns the number of seconds until a token will be available (0 if one
+# was taken), as a string since Redis truncates Lua numbers to integers.
+# Uses the Redis server's clock, so every client agrees on elapsed time.
+RATE_LIMIT_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local tokens_per_second = tonumber(ARGV[2])
+
+local server_time = redis.call("TIME")
+local now = tonumber(server_time[1]) + tonumber(server_time[2]) / 1000000
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * tokens_per_second)
+
+local wait_seconds = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait_seconds = (1 - tokens) / tokens_per_second
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / tokens_per_second) + 1)
+
+return tostring(wait_seconds)
+"""
+
+
+class RedisTokenBucket:
+    """
+    Token bucket rate limiter whose state lives in Redis, so that it is shared by every web
+    process and RQ worker using the same key.
+
+    A `capacity` of 1 spaces calls evenly at `num_requests` per `period`; a larger capacity
+    allows bursts of up to `capacity` calls after a quiet spell.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        key: str,
+        num_requests: int,
+        period: timedelta,
+        capacity: int = 1,
+    ) -> None:
+        self.key = key
+        self.capacity = capacity
+        self.tokens_per_second = num_requests / period.total_seconds()
+        self._script = redis_client.register_script(RATE_LIMIT_SCRIPT)
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, else the number of seconds until one will be
+                available (no token is taken in that case)
+        """
+        wait_seconds = self._script(keys=[self.key], args=[self.capacity, self.tokens_per_second])
+        return float(wait_seconds)
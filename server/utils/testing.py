@@ -0,0 +1,25 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+# per-process stand-ins for the Redis-backed "default" cache and the "local" L1 cache, so that
+# tests neither need Redis nor see each other's (or a running server's) cached values
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-l2",
+    },
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-l1",
+    },
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocMemCacheTestCase(TestCase):
+    """TestCase that runs on LOCMEM_CACHES, emptied before each test."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        caches["default"].clear()
+        caches["local"].clear()
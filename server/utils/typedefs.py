@@ -20,6 +20,11 @@ class TPaginationData(NamedTuple):
     next_page_number: int  # next page number (or None)
 
 
+class TKeysetPaginationData(NamedTuple):
+    has_next: bool  # whether there's a next page
+    next_cursor: str | None  # opaque cursor of the next page (or None)
+
+
 T = TypeVar("T")
 E = TypeVar("E")
 
@@ -8,7 +8,9 @@ from django.urls import reverse_lazy
 from django.views.decorators.http import require_http_methods
 
 from products.models import MessageRecipient, PushSubscription
-from server.utils.common import error_json_response, get_pagination_data, unwrap
+from products.unread_counts import get_unread_message_count
+from server.utils.cache import CACHE_EVENTS, CACHE_NAMESPACES, get_app_cache
+from server.utils.common import error_json_response, get_keyset_page, unwrap
 from server.utils.typedefs import AuthenticatedRequest
 
 from . import templates
@@ -20,7 +22,7 @@ def get_inbox_message_recipients_queryset(user_id: int) -> models.QuerySet[Messa
     return (
         MessageRecipient.objects.filter(user_id=user_id)
         .select_related("message", "message__sender")
-        .order_by("-message__datetime_created")
+        .order_by("-message__datetime_created", "-id")
     )
 
 
@@ -34,35 +36,41 @@ def index(request: HttpRequest) -> HttpResponse:
 
 @login_required(login_url=reverse_lazy("stock_tracker:login_view"))
 def inbox(request: AuthenticatedRequest) -> HttpResponse:
-    pagination_result = get_pagination_data(
-        get_inbox_message_recipients_queryset(request.user.id), page=1, page_size=INBOX_PAGE_SIZE
+    pagination_result = get_keyset_page(
+        get_inbox_message_recipients_queryset(request.user.id),
+        cursor=None,
+        page_size=INBOX_PAGE_SIZE,
     )
-    page_obj, pagination_data = unwrap(pagination_result)
+    message_recipients, pagination_data = unwrap(pagination_result)
 
     return templates.Inbox(
-        message_recipients=list(page_obj.object_list), has_next=pagination_data.has_next
+        message_recipients=message_recipients,
+        has_next=pagination_data.has_next,
+        next_cursor=pagination_data.next_cursor,
     ).render(request)
 
 
 @login_required(login_url=reverse_lazy("stock_tracker:login_view"))
 @require_http_methods(["GET"])
 def get_inbox_messages(request: AuthenticatedRequest) -> HttpResponse:
-    page_param = request.GET.get("page")
-    if page_param is None:
-        return error_json_response(["Missing page"], status=400)
+    cursor = request.GET.get("cursor")
+    if cursor is None:
+        return error_json_response(["Missing cursor"], status=400)
 
-    pagination_result = get_pagination_data(
+    pagination_result = get_keyset_page(
         get_inbox_message_recipients_queryset(request.user.id),
-        page=int(page_param),
+        cursor=cursor,
         page_size=INBOX_PAGE_SIZE,
     )
     if not pagination_result.ok:
         return error_json_response([str(pagination_result.err)], status=400)
 
-    page_obj, pagination_data = pagination_result.value
+    message_recipients, pagination_data = pagination_result.value
 
     return templates.GetInboxMessages(
-        message_recipients=list(page_obj.object_list), has_next=pagination_data.has_next
+        message_recipients=message_recipients,
+        has_next=pagination_data.has_next,
+        next_cursor=pagination_data.next_cursor,
     ).render(request)
 
 
@@ -74,7 +82,7 @@ def mark_message_read(request: AuthenticatedRequest, message_recipient_id: int)
     )
     message_recipient.mark_read()
 
-    unread_message_count = MessageRecipient.objects.filter(user=request.user, is_read=False).count()
+    unread_message_count = get_unread_message_count(request.user.id)
 
     return templates.MarkMessageRead(
         success=True, unread_message_count=unread_message_count
@@ -153,6 +161,23 @@ def delete_push_subscription(request: AuthenticatedRequest) -> HttpResponse:
     return templates.DeletePushSubscription(success=True).render(request)
 
 
+@login_required(login_url=reverse_lazy("stock_tracker:login_view"))
+@require_http_methods(["GET"])
+def cache_stats(request: AuthenticatedRequest) -> HttpResponse:
+    if not request.user.is_superuser:
+        return error_json_response(["Forbidden"], status=403)
+
+    stats: dict[str, dict[str, int | float | None]] = {}
+    for namespace in CACHE_NAMESPACES:
+        namespace_stats = get_app_cache(namespace).get_stats()
+        num_hits = namespace_stats["l1_hits"] + namespace_stats["l2_hits"]
+        num_lookups = num_hits + namespace_stats["misses"]
+        stats[namespace] = {event: namespace_stats[event] for event in CACHE_EVENTS}
+        stats[namespace]["hit_ratio"] = num_hits / num_lookups if num_lookups else None
+
+    return JsonResponse(stats)
+
+
 def error404(
     request: HttpRequest, _exception: Exception, template_name: str = "404.html"
 ) -> HttpResponse:
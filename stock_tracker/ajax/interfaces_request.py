@@ -4,8 +4,8 @@ from attr import frozen
 @frozen
 class ProductAdditionsGETRequest:
     store_id: int
-    # page number which to fetch
-    page: int
+    # cursor of the page to fetch (the previous page's `next_cursor`); empty for the first page
+    cursor: str = ""
     # optional substring filter on the associated Product's name; empty string means no filter
     product_name: str = ""
     # comma-separated BrandParentCompany pks to filter by; empty string means no filter (all)
@@ -25,7 +25,7 @@ class LogProductScanRequest:
 
 @frozen
 class BarcodeSheetsGETRequest:
-    # page number which to fetch
-    page: int
+    # cursor of the page to fetch (the previous page's `next_cursor`); empty for the first page
+    cursor: str = ""
     # optional FieldRepresentative pk to filter by; empty string means no filter (all reps)
     field_representative_id: str = ""
@@ -8,7 +8,7 @@ from rest_framework.request import Request as DRFRequest
 from rest_framework.response import Response as DRFResponse
 
 from products.models import BarcodeSheet, Product, ProductAddition, Store
-from server.utils.common import get_pagination_data, validate_structure
+from server.utils.common import get_keyset_page, validate_structure
 from stock_tracker import util
 
 from .interfaces_request import (
@@ -47,21 +47,19 @@ def get_product_additions_by_store(request: DRFRequest) -> DRFResponse:
             product__parent_company__pk__in=brand_parent_company_ids
         )
 
-    pagination_result = get_pagination_data(
-        product_additions, page=request_data.page, page_size=num_records_limit
+    pagination_result = get_keyset_page(
+        product_additions, cursor=request_data.cursor or None, page_size=num_records_limit
     )
     if not pagination_result.ok:
         raise DRFValidationError(str(pagination_result.err))
 
-    page_obj, pagination_data = pagination_result.value
-    logger.info(request_data.page)
+    page_product_additions, pagination_data = pagination_result.value
 
     return DRFResponse(
         {
-            "results": BasicProductAddition(
-                list(page_obj.object_list), many=True, read_only=True
-            ).data,
+            "results": BasicProductAddition(page_product_additions, many=True, read_only=True).data,
             "has_next": pagination_data.has_next,
+            "next_cursor": pagination_data.next_cursor,
         }
     )
 
@@ -81,20 +79,19 @@ def get_barcode_sheets(request: DRFRequest) -> DRFResponse:
             store__field_representative=int(request_data.field_representative_id)
         )
 
-    pagination_result = get_pagination_data(
-        barcode_sheets, page=request_data.page, page_size=num_records_limit
+    pagination_result = get_keyset_page(
+        barcode_sheets, cursor=request_data.cursor or None, page_size=num_records_limit
     )
     if not pagination_result.ok:
         raise DRFValidationError(str(pagination_result.err))
 
-    page_obj, pagination_data = pagination_result.value
+    page_barcode_sheets, pagination_data = pagination_result.value
 
     return DRFResponse(
         {
-            "results": BasicBarcodeSheet(
-                list(page_obj.object_list), many=True, read_only=True
-            ).data,
+            "results": BasicBarcodeSheet(page_barcode_sheets, many=True, read_only=True).data,
             "has_next": pagination_data.has_next,
+            "next_cursor": pagination_data.next_cursor,
         }
     )
 
@@ -1,10 +1,8 @@
-import base64
-import io
-
-import barcode  # type:ignore [import, unused-ignore]
 from django.templatetags.static import static
+from django.urls import reverse
 from rest_framework import serializers
 
+from products.barcodes import DEFAULT_WRITER_OPTIONS_KEY
 from products.models import (
     BarcodeSheet,
     BrandParentCompany,
@@ -65,14 +63,14 @@ class FieldRepresentativeStoresManagersSerializer(serializers.ModelSerializer[Fi
 
 
 class ProductSerializer(serializers.ModelSerializer[Product]):
-    barcode_b64 = serializers.SerializerMethodField()
+    barcode_url = serializers.SerializerMethodField()
     item_image_url = serializers.SerializerMethodField()
     upc_sections = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ["upc", "name", "upc_sections", "item_image_url", "barcode_b64"]
-        read_only_fields = ["upc", "name", "upc_sections", "item_image_url", "barcode_b64"]
+        fields = ["upc", "name", "upc_sections", "item_image_url", "barcode_url"]
+        read_only_fields = ["upc", "name", "upc_sections", "item_image_url", "barcode_url"]
 
     def get_upc_sections(self, product: Product) -> list[str]:
         upc_sections = []
@@ -89,22 +87,15 @@ class ProductSerializer(serializers.ModelSerializer[Product]):
             return static("public/stock_tracker/images/image_not_available.png")
         return product.item_image.url  # type:ignore [no-any-return]
 
-    def get_barcode_b64(self, product: Product) -> str:
-        writer_options = {
-            "module_height": 18,
-            "font_size": 10,
-            "text_distance": 4.0,
-            "write_text": False,
-            "background": "#ffffff",
-        }
-
-        barcode_instance = barcode.get("upc", product.upc, writer=barcode.writer.ImageWriter())
-        temp_barcode_image = barcode_instance.render(writer_options=writer_options)
-
-        fp = io.BytesIO()
-        temp_barcode_image.save(fp, format="PNG")
-
-        return base64.b64encode(fp.getvalue()).decode()
+    def get_barcode_url(self, product: Product) -> str:
+        return reverse(
+            "stock_tracker:get_barcode_image",
+            kwargs={
+                "options_key": DEFAULT_WRITER_OPTIONS_KEY,
+                "upc": product.upc,
+                "image_format": "png",
+            },
+        )
 
 
 class ProductAdditionSerializer(serializers.ModelSerializer[ProductAddition]):
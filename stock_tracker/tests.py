@@ -1 +1,63 @@
-# Create your tests here.
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from products.barcodes import DEFAULT_WRITER_OPTIONS_KEY, barcode_image_cache
+from products.models import BrandParentCompany, Product
+
+
+class BarcodeImageTest(TestCase):
+    def setUp(self) -> None:
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        self.cache_dir = Path(cache_dir.name)
+        patcher = mock.patch.object(barcode_image_cache, "cache_dir", self.cache_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_route(self, upc: str, image_format: str) -> str:
+        return reverse(
+            "stock_tracker:get_barcode_image",
+            kwargs={
+                "options_key": DEFAULT_WRITER_OPTIONS_KEY,
+                "upc": upc,
+                "image_format": image_format,
+            },
+        )
+
+    def test_get_barcode_image(self) -> None:
+        response = self.client.get(self.get_route("190198131553", "png"))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/png", response["Content-Type"])
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(
+            self.get_route("190198131553", "png"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(304, response.status_code)
+
+        response = self.client.get(self.get_route("190198131553", "svg"))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("image/svg+xml", response["Content-Type"])
+
+    def test_invalid_barcode_image(self) -> None:
+        self.assertEqual(404, self.client.get(self.get_route("1234", "png")).status_code)
+        self.assertEqual(404, self.client.get(self.get_route("190198131553", "gif")).status_code)
+        # wrong GS1 check digit
+        self.assertEqual(404, self.client.get(self.get_route("190198131554", "png")).status_code)
+
+    def test_only_known_products_are_saved(self) -> None:
+        company = BrandParentCompany.objects.create(
+            short_name="APPL", expanded_name="Apple", default_upc_prefixes=["1"]
+        )
+        Product.objects.create(upc="190198131553", name="Known product", parent_company=company)
+
+        self.assertEqual(200, self.client.get(self.get_route("190198131553", "png")).status_code)
+        self.assertEqual(200, self.client.get(self.get_route("036000291452", "png")).status_code)
+
+        saved_images = {path.name for path in self.cache_dir.rglob("*.png")}
+        self.assertEqual({"190198131553.png"}, saved_images)
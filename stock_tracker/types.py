@@ -9,7 +9,7 @@ class ProductInterface(TypedDict):
     name: str
     upc_sections: list[str]
     item_image_url: str
-    barcode_b64: str
+    barcode_url: str
 
 
 class ParentCompanyInterface(TypedDict):
@@ -28,6 +28,11 @@ ssr_urlpatterns = [
         ssr_views.get_barcode_sheet,
         name="get_barcode_sheet",
     ),
+    path(
+        "barcode/<str:options_key>/<str:upc>.<str:image_format>",
+        ssr_views.get_barcode_image,
+        name="get_barcode_image",
+    ),
     path(
         "set_carried_product_additions/",
         ssr_views.set_carried_product_additions,
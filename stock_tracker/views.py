@@ -1,5 +1,6 @@
 import logging
 
+from checkdigit import gs1
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
@@ -16,17 +17,27 @@ from django.http import (
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.utils.encoding import iri_to_uri
 from django.utils.http import url_has_allowed_host_and_scheme
-from django.views.decorators.http import require_http_methods
-
+from django.views.decorators.http import etag, require_http_methods
+
+from products.barcodes import (
+    BARCODE_CONTENT_TYPES,
+    DEFAULT_WRITER_OPTIONS,
+    DEFAULT_WRITER_OPTIONS_KEY,
+    TBarcodeFormat,
+    barcode_image_cache,
+)
 from products.models import (
     BarcodeSheet,
     BrandParentCompany,
     FieldRepresentative,
+    Product,
     ProductAddition,
     Store,
 )
+from products.types import UPC_A_LENGTH
 from products.util import import_new_stores
 from server.utils.common import validate_structure
 
@@ -223,6 +234,46 @@ def get_barcode_sheet(request: HttpRequest, barcode_sheet_id: int) -> HttpRespon
     ).render(request)
 
 
+def get_barcode_image_etag(
+    _request: HttpRequest, options_key: str, upc: str, image_format: str
+) -> str:
+    return f"{options_key}-{upc}-{image_format}"
+
+
+@require_http_methods(["GET"])
+@etag(get_barcode_image_etag)
+def get_barcode_image(
+    _request: HttpRequest, options_key: str, upc: str, image_format: str
+) -> HttpResponse:
+    """
+    Barcode image for a single UPC. The URL is content-addressed - it embeds the digest of
+    the writer options used to draw the barcode - so a given URL always maps to the same
+    bytes and can be cached by the browser (or any CDN in front of it) indefinitely.
+
+    The endpoint is public, so only images of known products are saved to disk; any other
+    valid UPC is rendered on every request.
+    """
+    if options_key != DEFAULT_WRITER_OPTIONS_KEY or image_format not in BARCODE_CONTENT_TYPES:
+        return HttpResponseNotFound()
+
+    if not upc.isnumeric() or len(upc) != UPC_A_LENGTH or not gs1.validate(upc):
+        return HttpResponseNotFound()
+
+    barcode_format: TBarcodeFormat = "svg" if image_format == "svg" else "png"
+    is_known_product = Product.objects.filter(upc=upc).exists()
+    try:
+        image = barcode_image_cache.get(
+            upc, DEFAULT_WRITER_OPTIONS, barcode_format, is_saved=is_known_product
+        )
+    except Exception:
+        logger.exception("Could not render barcode image for UPC %s", upc)
+        return HttpResponseNotFound()
+
+    response = HttpResponse(image, content_type=BARCODE_CONTENT_TYPES[barcode_format])
+    patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
+
+
 @login_required(login_url=reverse_lazy("stock_tracker:login_view"))
 @require_http_methods(["POST"])
 def set_product_distribution_order_status(request: HttpRequest) -> HttpResponse: